@@ -1,22 +1,41 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import re
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import geopandas as gpd
 import folium
+from folium.elements import JSCSSMixin
+from branca.element import MacroElement
+from jinja2 import Template
 from streamlit_folium import st_folium
-from bs4 import BeautifulSoup
-from openpyxl import Workbook
-from openpyxl.cell.cell import MergedCell
 import os
 from PIL import Image
 import io
-import base64
-import matplotlib.pyplot as plt
+import hashlib
+import threading
+from collections import OrderedDict
 import matplotlib.patches as mpatches
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import shapely
+from concurrent.futures import ThreadPoolExecutor
+from html import escape as html_escape
+from choropleth import (
+    KELAS_PETA, add_stunting_classes, stunting_colors, table_category
+)
+from etl import ETL_PARSER_VERSION, etl_cache_key, proses_etl, read_source_excel
+from hotspot import ALFA, JUMLAH_PERMUTASI, KLASTER_GI, KLASTER_LISA, analisis_hotspot, load_weights
+from pencarian import SearchIndex, index_wilayah, relevansi_baris
+from rollup import KOLOM_JUMLAH, build_cube, hitung_indikator, peringkat
+from spasial import SpatialIndex
+from wilayah import TANPA_FITUR, cakupan, resolve_wilayah
+from warehouse import (
+    WAREHOUSE_DIR, PeriodeTerisi, Warehouse, id_periode, label_periode, nomor_bulan, tanggal_penarikan,
+    tebak_tahun_data
+)
+from geodata import (
+    GEOMETRY_LEVELS, kecamatan_labels, load_geodata, pick_geometry_level, with_geometry_level,
+    write_topojson
+)
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -30,10 +49,80 @@ st.set_page_config(
 # FUNGSI HELPER UNTUK DOWNLOAD GRAFIK
 # ============================================================================
 
+def chart_fingerprint(fig_json, filename, title=""):
+    """Sidik jari grafik (sha256) dari JSON figure, nama file dan judul"""
+    h = hashlib.sha256()
+    for bagian in (fig_json, filename, title):
+        h.update(bagian.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_chart_html(fingerprint, _fig_json, filename, title=""):
+    """
+    Render grafik Plotly ke HTML interaktif (tanpa kaleido) untuk diunduh
+    
+    Cache berdasarkan fingerprint saja; JSON figure tidak ikut di-hash ulang.
+    
+    Parameters:
+    - fingerprint: Hasil chart_fingerprint untuk figure ini
+    - _fig_json: Figure Plotly dalam bentuk JSON
+    - filename: Nama file output (tanpa ekstensi)
+    - title: Judul yang akan ditambahkan di atas grafik
+    
+    Returns:
+    - HTML dalam bentuk bytes
+    """
+    import plotly.io as pio
+    
+    # Buat salinan figure agar tidak mengubah grafik yang ditampilkan
+    fig_copy = pio.from_json(_fig_json)
+    
+    # Tambahkan judul jika ada
+    if title:
+        fig_copy.update_layout(
+            title=dict(
+                text=title,
+                font=dict(size=24, family='Poppins', color='#667eea'),
+                x=0.5,
+                xanchor='center'
+            )
+        )
+    
+    # Tambahkan background putih untuk tampilan yang bersih
+    fig_copy.update_layout(
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#1a1a1a'),
+        width=1600,
+        height=1000
+    )
+    
+    # Konversi ke HTML interaktif yang bisa dibuka di browser
+    html_string = pio.to_html(
+        fig_copy, 
+        include_plotlyjs='cdn',
+        config={
+            'toImageButtonOptions': {
+                'format': 'png',
+                'filename': filename,
+                'height': 1000,
+                'width': 1600,
+                'scale': 2
+            },
+            'displayModeBar': True,
+            'displaylogo': False,
+            'modeBarButtonsToAdd': ['downloadImage']
+        }
+    )
+    return html_string.encode()
+
 def create_download_button_for_chart(fig, filename, title=""):
     """
     Fungsi untuk membuat tombol download grafik Plotly dengan judul
-    Menggunakan HTML interaktif (tanpa kaleido) yang kompatibel dengan Streamlit
+    
+    HTML baru dibuat saat tombol diklik (data berupa callable) dan di-cache per
+    fingerprint figure, sehingga halaman tidak lagi memuat HTML base64 setiap rerun.
     
     Parameters:
     - fig: Figure Plotly
@@ -41,174 +130,187 @@ def create_download_button_for_chart(fig, filename, title=""):
     - title: Judul yang akan ditambahkan di atas grafik
     """
     try:
-        import plotly.io as pio
-        
-        # Buat salinan figure agar tidak mengubah grafik yang ditampilkan
-        fig_copy = go.Figure(fig)
-        
-        # Tambahkan judul jika ada
-        if title:
-            fig_copy.update_layout(
-                title=dict(
-                    text=title,
-                    font=dict(size=24, family='Poppins', color='#667eea'),
-                    x=0.5,
-                    xanchor='center'
-                )
-            )
-        
-        # Tambahkan background putih untuk tampilan yang bersih
-        fig_copy.update_layout(
-            paper_bgcolor='white',
-            plot_bgcolor='white',
-            font=dict(color='#1a1a1a'),
-            width=1600,
-            height=1000
-        )
-        
-        # Konversi ke HTML interaktif yang bisa dibuka di browser
-        html_string = pio.to_html(
-            fig_copy, 
-            include_plotlyjs='cdn',
-            config={
-                'toImageButtonOptions': {
-                    'format': 'png',
-                    'filename': filename,
-                    'height': 1000,
-                    'width': 1600,
-                    'scale': 2
-                },
-                'displayModeBar': True,
-                'displaylogo': False,
-                'modeBarButtonsToAdd': ['downloadImage']
-            }
+        fig_json = fig.to_json()
+        fingerprint = chart_fingerprint(fig_json, filename, title)
+        
+        st.download_button(
+            label="📥 Download Grafik (HTML)",
+            data=lambda: render_chart_html(fingerprint, fig_json, filename, title),
+            file_name=f"{filename}.html",
+            mime="text/html",
+            key=f"download_grafik_{filename}",
+            on_click="ignore"
         )
-        
-        # Encode ke base64
-        html_bytes = html_string.encode()
-        b64 = base64.b64encode(html_bytes).decode()
-        
-        # Buat tombol download HTML
-        href = f'<a href="data:text/html;base64,{b64}" download="{filename}.html" style="text-decoration: none;">' \
-               f'<button style="' \
-               f'background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);' \
-               f'color: white;' \
-               f'border: none;' \
-               f'border-radius: 12px;' \
-               f'padding: 0.8rem 1.5rem;' \
-               f'font-weight: 600;' \
-               f'font-size: 1rem;' \
-               f'font-family: Poppins, sans-serif;' \
-               f'cursor: pointer;' \
-               f'box-shadow: 0 4px 12px rgba(102, 126, 234, 0.3);' \
-               f'transition: all 0.3s ease;' \
-               f'" ' \
-               f'onmouseover="this.style.transform=\'translateY(-2px)\'; this.style.boxShadow=\'0 6px 20px rgba(102, 126, 234, 0.4)\';" ' \
-               f'onmouseout="this.style.transform=\'translateY(0)\'; this.style.boxShadow=\'0 4px 12px rgba(102, 126, 234, 0.3)\';">' \
-               f'📥 Download Grafik (HTML)</button></a>'
-        
-        st.markdown(href, unsafe_allow_html=True)
         st.caption("💡 Buka file HTML di browser, lalu gunakan tombol 📷 (camera) untuk download PNG")
         
     except Exception as e:
         st.error(f"⚠️ Tidak dapat membuat tombol download: {str(e)}")
         st.info("💡 Tip: Gunakan tombol kamera 📷 di pojok kanan atas grafik untuk screenshot manual")
 
-def create_static_map_image(data_gdf_merged, title="Peta Sebaran Stunting Per Desa"):
+def create_static_map_image(data_gdf_merged, title="Peta Sebaran Stunting Per Desa", progress=None):
     """
     Fungsi untuk membuat peta statis menggunakan matplotlib yang bisa didownload
     
+    Memakai API Figure (tanpa pyplot) sehingga aman dijalankan di thread latar
+    belakang. data_gdf_merged tidak diubah.
+    
     Parameters:
     - data_gdf_merged: GeoDataFrame yang sudah di-merge dengan data stunting
     - title: Judul peta
+    - progress: Callback opsional progress(fraksi, teks) untuk indikator proses
     
     Returns:
     - img_bytes: Image dalam format bytes
     """
-    try:
-        # Buat figure dengan size besar
-        fig, ax = plt.subplots(1, 1, figsize=(20, 16))
-        
-        # Fungsi warna
-        def get_color(persen_stunting):
-            if persen_stunting == 0:
-                return '#e0e0e0'
-            elif persen_stunting < 5:
-                return '#fff3cd'
-            elif persen_stunting < 10:
-                return '#ffcc80'
-            elif persen_stunting < 15:
-                return '#ff8c42'
-            elif persen_stunting < 20:
-                return '#ff6b6b'
-            else:
-                return '#d9534f'
-        
-        # Plot peta
-        data_gdf_merged['color'] = data_gdf_merged['persen_stunting'].apply(get_color)
-        data_gdf_merged.plot(
-            ax=ax,
-            color=data_gdf_merged['color'],
-            edgecolor='#34495e',
-            linewidth=0.5
-        )
-        
-        # Tambahkan label untuk setiap desa
-        for idx, row in data_gdf_merged.iterrows():
-            if row['persen_stunting'] > 0:
-                centroid = row['geometry'].centroid
-                ax.annotate(
-                    text=f"{row['NAMOBJ']}\n{row['persen_stunting']:.1f}%",
-                    xy=(centroid.x, centroid.y),
-                    fontsize=6,
-                    ha='center',
-                    va='center',
-                    bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.7, edgecolor='none')
-                )
-        
-        # Styling
-        ax.set_title(title, fontsize=28, fontweight='bold', color='#667eea', pad=20, fontfamily='sans-serif')
-        ax.axis('off')
-        
-        # Legend
-        legend_elements = [
-            mpatches.Patch(facecolor='#e0e0e0', edgecolor='#ccc', label='Tidak ada data'),
-            mpatches.Patch(facecolor='#fff3cd', edgecolor='#ffeeba', label='< 5% (Sangat Rendah)'),
-            mpatches.Patch(facecolor='#ffcc80', edgecolor='#ffb84d', label='5-10% (Rendah)'),
-            mpatches.Patch(facecolor='#ff8c42', edgecolor='#ff7700', label='10-15% (Sedang)'),
-            mpatches.Patch(facecolor='#ff6b6b', edgecolor='#ff5555', label='15-20% (Tinggi)'),
-            mpatches.Patch(facecolor='#d9534f', edgecolor='#c9302c', label='> 20% (Sangat Tinggi)')
-        ]
-        
-        ax.legend(
-            handles=legend_elements,
-            loc='lower left',
-            fontsize=12,
-            title='Prevalensi Stunting',
-            title_fontsize=14,
-            frameon=True,
-            fancybox=True,
-            shadow=True
+    def lapor(fraksi, teks):
+        if progress is not None:
+            progress(fraksi, teks)
+    
+    # Buat figure dengan size besar
+    fig = Figure(figsize=(20, 16))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    
+    # Plot peta (warna dari kolom klasifikasi jika sudah dihitung)
+    lapor(0.05, "Menggambar batas desa...")
+    if 'warna_stunting' in data_gdf_merged.columns:
+        colors = data_gdf_merged['warna_stunting'].to_numpy()
+    else:
+        colors = stunting_colors(data_gdf_merged['persen_stunting'])
+    data_gdf_merged.plot(
+        ax=ax,
+        color=colors,
+        edgecolor='#34495e',
+        linewidth=0.5
+    )
+    
+    # Tambahkan label untuk setiap desa (titik label dari artefak geometri)
+    berlabel = data_gdf_merged[data_gdf_merged['persen_stunting'] > 0]
+    total = max(len(berlabel), 1)
+    for n, (nama, persen, x, y) in enumerate(zip(
+        berlabel['NAMOBJ'], berlabel['persen_stunting'], berlabel['label_x'], berlabel['label_y']
+    ), 1):
+        ax.annotate(
+            text=f"{nama}\n{persen:.1f}%",
+            xy=(x, y),
+            fontsize=6,
+            ha='center',
+            va='center',
+            bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.7, edgecolor='none')
         )
-        
-        # Tambahkan watermark
-        fig.text(0.99, 0.01, 'Dinas Kesehatan Kabupaten Kuningan', 
-                ha='right', va='bottom', fontsize=10, color='gray', alpha=0.7)
-        
-        plt.tight_layout()
-        
-        # Konversi ke bytes
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight', facecolor='white')
-        buf.seek(0)
-        img_bytes = buf.read()
-        plt.close(fig)
-        
-        return img_bytes
-        
-    except Exception as e:
-        st.error(f"⚠️ Error membuat peta statis: {str(e)}")
-        return None
+        if n % 50 == 0:
+            lapor(0.1 + 0.3 * n / total, "Menambahkan label desa...")
+    
+    # Styling
+    ax.set_title(title, fontsize=28, fontweight='bold', color='#667eea', pad=20, fontfamily='sans-serif')
+    ax.axis('off')
+    
+    # Legend
+    legend_elements = [
+        mpatches.Patch(facecolor=kelas['warna'], edgecolor=kelas['tepi'], label=kelas['label'])
+        for kelas in KELAS_PETA
+    ]
+    
+    ax.legend(
+        handles=legend_elements,
+        loc='lower left',
+        fontsize=12,
+        title='Prevalensi Stunting',
+        title_fontsize=14,
+        frameon=True,
+        fancybox=True,
+        shadow=True
+    )
+    
+    # Tambahkan watermark
+    fig.text(0.99, 0.01, 'Dinas Kesehatan Kabupaten Kuningan', 
+            ha='right', va='bottom', fontsize=10, color='gray', alpha=0.7)
+    
+    fig.tight_layout()
+    
+    # Konversi ke bytes
+    lapor(0.45, "Merender PNG 300 DPI...")
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=300, bbox_inches='tight', facecolor='white')
+    lapor(1.0, "Selesai")
+    
+    return buf.getvalue()
+
+def static_map_key(data_gdf_merged, title):
+    """Hash isi peta statis (geometri, nama, persentase stunting) dan judul"""
+    h = hashlib.sha256(title.encode())
+    h.update(pd.util.hash_pandas_object(
+        data_gdf_merged[['NAMOBJ', 'persen_stunting']], index=False
+    ).values.tobytes())
+    h.update(b"".join(shapely.to_wkb(data_gdf_merged.geometry.values)))
+    return h.hexdigest()
+
+class RenderJobs:
+    """
+    Menjalankan render berat (peta statis) di thread latar belakang
+    
+    Hasil disimpan per kunci (hash input) dengan batas jumlah entri, sehingga
+    permintaan yang sama dari sesi mana pun langsung memakai hasil yang sudah ada.
+    """
+    
+    def __init__(self, max_entries=4, max_workers=1):
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="render")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def failed(job):
+        """Exception render jika job sudah selesai dengan error, selain itu None"""
+        return job['future'].exception() if job['future'].done() else None
+    
+    def submit(self, key, fn, *args, **kwargs):
+        """Jadwalkan fn(*args, progress=...) jika kunci belum diproses (render yang gagal diulang)"""
+        with self._lock:
+            if key in self._jobs and self.failed(self._jobs[key]) is None:
+                self._jobs.move_to_end(key)
+                return self._jobs[key]
+            job = {'progress': 0.0, 'status': "Menunggu antrean...", 'future': None}
+            
+            def progress(fraksi, teks):
+                job['progress'] = fraksi
+                job['status'] = teks
+            
+            job['future'] = self._executor.submit(fn, *args, progress=progress, **kwargs)
+            self._jobs[key] = job
+            
+            # Buang hasil lama yang sudah selesai jika melebihi batas
+            for old_key in list(self._jobs):
+                if len(self._jobs) <= self.max_entries:
+                    break
+                if self._jobs[old_key]['future'].done():
+                    del self._jobs[old_key]
+            return job
+    
+    def get(self, key):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+            return job
+    
+    def discard(self, key):
+        """Lupakan hasil satu kunci (misalnya render yang gagal) agar bisa diminta lagi"""
+        with self._lock:
+            self._jobs.pop(key, None)
+
+@st.cache_resource
+def get_render_jobs():
+    """Satu antrean render yang dipakai bersama oleh semua sesi"""
+    return RenderJobs()
+
+@st.fragment(run_every=1.0)
+def poll_render_job(key):
+    """Tampilkan progress render dan muat ulang halaman ketika selesai"""
+    job = get_render_jobs().get(key)
+    if job is None or job['future'].done():
+        st.rerun()
+    st.progress(job['progress'], text=f"🔄 {job['status']}")
 
 def create_download_button_for_map(img_bytes, filename):
     """
@@ -219,27 +321,13 @@ def create_download_button_for_map(img_bytes, filename):
     - filename: Nama file output (tanpa ekstensi)
     """
     if img_bytes:
-        b64 = base64.b64encode(img_bytes).decode()
-        
-        href = f'<a href="data:image/png;base64,{b64}" download="{filename}.png" style="text-decoration: none;">' \
-               f'<button style="' \
-               f'background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);' \
-               f'color: white;' \
-               f'border: none;' \
-               f'border-radius: 12px;' \
-               f'padding: 0.8rem 1.5rem;' \
-               f'font-weight: 600;' \
-               f'font-size: 1rem;' \
-               f'font-family: Poppins, sans-serif;' \
-               f'cursor: pointer;' \
-               f'box-shadow: 0 4px 12px rgba(102, 126, 234, 0.3);' \
-               f'transition: all 0.3s ease;' \
-               f'" ' \
-               f'onmouseover="this.style.transform=\'translateY(-2px)\'; this.style.boxShadow=\'0 6px 20px rgba(102, 126, 234, 0.4)\';" ' \
-               f'onmouseout="this.style.transform=\'translateY(0)\'; this.style.boxShadow=\'0 4px 12px rgba(102, 126, 234, 0.3)\';">' \
-               f'📥 Download Peta (PNG Resolusi Tinggi)</button></a>'
-        
-        st.markdown(href, unsafe_allow_html=True)
+        # File disajikan lewat media server Streamlit, tidak di-embed base64 ke halaman
+        st.download_button(
+            label="📥 Download Peta (PNG Resolusi Tinggi)",
+            data=img_bytes,
+            file_name=f"{filename}.png",
+            mime="image/png"
+        )
 
 # Custom CSS - DIPERCANTIK
 st.markdown("""
@@ -605,212 +693,501 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ============================================================================
-# FUNGSI ETL BARU (MENGGANTIKAN YANG LAMA)
+# FUNGSI CACHE HASIL ETL
 # ============================================================================
 
-def convert_html_xls_to_xlsx(input_path, output_path):
-    """Konversi file XLS HTML ke XLSX"""
-    try:
-        with open(input_path, "r", encoding="utf-8", errors="ignore") as f:
-            html = f.read()
-        soup = BeautifulSoup(html, "html.parser")
-        
-        raw_text = soup.get_text("\n", strip=True)
-        match = re.search(r'Data Tanggal\s*:\s*([0-9:\-\s]+)', raw_text)
-        tanggal_info = match.group(0) if match else ""
+class ETLCache:
+    """
+    Cache LRU untuk hasil proses_etl (df_fact, df_wilayah, df_waktu) atau
+    file sumber yang sudah diparse (time_str, df_body)
 
-        table = soup.find("table")
-        if not table:
-            return input_path
+    Cache dibagi ke semua sesi pengguna, sehingga dibatasi jumlah entri dan
+    ukuran memorinya. Entri yang paling lama tidak dipakai dibuang lebih dulu.
 
-        wb = Workbook()
-        ws = wb.active
-        
-        row_idx = 1
-        if tanggal_info:
-            ws.cell(row=row_idx, column=1).value = tanggal_info
-            row_idx += 2 
-
-        for row in table.find_all("tr"):
-            col_idx = 1
-            for cell in row.find_all(["td", "th"]):
-                txt = cell.get_text(strip=True)
-                colspan = int(cell.get("colspan", 1))
-                rowspan = int(cell.get("rowspan", 1))
-                
-                while isinstance(ws.cell(row=row_idx, column=col_idx), MergedCell):
-                    col_idx += 1
-                
-                ws.cell(row=row_idx, column=col_idx).value = txt
-                if colspan > 1 or rowspan > 1:
-                    ws.merge_cells(start_row=row_idx, start_column=col_idx, 
-                                   end_row=row_idx+rowspan-1, end_column=col_idx+colspan-1)
-                col_idx += colspan
-            row_idx += 1
-            
-        wb.save(output_path)
-        return output_path
-    except Exception as e:
-        return input_path
-
-def ensure_xlsx(file_path):
-    """Pastikan file dalam format XLSX"""
-    root, ext = os.path.splitext(file_path)
-    if ext.lower() == ".xls":
-        output_path = root + ".xlsx"
-        if os.path.exists(output_path):
-            return output_path
-        return convert_html_xls_to_xlsx(file_path, output_path)
-    return file_path
-
-def clean_dataframe(df, col_name_check):
-    """Membersihkan baris kosong, baris 'Jumlah', dan baris sampah"""
-    df = df.dropna(subset=[col_name_check])
-    df = df[~df[col_name_check].astype(str).str.contains("Jumlah|Total|Puskesmas|No", case=False, na=False)]
-    return df
-
-def clean_name(text):
-    """Membersihkan nama wilayah"""
-    return str(text).strip().upper() if pd.notnull(text) else ""
-
-def safe_to_numeric(series):
-    """Konversi ke numeric dengan aman"""
-    return pd.to_numeric(series, errors='coerce').fillna(0)
-
-def proses_etl(file_gizi, file_sasaran):
-    """
-    Proses ETL dengan kode baru yang menggunakan 2 file input:
-    - file_gizi: File status gizi
-    - file_sasaran: File sasaran balita
+    Parameters:
+    - max_entries: Jumlah maksimum hasil ETL yang disimpan
+    - max_bytes: Batas total ukuran memori (perkiraan) semua entri
     """
-    try:
-        # Konversi file jika diperlukan
-        real_file_gizi = ensure_xlsx(file_gizi)
-        real_file_sasaran = ensure_xlsx(file_sasaran)
-        
-        # 1. DIMENSI WAKTU
-        df_time = pd.read_excel(real_file_gizi, nrows=1, header=None)
-        time_str = str(df_time.iloc[0, 0])
-        match = re.search(r'(\d{4})-(\d{2})-(\d{2})\s+(\d{2}):(\d{2}):(\d{2})', time_str)
-        
-        if match:
-            tahun, bulan_num, tanggal, jam, menit, _ = map(int, match.groups())
-            bulan_map = {
-                1:'JANUARI', 2:'FEBRUARI', 3:'MARET', 4:'APRIL', 5:'MEI', 6:'JUNI',
-                7:'JULI', 8:'AGUSTUS', 9:'SEPTEMBER', 10:'OKTOBER', 11:'NOVEMBER', 12:'DESEMBER'
+
+    def __init__(self, max_entries=8, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ukuran(hasil):
+        return sum(
+            int(df.memory_usage(deep=True).sum()) if isinstance(df, pd.DataFrame) else len(str(df))
+            for df in hasil
+        )
+
+    @staticmethod
+    def _salin(hasil):
+        return tuple(df.copy() if isinstance(df, pd.DataFrame) else df for df in hasil)
+
+    def get(self, key):
+        """Ambil hasil ETL dari cache, None jika belum ada"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Salinan agar perubahan kolom di halaman tidak mengotori cache bersama
+        return self._salin(entry[0])
+
+    def put(self, key, hasil):
+        """Simpan hasil ETL lalu buang entri terlama jika melebihi batas"""
+        hasil = self._salin(hasil)
+        ukuran = self._ukuran(hasil)
+        with self._lock:
+            self._entries[key] = (hasil, ukuran)
+            self._entries.move_to_end(key)
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self.total_bytes() > self.max_bytes
+            ):
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def total_bytes(self):
+        return sum(ukuran for _, ukuran in self._entries.values())
+
+    def stats(self):
+        """Statistik cache: jumlah hit, miss, entri dan ukuran memori"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes(),
             }
-            bulan_str = bulan_map.get(bulan_num, 'UNKNOWN')
-        else:
-            tahun, bulan_str, tanggal, jam, menit = 2025, 'UNKNOWN', 1, 0, 0
-        
-        df_waktu = pd.DataFrame([{
-            'id_waktu': 1, 'tahun': tahun, 'bulan': bulan_str, 
-            'tanggal': tanggal, 'jam': jam, 'menit': menit
-        }])
-        
-        # 2. PROSES STATUS GIZI
-        df_gizi = pd.read_excel(real_file_gizi, skiprows=3, header=None)
-        
-        cols_gizi = [
-            'no', 'puskesmas', 'desa',
-            'bbu_sangat_kurang', 'bbu_kurang', 'bbu_normal', 'bbu_risiko_lebih', 'bbu_outlier',
-            'tbu_sangat_pendek', 'tbu_pendek', 'tbu_normal', 'tbu_tinggi', 'tbu_outlier',
-            'bbtb_gizi_buruk', 'bbtb_gizi_kurang', 'bbtb_normal', 'bbtb_risiko_gizi_lebih', 
-            'bbtb_gizi_lebih', 'bbtb_obesitas'
-        ]
-        df_gizi = df_gizi.iloc[:, :len(cols_gizi)]
-        df_gizi.columns = cols_gizi
-        
-        # Bersihkan data
-        df_gizi = clean_dataframe(df_gizi, 'puskesmas')
-        
-        df_gizi['puskesmas_clean'] = df_gizi['puskesmas'].apply(clean_name)
-        df_gizi['desa_clean'] = df_gizi['desa'].apply(clean_name)
-        df_gizi['join_key'] = df_gizi['puskesmas_clean'] + "_" + df_gizi['desa_clean']
-        
-        # Konversi angka & hitung
-        for col in cols_gizi[3:]:
-            df_gizi[col] = safe_to_numeric(df_gizi[col])
-        
-        df_gizi['jumlah_ditimbang_d'] = df_gizi[['bbu_sangat_kurang', 'bbu_kurang', 'bbu_normal', 'bbu_risiko_lebih', 'bbu_outlier']].sum(axis=1)
-        df_gizi['jumlah_kurang_gizi'] = df_gizi['bbu_sangat_kurang'] + df_gizi['bbu_kurang']
-        df_gizi['jumlah_stunting'] = df_gizi['tbu_sangat_pendek'] + df_gizi['tbu_pendek']
-        df_gizi['jumlah_wasting'] = df_gizi['bbtb_gizi_buruk'] + df_gizi['bbtb_gizi_kurang']
-        
-        # 3. PROSES SASARAN BALITA
-        df_sasaran = pd.read_excel(real_file_sasaran, skiprows=3, header=None)
-        df_sasaran = df_sasaran.iloc[:, :6]
-        df_sasaran.columns = ['no', 'puskesmas', 'desa', 'sasaran_laki', 'sasaran_perempuan', 'sasaran_total']
-        
-        df_sasaran = clean_dataframe(df_sasaran, 'puskesmas')
-        
-        df_sasaran['puskesmas_clean'] = df_sasaran['puskesmas'].apply(clean_name)
-        df_sasaran['desa_clean'] = df_sasaran['desa'].apply(clean_name)
-        df_sasaran['join_key'] = df_sasaran['puskesmas_clean'] + "_" + df_sasaran['desa_clean']
-        
-        for col in ['sasaran_laki', 'sasaran_perempuan', 'sasaran_total']:
-            df_sasaran[col] = safe_to_numeric(df_sasaran[col])
-        
-        df_sasaran_join = df_sasaran[['join_key', 'sasaran_laki', 'sasaran_perempuan', 'sasaran_total']]
-        
-        # 4. GABUNG DATA
-        df_gabung = pd.merge(df_gizi, df_sasaran_join, on='join_key', how='left')
-        df_gabung['sasaran_total'] = df_gabung['sasaran_total'].fillna(0)
-        
-        # Hitung persentase
-        def calc_percent(num, denom):
-            return (num / denom.replace(0, 1)) * 100
-        
-        df_gabung['persentase_ds'] = calc_percent(df_gabung['jumlah_ditimbang_d'], df_gabung['sasaran_total'])
-        df_gabung['persen_kurang_gizi'] = calc_percent(df_gabung['jumlah_kurang_gizi'], df_gabung['jumlah_ditimbang_d'])
-        df_gabung['persen_stunting'] = calc_percent(df_gabung['jumlah_stunting'], df_gabung['jumlah_ditimbang_d'])
-        df_gabung['persen_wasting'] = calc_percent(df_gabung['jumlah_wasting'], df_gabung['jumlah_ditimbang_d'])
-        
-        df_gabung = df_gabung[df_gabung['join_key'] != "_"]
-        
-        # 5. DIMENSI WILAYAH
-        df_wilayah = df_gabung[['puskesmas', 'desa']].drop_duplicates().reset_index(drop=True)
-        df_wilayah.insert(0, 'id_wilayah', range(1, 1 + len(df_wilayah)))
-        
-        # 6. FACT TABLE
-        df_fact = pd.merge(df_gabung, df_wilayah, on=['puskesmas', 'desa'], how='left')
-        df_fact['id_waktu'] = 1
-        
-        cols_final = [
-            'id_wilayah', 'id_waktu', 'puskesmas', 'desa',
-            'sasaran_total', 'sasaran_laki', 'sasaran_perempuan',
-            'jumlah_ditimbang_d', 'persentase_ds',
-            'jumlah_kurang_gizi', 'persen_kurang_gizi',
-            'jumlah_stunting', 'persen_stunting',
-            'jumlah_wasting', 'persen_wasting',
-            'bbu_sangat_kurang', 'bbu_kurang',
-            'tbu_sangat_pendek', 'tbu_pendek',
-            'bbtb_gizi_buruk', 'bbtb_gizi_kurang', 'bbtb_obesitas'
-        ]
-        
-        df_fact_final = df_fact[cols_final]
-        
-        return df_fact_final, df_wilayah, df_waktu, True, "Proses ETL berhasil!"
+
+@st.cache_resource
+def get_etl_cache():
+    """Satu instance ETLCache yang dipakai bersama oleh semua sesi"""
+    return ETLCache()
+
+@st.cache_resource
+def get_upload_cache():
+    """Cache file sumber terparse per isi file, dipakai bersama oleh semua sesi"""
+    return ETLCache(max_entries=16, max_bytes=128 * 1024 * 1024)
+
+def baca_sumber_cached(data):
+    """
+    read_source_excel dengan cache per isi file (content-addressed)
+
+    Setiap file upload yang berbeda hanya diparse sekali, langsung dari bytes
+    di memori (tanpa file temporary yang harus dibersihkan). Mengganti salah
+    satu file saja tidak memparse ulang file pasangannya.
+    """
+    cache = get_upload_cache()
+    h = hashlib.sha256(ETL_PARSER_VERSION.encode())
+    h.update(data)
+    key = h.hexdigest()
+
+    hasil = cache.get(key)
+    if hasil is None:
+        hasil = read_source_excel(data)
+        cache.put(key, hasil)
+    return hasil
+
+def proses_etl_cached(bytes_gizi, bytes_sasaran, key):
+    """
+    Jalankan proses_etl hanya jika kombinasi file belum pernah diproses
+
+    Parameters:
+    - bytes_gizi, bytes_sasaran: Isi kedua file upload
+    - key: etl_cache_key kedua file (dihitung sekali per rerun oleh pemanggil)
+
+    Returns:
+    - Tuple sama seperti proses_etl
+    """
+    cache = get_etl_cache()
+
+    hasil = cache.get(key)
+    if hasil is not None:
+        df_fact, df_wilayah, df_waktu = hasil
+        return df_fact, df_wilayah, df_waktu, True, "Proses ETL berhasil!"
+
+    waktu_baca = {}
+    df_fact, df_wilayah, df_waktu, success, message = proses_etl(
+        bytes_gizi, bytes_sasaran, baca=baca_sumber_cached, waktu_baca=waktu_baca
+    )
+
+    if success:
+        cache.put(key, (df_fact, df_wilayah, df_waktu))
+        # Lama parse per file (≈0 jika file sudah ada di cache file sumber)
+        st.session_state.waktu_baca = waktu_baca
+
+    return df_fact, df_wilayah, df_waktu, success, message
+
+# ============================================================================
+# FUNGSI GUDANG DATA RIWAYAT (MULTI-PERIODE)
+# ============================================================================
+
+@st.cache_resource
+def get_warehouse():
+    """Gudang data riwayat bersama untuk semua sesi"""
+    return Warehouse(WAREHOUSE_DIR)
+
+def simpan_ke_gudang(df_fact, df_wilayah, df_waktu, nama_bulan, sumber, timpa=False):
+    """
+    Simpan hasil ETL ke gudang data riwayat sebagai periode bulan data
+
+    Tahun periode ditebak dari waktu penarikan file. Jika gudang tidak bisa
+    ditulis, atau periode sudah berisi file sumber lain dan timpa=False, hasil
+    ETL tetap dipakai tanpa disimpan.
+
+    Parameters:
+    - df_fact, df_wilayah, df_waktu: Hasil proses_etl
+    - nama_bulan: Bulan data yang dipilih di sidebar
+    - sumber: Hash isi kedua file sumber (etl_cache_key)
+    - timpa: Ganti periode yang sudah berisi file sumber lain
+
+    Returns:
+    - Tuple (df_fact, df_wilayah, df_waktu) dengan kunci gudang
+    """
+    bulan = nomor_bulan(nama_bulan)
+    tahun = tebak_tahun_data(bulan, df_waktu)
     
-    except Exception as e:
-        return None, None, None, False, f"Error: {str(e)}"
+    try:
+        hasil = get_warehouse().upsert(df_fact, df_wilayah, df_waktu, tahun, bulan, sumber=sumber, timpa=timpa)
+    except PeriodeTerisi as e:
+        st.sidebar.warning(f"⚠️ {label_periode(e.id_waktu)} sudah berisi data upload lain, tidak ditimpa. "
+                           "Periksa bulan data, atau centang \"Timpa\" lalu simpan lagi.")
+        return df_fact, df_wilayah, df_waktu
+    except (ImportError, OSError) as e:
+        st.sidebar.warning(f"⚠️ Data tidak tersimpan ke riwayat: {str(e)}")
+        return df_fact, df_wilayah, df_waktu
+    
+    st.sidebar.caption(f"💾 Tersimpan di riwayat sebagai periode {label_periode(id_periode(tahun, bulan))}")
+    return hasil
+
+def periode_sumber(sumber):
+    """Label periode gudang yang berisi file sumber ini (kosong jika belum disimpan)"""
+    dim_waktu = get_warehouse().dim_waktu()
+    return [label_periode(p) for p in dim_waktu.loc[dim_waktu['sumber'] == sumber, 'id_waktu']]
+
+# ============================================================================
+# FUNGSI KUBUS AGREGAT (DESA -> PUSKESMAS -> KECAMATAN -> KABUPATEN)
+# ============================================================================
+
+# Nama kolom tabel agregat tampilan -> kolom kubus
+KOLOM_TABEL_AGREGAT = {
+    'jumlah_balita_ditimbang': 'jumlah_ditimbang_d',
+    'jumlah_balita_stunting': 'jumlah_stunting',
+    'jumlah_balita_kurang_gizi': 'jumlah_kurang_gizi',
+    'jumlah_balita_wasting': 'jumlah_wasting',
+    'sasaran_total': 'sasaran_total',
+    'persentase_stunting': 'persen_stunting',
+    'persentase_kurang_gizi': 'persen_kurang_gizi',
+    'persentase_wasting': 'persen_wasting',
+    'persentase_sasaran': 'persentase_ds',
+}
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def lengkapi_wilayah(df_wilayah):
+    """
+    Dimensi wilayah dengan id_geo dan kecamatan dari indeks wilayah (termasuk alias)
+
+    Returns:
+    - Tuple (df_wilayah dengan id_geo & kecamatan, dict cakupan, DataFrame desa yang perlu dicek)
+    """
+    hasil = resolve_wilayah(df_wilayah, detail=True)
+    perlu_cek = hasil.loc[
+        hasil['metode'].isin(['mirip', 'tidak ditemukan']), ['puskesmas', 'desa', 'metode', 'usulan', 'skor']
+    ].reset_index(drop=True)
+    return hasil.drop(columns=['metode', 'skor', 'usulan']), cakupan(hasil), perlu_cek
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def hitung_kubus(df_fact, df_wilayah):
+    """
+    Kubus agregat satu dataset; semua tab membaca level dari sini
+
+    Parameters:
+    - df_fact: Fakta satu periode
+    - df_wilayah: Dimensi wilayah dengan kolom kecamatan (lihat lengkapi_wilayah)
+
+    Returns:
+    - dict level -> DataFrame (lihat rollup.build_cube)
+    """
+    fact = df_fact.drop(columns='kecamatan', errors='ignore').merge(
+        df_wilayah[['id_wilayah', 'kecamatan']], on='id_wilayah', how='left'
+    )
+    fact['kecamatan'] = fact['kecamatan'].fillna('N/A')
+    return build_cube(fact)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def data_per_fitur(df_fact, df_wilayah):
+    """
+    Data stunting per fitur shapefile (id_geo) untuk peta
+
+    Fakta digabung lewat id_geo indeks wilayah (merge integer); jika beberapa
+    pasangan puskesmas/desa menunjuk fitur yang sama, jumlahnya digabung dan
+    persentase dihitung ulang sehingga setiap fitur tetap satu baris.
+    """
+    fact = df_fact.merge(df_wilayah[['id_wilayah', 'id_geo']], on='id_wilayah', how='inner')
+    fact = fact[fact['id_geo'] != TANPA_FITUR]
+    # puskesmas bertipe category (skema.py); gabungan nama harus string biasa
+    fact = fact.assign(puskesmas=fact['puskesmas'].astype(str))
+    per_fitur = fact.groupby('id_geo', as_index=False).agg(
+        puskesmas=('puskesmas', lambda s: ", ".join(dict.fromkeys(s))),
+        **{kolom: (kolom, 'sum') for kolom in KOLOM_JUMLAH}
+    )
+    return hitung_indikator(per_fitur.astype({kolom: 'int64' for kolom in KOLOM_JUMLAH}))
+
+def tabel_agregat(tabel, nama_kolom):
+    """Satu level kubus dengan nama kolom tabel tampilan (jumlah_balita_*, persentase_*)"""
+    hasil = pd.DataFrame({nama_kolom: tabel['wilayah'].to_numpy()})
+    for kolom, sumber in KOLOM_TABEL_AGREGAT.items():
+        hasil[kolom] = tabel[sumber].to_numpy()
+    return hasil
+
+# ============================================================================
+# FUNGSI TABEL DATA (TAB 4)
+# ============================================================================
+
+# Jumlah baris per halaman tabel data; hanya satu halaman yang dikirim ke browser
+UKURAN_HALAMAN_TABEL = 100
+
+# Kolom tabel data (kolom fakta -> judul); angka tetap numerik dan diformat oleh
+# column_config sehingga pengurutan di tabel tetap berdasarkan nilai
+KOLOM_TABEL_DATA = {
+    'desa': 'Desa',
+    'kecamatan': 'Kecamatan',
+    'puskesmas': 'Puskesmas',
+    'sasaran_total': 'Sasaran (Sa)',
+    'jumlah_ditimbang_d': 'Ditimbang (D)',
+    'persentase_ds': 'Prevalensi Sasaran (D/Sa)',
+    'jumlah_stunting': 'Stunting (S)',
+    'persen_stunting': 'Prevalensi Stunting (S/D)',
+    'jumlah_kurang_gizi': 'Underweight (U)',
+    'persen_kurang_gizi': 'Prevalensi Underweight (U/D)',
+    'jumlah_wasting': 'Wasting (W)',
+    'persen_wasting': 'Prevalensi Wasting (W/D)',
+    'kategori': 'Kategori',
+}
+
+KONFIGURASI_TABEL_DATA = {
+    kolom: (
+        st.column_config.NumberColumn(judul, format="%.2f%%") if kolom.startswith('persen')
+        else st.column_config.NumberColumn(judul, format="localized") if kolom in KOLOM_JUMLAH
+        else st.column_config.TextColumn(judul)
+    )
+    for kolom, judul in KOLOM_TABEL_DATA.items()
+}
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def tabel_data(df_fact, df_wilayah):
+    """
+    Tabel data per desa (kolom KOLOM_TABEL_DATA) dengan kecamatan dan kategori
+
+    Kategori berupa Categorical terurut dengan penanda warna, dihitung sekali
+    untuk seluruh kolom (tanpa Styler per baris).
+    """
+    tabel = df_fact.merge(df_wilayah[['id_wilayah', 'kecamatan']], on='id_wilayah', how='left')
+    tabel['kecamatan'] = tabel['kecamatan'].fillna('N/A')
+    tabel['kategori'] = table_category(tabel['persen_stunting'], ikon=True)
+    return tabel[list(KOLOM_TABEL_DATA)]
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def indeks_tabel_data(df_fact, df_wilayah):
+    """Indeks pencarian nama desa/kecamatan/puskesmas tabel data (sekali per dataset)"""
+    return index_wilayah(tabel_data(df_fact, df_wilayah))
 
 # ============================================================================
 # FUNGSI LOAD SHAPEFILE
 # ============================================================================
 
+# Anggaran ukuran GeoJSON peta folium (byte): tampilan kabupaten dan saat zoom ke desa
+PETA_PAYLOAD_BUDGET = 400 * 1024
+PETA_PAYLOAD_BUDGET_ZOOM = 1024 * 1024
+
+# Atribut yang ikut dikirim ke peta folium (tooltip & warna)
+KOLOM_PETA = [
+    'NAMOBJ', 'WADMKC', 'puskesmas', 'jumlah_ditimbang_d', 'sasaran_total',
+    'persentase_ds', 'jumlah_stunting', 'persen_stunting', 'warna_stunting'
+]
+
 @st.cache_data
 def load_shapefile(shp_path):
-    """Load shapefile untuk peta"""
+    """Load geometri desa untuk peta (artefak GeoParquet jika ada, fallback ke shapefile)"""
     try:
-        gdf = gpd.read_file(shp_path)
-        if gdf.crs != "EPSG:4326":
-            gdf = gdf.to_crs(epsg=4326)
-        return gdf
+        return load_geodata(shp_path)
     except Exception as e:
         st.error(f"Error memuat shapefile: {e}")
         return None
 
+@st.cache_resource(show_spinner=False)
+def indeks_desa_peta(shp_path):
+    """
+    Indeks pencarian nama desa shapefile untuk kotak Cari Desa di peta
+
+    Returns:
+    - Tuple (SearchIndex nama desa, label "DESA (Kecamatan)" per fitur, id_geo
+      per fitur, daftar label terurut untuk pilihan dropdown)
+    """
+    data_gdf = load_shapefile(shp_path)
+    fitur = data_gdf[data_gdf['NAMOBJ'].notna()]
+    label = (fitur['NAMOBJ'] + " (" + fitur['WADMKC'].fillna('-') + ")").tolist()
+    return SearchIndex(fitur['NAMOBJ']), label, fitur['id_geo'].to_numpy(), sorted(label)
+
+@st.cache_resource(show_spinner=False)
+def indeks_spasial(shp_path):
+    """Indeks STRtree poligon desa untuk klik peta (dibangun sekali per proses)"""
+    return SpatialIndex(load_shapefile(shp_path))
+
+def desa_dari_klik(hasil_peta, shp_path):
+    """
+    id_geo desa pada klik peta st_folium yang masih berlaku
+
+    st_folium terus mengembalikan last_clicked yang sama di setiap rerun, jadi
+    klik yang sudah diproses disimpan di session_state. Klik hanya berlaku sampai
+    pencarian desa diubah (lupakan_klik_peta); klik baru berlaku lagi.
+
+    Returns:
+    - id_geo (int), atau None jika belum ada klik yang berlaku atau klik di luar semua desa
+    """
+    klik = (hasil_peta or {}).get("last_clicked")
+    if klik and klik != st.session_state.get("klik_peta_terakhir"):
+        st.session_state.klik_peta_terakhir = klik
+        st.session_state.klik_peta_aktif = klik
+    klik = st.session_state.get("klik_peta_aktif")
+    if not klik:
+        return None
+    return indeks_spasial(shp_path).desa_di_titik(klik["lng"], klik["lat"])
+
+def lupakan_klik_peta():
+    """Interaksi terbaru menang: pencarian desa yang diubah menggantikan klik peta"""
+    st.session_state.klik_peta_aktif = None
+
+# ============================================================================
+# FUNGSI ANALISIS HOTSPOT (LOCAL MORAN'S I / GETIS-ORD GI*)
+# ============================================================================
+
+# Pilihan lapisan hotspot peta -> (kolom klaster, kolom p-value, definisi klaster)
+LAPISAN_HOTSPOT = {
+    "Local Moran's I (LISA)": ('klaster_lisa', 'p_moran', KLASTER_LISA),
+    "Getis-Ord Gi*": ('klaster_gi', 'p_gi', KLASTER_GI),
+}
+
+@st.cache_resource(show_spinner=False)
+def bobot_ketetanggaan(shp_path, jenis):
+    """Matriks ketetanggaan desa (dibangun/dibaca dari cache sekali per proses)"""
+    return load_weights(jenis, shp_path)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def hitung_hotspot(id_geo, nilai, shp_path, jenis):
+    """Local Moran's I dan Gi* per desa untuk satu bulan (cache per data & jenis bobot)"""
+    return analisis_hotspot(id_geo, nilai, bobot_ketetanggaan(shp_path, jenis))
+
+# ============================================================================
+# FUNGSI PETA TOPOJSON (GEOMETRI STATIS + LOOKUP WARNA DI KLIEN)
+# ============================================================================
+
+# URL folder static Streamlit (butuh server.enableStaticServing = true)
+STATIC_URL_PREFIX = "/app/static/"
+
+@st.cache_resource
+def ensure_topojson(shp_path, level):
+    """Pastikan file TopoJSON statis untuk level geometri tersedia, kembalikan URL-nya"""
+    data_gdf = load_shapefile(shp_path)
+    if data_gdf is None:
+        return None
+    path = write_topojson(data_gdf, level, shp_path=shp_path)
+    # Versi mtime di URL agar browser tidak memakai geometri lama dari cache
+    return f"{STATIC_URL_PREFIX}{os.path.basename(path)}?v={int(os.path.getmtime(path))}"
+
+class TopoJsonChoropleth(JSCSSMixin, MacroElement):
+    """
+    Layer Leaflet yang mengambil geometri desa dari file TopoJSON statis
+
+    Geometri diunduh browser sekali (bisa di-cache), sedangkan warna dan isi
+    tooltip dikirim sebagai lookup kecil per id_geo setiap rerun.
+
+    Parameters:
+    - url: URL file TopoJSON
+    - lookup: dict id_geo -> {'c': warna, 'p': puskesmas, 'd', 's', 'ds', 'js', 'ps'}
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var lookup = {{ this.lookup|tojson }};
+            var peta = {{ this._parent.get_name() }};
+            var fmt = function(v) { return (v === undefined || v === null) ? '-' : v.toLocaleString('id-ID'); };
+            fetch({{ this.url|tojson }}, {cache: 'force-cache'})
+                .then(function(r) { return r.json(); })
+                .then(function(topo) {
+                    var fc = topojson.feature(topo, topo.objects.desa);
+                    var style = function(f) {
+                        var d = lookup[f.properties.id_geo];
+                        return {fillColor: d ? d.c : '#e0e0e0', color: '#34495e',
+                                weight: 1.2, fillOpacity: 0.8, dashArray: '0'};
+                    };
+                    var layer = L.geoJson(fc, {
+                        style: style,
+                        onEachFeature: function(f, l) {
+                            var d = lookup[f.properties.id_geo] || {};
+                            l.bindTooltip(
+                                '<div style="font-family: Poppins, sans-serif; font-size: 14px;">' +
+                                '<b>🏘️ Desa:</b> ' + f.properties.NAMOBJ + '<br>' +
+                                '<b>🏘️ Kecamatan:</b> ' + f.properties.WADMKC + '<br>' +
+                                '<b>🏥 Puskesmas:</b> ' + (d.p || 'N/A') + '<br>' +
+                                '<b>⚖️ Ditimbang (D):</b> ' + fmt(d.d) + '<br>' +
+                                '<b>🎯 Sasaran (S):</b> ' + fmt(d.s) + '<br>' +
+                                '<b>📊 % Sasaran (D/S):</b> ' + fmt(d.ds) + '<br>' +
+                                '<b>📉 Jml Stunting (JS):</b> ' + fmt(d.js) + '<br>' +
+                                '<b>🔴 Prevalensi (JS/D):</b> ' + fmt(d.ps) + '</div>',
+                                {sticky: false}
+                            );
+                            l.on('mouseover', function() {
+                                l.setStyle({fillColor: '#667eea', color: '#1a237e', weight: 3, fillOpacity: 0.9});
+                            });
+                            l.on('mouseout', function() { layer.resetStyle(l); });
+                        }
+                    }).addTo(peta);
+                });
+        })();
+        {% endmacro %}
+    """)
+
+    default_js = [
+        ('topojson-client', 'https://cdn.jsdelivr.net/npm/topojson-client@3/dist/topojson-client.min.js'),
+    ]
+
+    def __init__(self, url, lookup):
+        super().__init__()
+        self._name = 'TopoJsonChoropleth'
+        self.url = url
+        self.lookup = lookup
+
+def build_topojson_lookup(data_gdf_merged):
+    """
+    Lookup atribut per id_geo untuk layer TopoJsonChoropleth
+
+    Jika satu fitur cocok dengan lebih dari satu baris data, baris pertama yang dipakai.
+    """
+    df = data_gdf_merged.drop_duplicates(subset=['id_geo'])
+    return {
+        int(row.id_geo): {
+            'c': row.warna_stunting,
+            'p': row.puskesmas,
+            'd': int(row.jumlah_ditimbang_d),
+            's': int(row.sasaran_total),
+            'ds': round(float(row.persentase_ds), 2),
+            'js': int(row.jumlah_stunting),
+            'ps': round(float(row.persen_stunting), 2),
+        }
+        for row in df.itertuples(index=False)
+    }
+
 # Header dengan styling baru dan logo
 try:
     logo = Image.open("Logo.png")
@@ -832,6 +1209,10 @@ except:
 st.markdown("---")
 
 # Sidebar dengan styling baru
+periode_tersimpan = None
+simpan_riwayat = False
+timpa_periode = False
+
 with st.sidebar:
     st.markdown("### 🏥 DINKES KUNINGAN")
     st.markdown("---")
@@ -861,6 +1242,39 @@ with st.sidebar:
         
         # Format tanggal untuk ditampilkan
         tanggal_penarikan_str = tanggal_penarikan.strftime("%d %B %Y")
+        
+        # Simpan ke riwayat hanya atas perintah, setelah bulan data dipastikan
+        # (bukan setiap rerun dengan bulan bawaan)
+        simpan_riwayat = st.button(
+            "💾 Simpan ke Riwayat",
+            key="simpan_riwayat",
+            use_container_width=True,
+            help="Simpan hasil upload sebagai periode bulan data yang dipilih di atas"
+        )
+        timpa_periode = st.checkbox(
+            "Timpa jika periode sudah berisi data lain",
+            key="timpa_periode"
+        )
+    
+    else:
+        # Tanpa upload: buka periode yang sudah tersimpan di gudang data riwayat
+        periode_gudang = get_warehouse().periods()
+        if periode_gudang:
+            st.markdown("---")
+            st.markdown("### 📚 DATA TERSIMPAN")
+            
+            periode_tersimpan = st.selectbox(
+                "📅 Periode Data:",
+                periode_gudang[::-1],
+                format_func=label_periode,
+                key='periode_tersimpan',
+                help="Periode hasil upload sebelumnya, tanpa perlu upload ulang file sumber"
+            )
+            
+            dim_waktu_gudang = get_warehouse().dim_waktu()
+            waktu_tersimpan = dim_waktu_gudang[dim_waktu_gudang['id_waktu'] == periode_tersimpan].iloc[0]
+            pilih_bulan = waktu_tersimpan['nama_bulan_data']
+            tanggal_penarikan_str = tanggal_penarikan(waktu_tersimpan).strftime("%d %B %Y")
 
     st.markdown("---")
     st.markdown("### 📖 PANDUAN")
@@ -897,7 +1311,7 @@ with st.sidebar:
         """)
 
 # Main content
-if uploaded_file_gizi is None or uploaded_file_sasaran is None:
+if (uploaded_file_gizi is None or uploaded_file_sasaran is None) and periode_tersimpan is None:
     st.info("👈 Silakan upload kedua file data di sidebar untuk memulai analisis.")
     
     # Metrics dengan styling baru
@@ -950,55 +1364,66 @@ if uploaded_file_gizi is None or uploaded_file_sasaran is None:
         """, unsafe_allow_html=True)
 
 else:
-    # Simpan file temporary
-    import tempfile
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xls') as tmp_gizi:
-        tmp_gizi.write(uploaded_file_gizi.getvalue())
-        tmp_gizi_path = tmp_gizi.name
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xls') as tmp_sasaran:
-        tmp_sasaran.write(uploaded_file_sasaran.getvalue())
-        tmp_sasaran_path = tmp_sasaran.name
-    
     # Simpan info bulan dan tanggal ke session state
     if 'pilih_bulan' not in st.session_state:
         st.session_state.pilih_bulan = 'JANUARI'
     if 'tanggal_penarikan_str' not in st.session_state:
         st.session_state.tanggal_penarikan_str = pd.to_datetime('today').strftime("%d %B %Y")
 
-    # Update dari input user jika ada
-    if 'bulan_data' in locals():
+    # Update dari input user (atau periode tersimpan) jika ada
+    if 'pilih_bulan' in locals():
         st.session_state.pilih_bulan = pilih_bulan
         st.session_state.tanggal_penarikan_str = tanggal_penarikan_str
 
-    with st.spinner("🔄 Memproses data... Mohon tunggu..."):
-        df_fact, df_wilayah, df_waktu, success, message = proses_etl(tmp_gizi_path, tmp_sasaran_path)
+    if periode_tersimpan is not None:
+        df_fact, df_wilayah, df_waktu = get_warehouse().load_period(periode_tersimpan)
+        success, message = True, f"📚 Data tersimpan periode {label_periode(periode_tersimpan)} dimuat"
+    else:
+        bytes_gizi = uploaded_file_gizi.getvalue()
+        bytes_sasaran = uploaded_file_sasaran.getvalue()
+        kunci_upload = etl_cache_key(bytes_gizi, bytes_sasaran)
+        
+        with st.spinner("🔄 Memproses data... Mohon tunggu..."):
+            df_fact, df_wilayah, df_waktu, success, message = proses_etl_cached(bytes_gizi, bytes_sasaran, kunci_upload)
+        
+        if success and simpan_riwayat:
+            df_fact, df_wilayah, df_waktu = simpan_ke_gudang(
+                df_fact, df_wilayah, df_waktu, pilih_bulan, kunci_upload, timpa=timpa_periode
+            )
+        elif success:
+            tersimpan = periode_sumber(kunci_upload)
+            if tersimpan:
+                st.sidebar.caption(f"💾 Sudah tersimpan di riwayat sebagai periode {', '.join(tersimpan)}")
+            else:
+                st.sidebar.caption("💡 Belum tersimpan di riwayat: pastikan bulan data lalu klik Simpan ke Riwayat")
 
-    # Hapus file temporary
-    os.unlink(tmp_gizi_path)
-    os.unlink(tmp_sasaran_path)
-    
     if success:
         st.success(message)
-        
-        # Agregasi data per kecamatan
-        df_agg = df_fact.groupby('puskesmas').agg({
-            'jumlah_ditimbang_d': 'sum',
-            'jumlah_stunting': 'sum',
-            'jumlah_kurang_gizi': 'sum',
-            'jumlah_wasting': 'sum',
-            'sasaran_total': 'sum'
-        }).reset_index()
-        
-        df_agg.columns = ['nama_kecamatan', 'jumlah_balita_ditimbang', 'jumlah_balita_stunting', 
-                          'jumlah_balita_kurang_gizi', 'jumlah_balita_wasting', 'sasaran_total']
-        
-        df_agg['persentase_stunting'] = (df_agg['jumlah_balita_stunting'] / df_agg['jumlah_balita_ditimbang'] * 100).fillna(0)
-        df_agg['persentase_kurang_gizi'] = (df_agg['jumlah_balita_kurang_gizi'] / df_agg['jumlah_balita_ditimbang'] * 100).fillna(0)
-        df_agg['persentase_wasting'] = (df_agg['jumlah_balita_wasting'] / df_agg['jumlah_balita_ditimbang'] * 100).fillna(0)
-        df_agg['persentase_sasaran'] = (df_agg['jumlah_balita_ditimbang'] / df_agg['sasaran_total'] * 100).fillna(0)
-        
+
+        etl_stats = get_etl_cache().stats()
+        upload_stats = get_upload_cache().stats()
+        st.sidebar.caption(
+            f"⚡ Cache ETL: {etl_stats['hits']} hit • {etl_stats['misses']} miss • "
+            f"{etl_stats['entries']} data ({etl_stats['bytes'] / 1024:,.0f} KB) • "
+            f"{upload_stats['entries']} file sumber ({upload_stats['bytes'] / 1024:,.0f} KB)"
+        )
+        if 'waktu_baca' in st.session_state:
+            st.sidebar.caption(
+                f"⏱️ Parse file terakhir: gizi {st.session_state.waktu_baca['gizi']:.2f} s • "
+                f"sasaran {st.session_state.waktu_baca['sasaran']:.2f} s"
+            )
+
+        # id_geo & kecamatan setiap desa dari indeks wilayah (alias terbaru ikut terpakai)
+        df_wilayah, cakupan_wilayah, desa_perlu_cek = lengkapi_wilayah(df_wilayah)
+        st.sidebar.caption(
+            f"🧭 Pencocokan desa ke peta: {cakupan_wilayah['cocok']}/{cakupan_wilayah['total']} "
+            f"({cakupan_wilayah['persen']:.1f}%) • {cakupan_wilayah['metode'].get('mirip', 0)} ejaan mirip"
+        )
+
+        # Kubus agregat desa/puskesmas/kecamatan/kabupaten (sekali per dataset)
+        kubus = hitung_kubus(df_fact, df_wilayah)
+        df_agg = tabel_agregat(kubus['puskesmas'], 'nama_kecamatan')
+
         # Ringkasan statistik dengan styling baru yang lebih informatif
         st.markdown("### 📈 RINGKASAN DATA STATISTIK STUNTING PER KABUPATEN KUNINGAN")
         
@@ -1076,958 +1501,1196 @@ else:
         st.markdown("---")
         
         # Tab untuk visualisasi dengan styling baru
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        # on_change="rerun": hanya isi tab yang sedang dibuka yang dijalankan (tab.open),
+        # tab lain tidak menghitung peta, grafik, tabel maupun CSV-nya
+        tab1, tab2, tab_tren, tab3, tab4, tab5 = st.tabs([
             "🗺️ Peta Sebaran Stunting", 
             "📊 Perbandingan Stunting Antar Wilayah ", 
+            "📈 Tren Bulanan", 
             "🎯 Sebaran Status Gizi Balita", 
             "📋 Tabel Data", 
             "💾 Download",
-        ])
+        ], key="tab_aktif", on_change="rerun")
         
         with tab1:
-            waktu_info = f"Bulan {st.session_state.pilih_bulan} (Penarikan: {st.session_state.tanggal_penarikan_str})"            
-            st.markdown(
-                f"### 🗺️ PETA SEBARAN STUNTING PER DESA DI KABUPATEN KUNINGAN "
-                f"{pilih_bulan}"
-            )
+            if tab1.open:
+                waktu_info = f"Bulan {st.session_state.pilih_bulan} (Penarikan: {st.session_state.tanggal_penarikan_str})"            
+                st.markdown(
+                    f"### 🗺️ PETA SEBARAN STUNTING PER DESA DI KABUPATEN KUNINGAN "
+                    f"{pilih_bulan}"
+                )
             
-            # Load shapefile
-            SHP_FILE_PATH = "data/ADMINISTRASIDESA_AR_25K.shp"
-            data_gdf = load_shapefile(SHP_FILE_PATH)
+                # Load shapefile
+                SHP_FILE_PATH = "data/ADMINISTRASIDESA_AR_25K.shp"
+                data_gdf = load_shapefile(SHP_FILE_PATH)
             
-            if data_gdf is not None:
-                # Join data stunting dengan shapefile
-                df_fact['desa_normalized'] = df_fact['desa'].str.strip().str.upper()
-                data_gdf['NAMOBJ_normalized'] = data_gdf['NAMOBJ'].str.strip().str.upper()
-                
-                data_gdf_merged = data_gdf.merge(
-                    df_fact[['desa_normalized', 'puskesmas', 'jumlah_ditimbang_d', 'sasaran_total', 
-                             'persentase_ds', 'jumlah_stunting', 'persen_stunting']],
-                    left_on='NAMOBJ_normalized',
-                    right_on='desa_normalized',
-                    how='left'
-                )
+                if data_gdf is not None:
+                    # Join data stunting dengan shapefile lewat id_geo (satu baris per fitur)
+                    data_gdf_merged = data_gdf.merge(data_per_fitur(df_fact, df_wilayah), on='id_geo', how='left')
                 
-                # Isi nilai NaN
-                data_gdf_merged['jumlah_ditimbang_d'] = data_gdf_merged['jumlah_ditimbang_d'].fillna(0)
-                data_gdf_merged['sasaran_total'] = data_gdf_merged['sasaran_total'].fillna(0)
-                data_gdf_merged['persentase_ds'] = data_gdf_merged['persentase_ds'].fillna(0)
-                data_gdf_merged['jumlah_stunting'] = data_gdf_merged['jumlah_stunting'].fillna(0)
-                data_gdf_merged['persen_stunting'] = data_gdf_merged['persen_stunting'].fillna(0)
-                data_gdf_merged['puskesmas'] = data_gdf_merged['puskesmas'].fillna('N/A')
+                    # Isi nilai NaN (fitur tanpa data)
+                    data_gdf_merged[KOLOM_JUMLAH + ['persentase_ds', 'persen_stunting']] = (
+                        data_gdf_merged[KOLOM_JUMLAH + ['persentase_ds', 'persen_stunting']].fillna(0)
+                    )
+                    data_gdf_merged['puskesmas'] = data_gdf_merged['puskesmas'].fillna('N/A')
+
+                    # Desa yang tidak/kurang pasti cocok ke peta (bukan lagi abu-abu tanpa keterangan)
+                    if not desa_perlu_cek.empty:
+                        jumlah_tidak = int((desa_perlu_cek['metode'] == 'tidak ditemukan').sum())
+                        with st.expander(
+                            f"⚠️ {jumlah_tidak} desa tidak ditemukan di peta, "
+                            f"{len(desa_perlu_cek) - jumlah_tidak} dicocokkan dengan ejaan mirip"
+                        ):
+                            st.dataframe(desa_perlu_cek, hide_index=True, use_container_width=True)
+                            st.caption(
+                                "Konfirmasi usulan dengan `python wilayah.py alias PUSKESMAS DESA NAMOBJ KECAMATAN` "
+                                "(disimpan di data/alias_desa.csv)"
+                            )
+
+                    # Kelas, warna dan label stunting dihitung sekali untuk semua renderer
+                    data_gdf_merged = add_stunting_classes(data_gdf_merged)
                 
-                # ==================== FITUR PENCARIAN DESA ====================
-                st.markdown("---")
-                st.markdown("#### 🔍 Cari Desa")
+                    # ==================== FITUR PENCARIAN DESA ====================
+                    st.markdown("---")
+                    st.markdown("#### 🔍 Cari Desa")
                 
-                col_search1, col_search2 = st.columns([3, 1])
+                    col_search1, col_level, col_search2 = st.columns([3, 1.5, 1])
                 
-                with col_search1:
-                    # Buat list desa untuk autocomplete
-                    desa_list = sorted(data_gdf_merged['NAMOBJ'].dropna().unique().tolist())
+                    with col_search1:
+                        # Indeks nama desa dibangun sekali; nama yang diketik bebas
+                        # (termasuk salah eja) dicari lewat indeks
+                        indeks_desa, label_desa, id_geo_desa, opsi_desa = indeks_desa_peta(SHP_FILE_PATH)
                     
-                    search_query = st.selectbox(
-                        "Pilih atau ketik nama desa:",
-                        options=[""] + desa_list,
-                        index=0,
-                        help="Ketik untuk mencari atau pilih dari dropdown"
-                    )
+                        search_query = st.selectbox(
+                            "Pilih atau ketik nama desa:",
+                            options=[""] + opsi_desa,
+                            index=0,
+                            accept_new_options=True,
+                            key="cari_desa_peta",
+                            on_change=lupakan_klik_peta,
+                            help="Ketik untuk mencari atau pilih dari dropdown; ejaan yang mirip juga ditemukan"
+                        )
+                    
+                        search_id_geo = None
+                        if search_query in label_desa:
+                            search_id_geo = int(id_geo_desa[label_desa.index(search_query)])
+                        elif search_query:
+                            hasil_cari = indeks_desa.cari(search_query, n=1)
+                            if hasil_cari:
+                                posisi = hasil_cari[0][0]
+                                search_id_geo = int(id_geo_desa[posisi])
+                                st.caption(f"🔎 Hasil terdekat untuk \"{search_query}\": **{label_desa[posisi]}**")
+                            else:
+                                st.caption(f"🔎 Desa \"{search_query}\" tidak ditemukan")
                 
-                with col_search2:
-                    clear_search = st.button("🔄 Reset", use_container_width=True)
+                    with col_level:
+                        pilihan_level = st.selectbox(
+                            "🗺️ Kualitas Peta:",
+                            ["Otomatis"] + [lv.capitalize() for lv in GEOMETRY_LEVELS],
+                            index=0,
+                            key="kualitas_peta",
+                            help="Otomatis memilih detail geometri sesuai anggaran ukuran peta"
+                        )
                 
-                # Jika tombol reset diklik
-                if clear_search:
-                    search_query = ""
-                    st.rerun()
+                    with col_search2:
+                        clear_search = st.button("🔄 Reset", use_container_width=True)
                 
-                # ==================== END FITUR PENCARIAN ====================
+                    # Mode TopoJSON hanya bisa dipakai jika folder static disajikan Streamlit
+                    if st.get_option("server.enableStaticServing"):
+                        mode_peta = st.radio(
+                            "⚙️ Mode Peta:",
+                            ["GeoJSON", "TopoJSON (hemat data)"],
+                            horizontal=True,
+                            key="mode_peta",
+                            help="TopoJSON: geometri desa diunduh sekali, setiap perubahan hanya mengirim data stunting per desa"
+                        )
+                    else:
+                        mode_peta = "GeoJSON"
+
+                    # Lapisan klaster hotspot (dihitung ulang per bulan, di-cache per data)
+                    col_hotspot, col_bobot = st.columns([3, 1.5])
                 
-                # Hitung bounds untuk zoom otomatis ke wilayah Kuningan
-                bounds = data_gdf_merged.total_bounds  # [minx, miny, maxx, maxy]
-                center_lat = (bounds[1] + bounds[3]) / 2
-                center_lon = (bounds[0] + bounds[2]) / 2
+                    with col_hotspot:
+                        lapisan_hotspot = st.selectbox(
+                            "🔥 Lapisan Hotspot:",
+                            ["Tidak ada"] + list(LAPISAN_HOTSPOT),
+                            index=0,
+                            key="lapisan_hotspot",
+                            help="Kelompok desa bertetangga dengan prevalensi stunting tinggi/rendah yang signifikan secara statistik"
+                        )
                 
-                # Ambil jumlah kecamatan dan desa dari data ETL (df_fact)
-                jumlah_kecamatan = 32
-                jumlah_desa_dengan_data = 361
+                    with col_bobot:
+                        jenis_bobot = st.selectbox(
+                            "🧩 Ketetanggaan:",
+                            ["Queen", "Rook"],
+                            index=0,
+                            key="jenis_bobot",
+                            disabled=lapisan_hotspot not in LAPISAN_HOTSPOT,
+                            help="Queen: desa bersinggungan di titik atau sisi; Rook: desa berbagi sisi batas"
+                        )
                 
-                # Layout: Peta di kiri (lebih besar), Legenda di kanan (lebih kecil)
-                col_map, col_legend = st.columns([9.5, 3])
+                    hasil_hotspot = None
+                    if lapisan_hotspot in LAPISAN_HOTSPOT:
+                        # Hanya desa yang punya data bulan ini (prevalensi 0 karena tanpa data tidak diikutkan)
+                        ada_data = data_gdf_merged['jumlah_ditimbang_d'].to_numpy() > 0
+                        hasil_hotspot = hitung_hotspot(
+                            data_gdf_merged.loc[ada_data, 'id_geo'].to_numpy(),
+                            data_gdf_merged.loc[ada_data, 'persen_stunting'].to_numpy(dtype=float),
+                            SHP_FILE_PATH, jenis_bobot.lower()
+                        )
+                        kolom_klaster, kolom_p, klaster_hotspot = LAPISAN_HOTSPOT[lapisan_hotspot]
                 
-                with col_map:
-                    # Buat peta Folium dengan tiles yang lebih bagus
-                    m = folium.Map(
-                        location=[center_lat, center_lon], 
-                        zoom_start=11,
-                        tiles='CartoDB positron',  # Tiles yang lebih bersih
-                        control_scale=True,
-                        zoom_control=True,
-                        scrollWheelZoom=False,
-                        dragging=True
-                    )
+                    # Jika tombol reset diklik
+                    if clear_search:
+                        search_query = ""
+                        lupakan_klik_peta()
+                        st.rerun()
+                
+                    # ==================== END FITUR PENCARIAN ====================
+                
+                    # Pilih level geometri: saat zoom ke satu desa boleh lebih detail
+                    level_bytes = {
+                        lv: info['bytes'] for lv, info in data_gdf.attrs.get('geometry_levels', {}).items()
+                    }
+                    if pilihan_level == "Otomatis":
+                        budget = PETA_PAYLOAD_BUDGET_ZOOM if search_query else PETA_PAYLOAD_BUDGET
+                        level_peta = pick_geometry_level(level_bytes, budget)
+                    else:
+                        level_peta = pilihan_level.lower()
+                
+                    if mode_peta == "GeoJSON":
+                        data_gdf_peta = with_geometry_level(data_gdf_merged, level_peta, KOLOM_PETA)
+                
+                    # Hitung bounds untuk zoom otomatis ke wilayah Kuningan
+                    bounds = data_gdf_merged.total_bounds  # [minx, miny, maxx, maxy]
+                    center_lat = (bounds[1] + bounds[3]) / 2
+                    center_lon = (bounds[0] + bounds[2]) / 2
+                
+                    # Ambil jumlah kecamatan dan desa dari data ETL (df_fact)
+                    jumlah_kecamatan = 32
+                    jumlah_desa_dengan_data = 361
+                
+                    # Layout: Peta di kiri (lebih besar), Legenda di kanan (lebih kecil)
+                    col_map, col_legend = st.columns([9.5, 3])
+                
+                    with col_map:
+                        # Buat peta Folium dengan tiles yang lebih bagus
+                        m = folium.Map(
+                            location=[center_lat, center_lon], 
+                            zoom_start=11,
+                            tiles='CartoDB positron',  # Tiles yang lebih bersih
+                            control_scale=True,
+                            zoom_control=True,
+                            scrollWheelZoom=False,
+                            dragging=True
+                        )
                     
-                    # Fungsi warna yang lebih detail
-                    def get_color(persen_stunting):
-                        if persen_stunting == 0:
-                            return '#e0e0e0'
-                        elif persen_stunting < 5:
-                            return '#fff3cd'
-                        elif persen_stunting < 10:
-                            return '#ffcc80'
-                        elif persen_stunting < 15:
-                            return '#ff8c42'
-                        elif persen_stunting < 20:
-                            return '#ff6b6b'
+                        if mode_peta == "GeoJSON":
+                            # Layer GeoJson dengan styling lebih baik
+                            folium.GeoJson(
+                                data_gdf_peta,
+                                name="Stunting per Desa",
+                                style_function=lambda feature: {
+                                    'fillColor': feature['properties']['warna_stunting'],
+                                    'color': '#34495e',
+                                    'weight': 1.2,
+                                    'fillOpacity': 0.8,
+                                    'dashArray': '0'
+                                },
+                                highlight_function=lambda x: {
+                                    'fillColor': '#667eea',
+                                    'color': '#1a237e',
+                                    'weight': 3,
+                                    'fillOpacity': 0.9
+                                },
+                                tooltip=folium.GeoJsonTooltip(
+                                    fields=['NAMOBJ', 'WADMKC','puskesmas', 'jumlah_ditimbang_d', 'sasaran_total', 'persentase_ds', 
+                                            'jumlah_stunting', 'persen_stunting'],
+                                    aliases=['🏘️ Desa:', '🏘️ Kecamatan','🏥 Puskesmas:', '⚖️ Ditimbang (D):', '🎯 Sasaran (S):', '📊 % Sasaran (D/S):', 
+                                             '📉 Jml Stunting (JS):', '🔴 Prevalensi (JS/D):'],
+                                    localize=True,
+                                    sticky=False,
+                                    labels=True,
+                                    style="""
+                                        background: linear-gradient(135deg, #ffffff 0%, #f8f9fa 100%);
+                                        border: 3px solid #667eea;
+                                        border-radius: 12px;
+                                        box-shadow: 0 6px 20px rgba(0,0,0,0.2);
+                                        padding: 12px 16px;
+                                        font-family: 'Poppins', sans-serif;
+                                        font-weight: 500;
+                                        font-size: 14px;
+                                        max-width: 300px;
+                                    """
+                                )
+                            ).add_to(m)
                         else:
-                            return '#d9534f'
+                            # Geometri dari file TopoJSON statis, hanya lookup warna yang dikirim
+                            TopoJsonChoropleth(
+                                ensure_topojson(SHP_FILE_PATH, level_peta),
+                                build_topojson_lookup(data_gdf_merged)
+                            ).add_to(m)
                     
-                    # Layer GeoJson dengan styling lebih baik
-                    folium.GeoJson(
-                        data_gdf_merged,
-                        name="Stunting per Desa",
-                        style_function=lambda feature: {
-                            'fillColor': get_color(feature['properties'].get('persen_stunting', 0)),
-                            'color': '#34495e',
-                            'weight': 1.2,
-                            'fillOpacity': 0.8,
-                            'dashArray': '0'
-                        },
-                        highlight_function=lambda x: {
-                            'fillColor': '#667eea',
-                            'color': '#1a237e',
-                            'weight': 3,
-                            'fillOpacity': 0.9
-                        },
-                        tooltip=folium.GeoJsonTooltip(
-                            fields=['NAMOBJ', 'WADMKC','puskesmas', 'jumlah_ditimbang_d', 'sasaran_total', 'persentase_ds', 
-                                    'jumlah_stunting', 'persen_stunting'],
-                            aliases=['🏘️ Desa:', '🏘️ Kecamatan','🏥 Puskesmas:', '⚖️ Ditimbang (D):', '🎯 Sasaran (S):', '📊 % Sasaran (D/S):', 
-                                     '📉 Jml Stunting (JS):', '🔴 Prevalensi (JS/D):'],
-                            localize=True,
-                            sticky=False,
-                            labels=True,
-                            style="""
-                                background: linear-gradient(135deg, #ffffff 0%, #f8f9fa 100%);
-                                border: 3px solid #667eea;
-                                border-radius: 12px;
-                                box-shadow: 0 6px 20px rgba(0,0,0,0.2);
-                                padding: 12px 16px;
-                                font-family: 'Poppins', sans-serif;
-                                font-weight: 500;
-                                font-size: 14px;
-                                max-width: 300px;
-                            """
-                        )
-                    ).add_to(m)
+                        # Lapisan klaster hotspot: hanya desa yang signifikan, di atas choropleth
+                        if hasil_hotspot is not None:
+                            signifikan = hasil_hotspot.loc[hasil_hotspot[kolom_klaster] > 0, ['id_geo', kolom_klaster, kolom_p]]
+                            if not signifikan.empty:
+                                gdf_hotspot = data_gdf_merged.merge(signifikan, on='id_geo')
+                                gdf_hotspot['klaster'] = [klaster_hotspot[k]['label'] for k in gdf_hotspot[kolom_klaster]]
+                                gdf_hotspot['warna_klaster'] = [klaster_hotspot[k]['warna'] for k in gdf_hotspot[kolom_klaster]]
+                                lapisan = folium.FeatureGroup(name=f"🔥 {lapisan_hotspot}", show=True)
+                                folium.GeoJson(
+                                    with_geometry_level(
+                                        gdf_hotspot, level_peta,
+                                        ['NAMOBJ', 'WADMKC', 'persen_stunting', 'klaster', 'warna_klaster', kolom_p]
+                                    ),
+                                    style_function=lambda feature: {
+                                        'fillColor': feature['properties']['warna_klaster'],
+                                        'color': feature['properties']['warna_klaster'],
+                                        'weight': 3,
+                                        'fillOpacity': 0.45,
+                                    },
+                                    tooltip=folium.GeoJsonTooltip(
+                                        fields=['NAMOBJ', 'WADMKC', 'persen_stunting', 'klaster', kolom_p],
+                                        aliases=['🏘️ Desa:', '🏘️ Kecamatan:', '🔴 Prevalensi (JS/D):', '🔥 Klaster:', '📐 p-value:'],
+                                        localize=True,
+                                        sticky=False,
+                                        labels=True
+                                    )
+                                ).add_to(lapisan)
+                                lapisan.add_to(m)
+                                folium.LayerControl(collapsed=False).add_to(m)
                     
-                    # Tambahkan label kecamatan di peta
-                    if 'WADMKC' in data_gdf_merged.columns:
-                        # Agregasi per kecamatan untuk mendapatkan centroid
-                        kecamatan_centroids = data_gdf_merged.groupby('WADMKC').apply(
-                            lambda x: x.geometry.unary_union.centroid
-                        ).reset_index()
-                        kecamatan_centroids.columns = ['WADMKC', 'centroid']
+                        # Tambahkan label kecamatan di peta
+                        if 'WADMKC' in data_gdf_merged.columns:
+                            # Titik label kecamatan sudah dihitung di artefak geometri
+                            label_kecamatan = kecamatan_labels(data_gdf)
                         
-                        # Tambahkan marker untuk setiap kecamatan
-                        for idx, row in kecamatan_centroids.iterrows():
-                            folium.Marker(
-                                location=[row['centroid'].y, row['centroid'].x],
-                                icon=folium.DivIcon(html=f"""
-                                    <div style="
-                                        font-family: Arial, sans-serif;
-                                        font-size: 10px;
-                                        font-weight: 700;
-                                        color: #2c3e50;
-                                        text-shadow: 
-                                            -1px -1px 0 rgba(255, 255, 255, 0.9),
-                                            1px -1px 0 rgba(255, 255, 255, 0.9),
-                                            -1px 1px 0 rgba(255, 255, 255, 0.9),
-                                            1px 1px 0 rgba(255, 255, 255, 0.9),
-                                            0 0 3px rgba(255, 255, 255, 0.7);
-                                        white-space: nowrap;
-                                        text-align: center;
-                                        text-transform: uppercase;
-                                        letter-spacing: 0.5px;
-                                        transform: translateX(-50%);
-                                        margin-left: 50%;
-                                    ">
-                                        {row['WADMKC']}
-                                    </div>
-                                """)
-                            ).add_to(m)
+                            # Tambahkan marker untuk setiap kecamatan
+                            for idx, row in label_kecamatan.iterrows():
+                                folium.Marker(
+                                    location=[row['y'], row['x']],
+                                    icon=folium.DivIcon(html=f"""
+                                        <div style="
+                                            font-family: Arial, sans-serif;
+                                            font-size: 10px;
+                                            font-weight: 700;
+                                            color: #2c3e50;
+                                            text-shadow: 
+                                                -1px -1px 0 rgba(255, 255, 255, 0.9),
+                                                1px -1px 0 rgba(255, 255, 255, 0.9),
+                                                -1px 1px 0 rgba(255, 255, 255, 0.9),
+                                                1px 1px 0 rgba(255, 255, 255, 0.9),
+                                                0 0 3px rgba(255, 255, 255, 0.7);
+                                            white-space: nowrap;
+                                            text-align: center;
+                                            text-transform: uppercase;
+                                            letter-spacing: 0.5px;
+                                            transform: translateX(-50%);
+                                            margin-left: 50%;
+                                        ">
+                                            {row['WADMKC']}
+                                        </div>
+                                    """)
+                                ).add_to(m)
                     
-                    # Jika ada pencarian desa, tambahkan marker
-                    if search_query:
-                        search_result = data_gdf_merged[data_gdf_merged['NAMOBJ'] == search_query]
+                        # Jika ada pencarian desa, tambahkan marker
+                        if search_id_geo is not None:
+                            search_result = data_gdf_merged[data_gdf_merged['id_geo'] == search_id_geo]
                         
-                        if not search_result.empty:
-                            result = search_result.iloc[0]
-                            # Ambil centroid dari geometry desa
-                            centroid = result.geometry.centroid
+                            if not search_result.empty:
+                                result = search_result.iloc[0]
+                                # Titik label desa (selalu di dalam poligon desa)
+                                label_x, label_y = result['label_x'], result['label_y']
                             
-                            folium.Marker(
-                                location=[centroid.y, centroid.x],
-                                popup=folium.Popup(f"""
-                                    <div style='width: 200px; font-family: Poppins;'>
-                                        <h4 style='color: #667eea; margin: 0 0 10px 0;'>📍 {result['NAMOBJ']}</h4>
-                                        <b>Prevalensi:</b> {result['persen_stunting']:.2f}%<br>
-                                        <b>Stunting:</b> {int(result['jumlah_stunting'])} balita<br>
-                                        <b>Puskesmas:</b> {result['puskesmas']}
-                                    </div>
-                                """, max_width=250),
-                                icon=folium.Icon(color='red', icon='info-sign', prefix='glyphicon'),
-                                tooltip=f"📍 {result['NAMOBJ']}"
-                            ).add_to(m)
+                                folium.Marker(
+                                    location=[label_y, label_x],
+                                    popup=folium.Popup(f"""
+                                        <div style='width: 200px; font-family: Poppins;'>
+                                            <h4 style='color: #667eea; margin: 0 0 10px 0;'>📍 {result['NAMOBJ']}</h4>
+                                            <b>Prevalensi:</b> {result['persen_stunting']:.2f}%<br>
+                                            <b>Stunting:</b> {int(result['jumlah_stunting'])} balita<br>
+                                            <b>Puskesmas:</b> {result['puskesmas']}
+                                        </div>
+                                    """, max_width=250),
+                                    icon=folium.Icon(color='red', icon='info-sign', prefix='glyphicon'),
+                                    tooltip=f"📍 {result['NAMOBJ']}"
+                                ).add_to(m)
                             
-                            # Zoom ke desa yang dicari
-                            m.fit_bounds([[centroid.y - 0.02, centroid.x - 0.02], 
-                                          [centroid.y + 0.02, centroid.x + 0.02]])
+                                # Zoom ke desa yang dicari
+                                m.fit_bounds([[label_y - 0.02, label_x - 0.02], 
+                                              [label_y + 0.02, label_x + 0.02]])
+                            else:
+                                # Fit bounds agar hanya menampilkan wilayah Kuningan
+                                m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
                         else:
                             # Fit bounds agar hanya menampilkan wilayah Kuningan
                             m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
-                    else:
-                        # Fit bounds agar hanya menampilkan wilayah Kuningan
-                        m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
                     
-                    # Legend prevalensi stunting
-                    legend_html = '''
-                    <div style="position: fixed; 
-                                bottom: 50px; left: 50px; width: 220px; 
-                                background: linear-gradient(145deg, #ffffff 0%, #f8f9fa 100%); 
-                                border: 3px solid #667eea; 
-                                border-radius: 16px;
-                                z-index: 9999; 
-                                padding: 18px;
-                                box-shadow: 0 8px 25px rgba(0,0,0,0.2);
-                                font-family: 'Poppins', sans-serif;">
-
-                    <p style="margin: 0 0 12px 0; font-weight: 700; font-size: 16px; color: #667eea; text-align: center;">
-                    📊 Prevalensi Stunting</p>
-
-                    <p style="margin: 6px 0;">
-                    <i style="background:#e0e0e0; width: 30px; height: 14px; 
-                    display: inline-block; border-radius: 4px; margin-right: 10px; border: 1px solid #ccc;"></i>
-                    <span style="font-size: 13px; font-weight: 500;">Tidak ada data</span>
-                    </p>
-
-                    <p style="margin: 6px 0;">
-                    <i style="background:#fff3cd; width: 30px; height: 14px; 
-                    display: inline-block; border-radius: 4px; margin-right: 10px; border: 1px solid #ffeeba;"></i>
-                    <span style="font-size: 13px; font-weight: 500;">&lt; 5% (Sangat Rendah)</span>
-                    </p>
-
-                    <p style="margin: 6px 0;">
-                    <i style="background:#ffcc80; width: 30px; height: 14px; 
-                    display: inline-block; border-radius: 4px; margin-right: 10px; border: 1px solid #ffb84d;"></i>
-                    <span style="font-size: 13px; font-weight: 500;">5–15% (Sedang)</span>
-                    </p>
-
-                    <p style="margin: 6px 0;">
-                    <i style="background:#ff6b6b; width: 30px; height: 14px; 
-                    display: inline-block; border-radius: 4px; margin-right: 10px; border: 1px solid #ff5252;"></i>
-                    <span style="font-size: 13px; font-weight: 500;">15–20% (Tinggi)</span>
-                    </p>
-
-                    <p style="margin: 6px 0;">
-                    <i style="background:#d9534f; width: 30px; height: 14px; 
-                    display: inline-block; border-radius: 4px; margin-right: 10px; border: 1px solid #c9302c;"></i>
-                    <span style="font-size: 13px; font-weight: 500;">&gt; 20% (Sangat Tinggi)</span>
-                    </p>
+                        # Legend prevalensi stunting
+                        legend_items = "".join(
+                            f'''
+                        <p style="margin: 6px 0;">
+                        <i style="background:{kelas['warna']}; width: 30px; height: 14px; 
+                        display: inline-block; border-radius: 4px; margin-right: 10px; border: 1px solid {kelas['tepi']};"></i>
+                        <span style="font-size: 13px; font-weight: 500;">{html_escape(kelas['label'])}</span>
+                        </p>
+    '''
+                            for kelas in KELAS_PETA
+                        )
+                        legend_hotspot = ""
+                        if hasil_hotspot is not None:
+                            legend_hotspot = (
+                                '<p style="margin: 12px 0 6px 0; font-weight: 700; font-size: 13px; color: #667eea;">'
+                                f'🔥 {html_escape(lapisan_hotspot)}</p>'
+                                + "".join(
+                                    f'<p style="margin: 4px 0;"><i style="border: 3px solid {kelas["warna"]}; width: 24px; '
+                                    f'height: 10px; display: inline-block; border-radius: 4px; margin-right: 10px;"></i>'
+                                    f'<span style="font-size: 12px;">{html_escape(kelas["label"])}</span></p>'
+                                    for kode, kelas in klaster_hotspot.items() if kode > 0
+                                )
+                            )
+                        legend_html = f'''
+                        <div style="position: fixed; 
+                                    bottom: 50px; left: 50px; width: 220px; 
+                                    background: linear-gradient(145deg, #ffffff 0%, #f8f9fa 100%); 
+                                    border: 3px solid #667eea; 
+                                    border-radius: 16px;
+                                    z-index: 9999; 
+                                    padding: 18px;
+                                    box-shadow: 0 8px 25px rgba(0,0,0,0.2);
+                                    font-family: 'Poppins', sans-serif;">
 
-                    </div>
-                    '''
-                    m.get_root().html.add_child(folium.Element(legend_html))
+                        <p style="margin: 0 0 12px 0; font-weight: 700; font-size: 16px; color: #667eea; text-align: center;">
+                        📊 Prevalensi Stunting</p>
+                        {legend_items}
+                        {legend_hotspot}
+                        </div>
+                        '''
+                        m.get_root().html.add_child(folium.Element(legend_html))
                     
-                    # Tampilkan peta dengan ukuran lebih besar
-                    st_folium(m, width=1200, height=800, returned_objects=[])
+                        # Tampilkan peta dengan ukuran lebih besar
+                        # Hanya koordinat klik terakhir yang dikirim balik; desanya dicari
+                        # lewat indeks STRtree, bukan dari properti GeoJSON di klien
+                        hasil_peta = st_folium(
+                            m, width=1200, height=800,
+                            returned_objects=["last_clicked"], key="peta_desa"
+                        )
+                        klik_id_geo = desa_dari_klik(hasil_peta, SHP_FILE_PATH)
+                        if hasil_hotspot is not None:
+                            jumlah_klaster = hasil_hotspot[kolom_klaster].value_counts()
+                            st.caption(
+                                f"🔥 {lapisan_hotspot} ({jenis_bobot.lower()}, {JUMLAH_PERMUTASI} permutasi, α = {ALFA}): "
+                                + ", ".join(
+                                    f"{int(jumlah_klaster.get(kode, 0))} desa {kelas['label'].lower()}"
+                                    for kode, kelas in klaster_hotspot.items() if kode > 0
+                                )
+                                + f" dari {len(hasil_hotspot)} desa dengan data"
+                            )
+                            tabel_hotspot = hasil_hotspot[hasil_hotspot[kolom_klaster] > 0].merge(
+                                data_gdf_merged[['id_geo', 'NAMOBJ', 'WADMKC', 'puskesmas']], on='id_geo'
+                            )
+                            if not tabel_hotspot.empty:
+                                with st.expander(f"📋 Daftar desa klaster signifikan ({len(tabel_hotspot)} desa)"):
+                                    tabel_hotspot = tabel_hotspot.sort_values([kolom_klaster, kolom_p, 'nilai'], ascending=[True, True, False])
+                                    st.dataframe(
+                                        pd.DataFrame({
+                                            'Desa': tabel_hotspot['NAMOBJ'],
+                                            'Kecamatan': tabel_hotspot['WADMKC'],
+                                            'Puskesmas': tabel_hotspot['puskesmas'],
+                                            'Prevalensi (%)': tabel_hotspot['nilai'].round(2),
+                                            'Klaster': [klaster_hotspot[k]['label'] for k in tabel_hotspot[kolom_klaster]],
+                                            "Moran's I": tabel_hotspot['moran_i'].round(3),
+                                            'Gi* (z)': tabel_hotspot['gi_star'].round(2),
+                                            'p-value': tabel_hotspot[kolom_p].round(3),
+                                        }),
+                                        hide_index=True,
+                                        use_container_width=True
+                                    )
+                        if mode_peta == "GeoJSON" and level_peta in level_bytes:
+                            st.caption(
+                                f"🗺️ Geometri level **{level_peta}** • ±{level_bytes[level_peta] / 1024:,.0f} KB "
+                                f"(detail penuh ±{level_bytes.get('detail', 0) / 1024:,.0f} KB)"
+                            )
                 
-                with col_legend:
-                    # Informasi Kabupaten Kuningan
-                    st.markdown("""
-                    <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                                padding: 20px; border-radius: 12px; color: white; 
-                                box-shadow: 0 4px 15px rgba(0,0,0,0.2);'>
-                        <h3 style='margin: 0; text-align: center; color: white; font-size: 18px;'>
-                        📍 Kabupaten Kuningan</h3>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.markdown("<br>", unsafe_allow_html=True)
+                    with col_legend:
+                        # Informasi Kabupaten Kuningan
+                        st.markdown("""
+                        <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                                    padding: 20px; border-radius: 12px; color: white; 
+                                    box-shadow: 0 4px 15px rgba(0,0,0,0.2);'>
+                            <h3 style='margin: 0; text-align: center; color: white; font-size: 18px;'>
+                            📍 Kabupaten Kuningan</h3>
+                        </div>
+                        """, unsafe_allow_html=True)
                     
-                    # Batas Wilayah
-                    st.markdown("""
-                    <div style='background: white; padding: 15px; border-radius: 10px; 
-                                border: 2px solid #667eea; margin-bottom: 15px;'>
-                        <h4 style='color: #667eea; margin: 0 0 10px 0; font-size: 15px;'>🗺️ Batas Wilayah</h4>
-                        <p style='margin: 5px 0; font-size: 12px;'>
-                            <b>Utara:</b><br>Kab. Cirebon & Majalengka
-                        </p>
-                        <p style='margin: 5px 0; font-size: 12px;'>
-                            <b>Timur:</b><br>Kab. Brebes
-                        </p>
-                        <p style='margin: 5px 0; font-size: 12px;'>
-                            <b>Selatan:</b><br>Kab. Cilacap
-                        </p>
-                        <p style='margin: 5px 0; font-size: 12px;'>
-                            <b>Barat:</b><br>Kab. Majalengka
-                        </p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                        st.markdown("<br>", unsafe_allow_html=True)
                     
-                    # Statistik Wilayah
-                    st.markdown(f"""
-                    <div style='background: white; padding: 15px; border-radius: 10px; 
-                                border: 2px solid #667eea;'>
-                        <h4 style='color: #667eea; margin: 0 0 10px 0; font-size: 15px;'>📊 Statistik Wilayah</h4>
-                        <div style='background: #f8f9fa; padding: 10px; border-radius: 8px; margin: 8px 0;'>
-                            <p style='margin: 0; font-size: 12px;'><b>Jumlah Kecamatan:</b></p>
-                            <p style='margin: 5px 0 0 0; font-size: 22px; font-weight: bold; color: #667eea;'>
-                                {jumlah_kecamatan}
+                        # Batas Wilayah
+                        st.markdown("""
+                        <div style='background: white; padding: 15px; border-radius: 10px; 
+                                    border: 2px solid #667eea; margin-bottom: 15px;'>
+                            <h4 style='color: #667eea; margin: 0 0 10px 0; font-size: 15px;'>🗺️ Batas Wilayah</h4>
+                            <p style='margin: 5px 0; font-size: 12px;'>
+                                <b>Utara:</b><br>Kab. Cirebon & Majalengka
                             </p>
-                        </div>
-                        <div style='background: #f8f9fa; padding: 10px; border-radius: 8px; margin: 8px 0;'>
-                            <p style='margin: 0; font-size: 12px;'><b>Jumlah Desa:<br></b></p>
-                            <p style='margin: 5px 0 0 0; font-size: 22px; font-weight: bold; color: #667eea;'>
-                                {jumlah_desa_dengan_data}
+                            <p style='margin: 5px 0; font-size: 12px;'>
+                                <b>Timur:</b><br>Kab. Brebes
+                            </p>
+                            <p style='margin: 5px 0; font-size: 12px;'>
+                                <b>Selatan:</b><br>Kab. Cilacap
+                            </p>
+                            <p style='margin: 5px 0; font-size: 12px;'>
+                                <b>Barat:</b><br>Kab. Majalengka
                             </p>
                         </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                        """, unsafe_allow_html=True)
+                    
+                        # Statistik Wilayah
+                        st.markdown(f"""
+                        <div style='background: white; padding: 15px; border-radius: 10px; 
+                                    border: 2px solid #667eea;'>
+                            <h4 style='color: #667eea; margin: 0 0 10px 0; font-size: 15px;'>📊 Statistik Wilayah</h4>
+                            <div style='background: #f8f9fa; padding: 10px; border-radius: 8px; margin: 8px 0;'>
+                                <p style='margin: 0; font-size: 12px;'><b>Jumlah Kecamatan:</b></p>
+                                <p style='margin: 5px 0 0 0; font-size: 22px; font-weight: bold; color: #667eea;'>
+                                    {jumlah_kecamatan}
+                                </p>
+                            </div>
+                            <div style='background: #f8f9fa; padding: 10px; border-radius: 8px; margin: 8px 0;'>
+                                <p style='margin: 0; font-size: 12px;'><b>Jumlah Desa:<br></b></p>
+                                <p style='margin: 5px 0 0 0; font-size: 22px; font-weight: bold; color: #667eea;'>
+                                    {jumlah_desa_dengan_data}
+                                </p>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                        # Detail desa: klik peta yang masih berlaku (lihat desa_dari_klik), atau desa hasil pencarian
+                        id_desa_terpilih = klik_id_geo if klik_id_geo is not None else search_id_geo
+                        desa_terpilih = data_gdf_merged[data_gdf_merged['id_geo'] == id_desa_terpilih]
+                        if not desa_terpilih.empty:
+                            desa = desa_terpilih.iloc[0]
+                            baris_detail = "".join(
+                                f"<p style='margin: 4px 0; font-size: 12px;'><b>{judul}:</b> {nilai}</p>"
+                                for judul, nilai in (
+                                    ("Kecamatan", html_escape(str(desa['WADMKC']))),
+                                    ("Puskesmas", html_escape(str(desa['puskesmas'])) if pd.notna(desa['puskesmas']) else "-"),
+                                    ("Ditimbang", f"{int(desa['jumlah_ditimbang_d']):,} / {int(desa['sasaran_total']):,} balita"),
+                                    ("Partisipasi D/S", f"{desa['persentase_ds']:.2f}%"),
+                                    ("Stunting", f"{int(desa['jumlah_stunting']):,} balita"),
+                                    ("Prevalensi", f"{desa['persen_stunting']:.2f}% ({html_escape(str(desa['label_stunting']))})"),
+                                )
+                            )
+                            st.markdown(f"""
+                            <div style='background: white; padding: 15px; border-radius: 10px; 
+                                        border: 2px solid {desa['warna_stunting']}; margin-top: 15px;'>
+                                <h4 style='color: #667eea; margin: 0 0 10px 0; font-size: 15px;'>📍 {html_escape(str(desa['NAMOBJ']))}</h4>
+                                {baris_detail}
+                            </div>
+                            """, unsafe_allow_html=True)
+                        else:
+                            st.caption("👆 Klik desa di peta untuk melihat detailnya")
                 
-                st.markdown("---")
+                    st.markdown("---")
                 
-                # Tombol Download Peta
-                st.markdown("#### 💾 Download Peta")
-                with st.spinner("🔄 Membuat peta statis untuk download..."):
-                    map_img_bytes = create_static_map_image(
-                        data_gdf_merged, 
-                        "PETA SEBARAN STUNTING PER DESA - KABUPATEN KUNINGAN BULAN " f"{pilih_bulan}" 
-                    )
-                    if map_img_bytes:
-                        create_download_button_for_map(map_img_bytes, "peta_sebaran_stunting_kuningan")
+                    # Tombol Download Peta (dibuat hanya saat diminta, di latar belakang)
+                    st.markdown("#### 💾 Download Peta")
+                    judul_peta = "PETA SEBARAN STUNTING PER DESA - KABUPATEN KUNINGAN BULAN " f"{pilih_bulan}"
+                    peta_key = static_map_key(data_gdf_merged, judul_peta)
+                    job_peta = get_render_jobs().get(peta_key)
+                
+                    # Render yang gagal tidak disimpan: tampilkan error lalu tombol muncul lagi
+                    galat_peta = RenderJobs.failed(job_peta) if job_peta is not None else None
+                    if galat_peta is not None:
+                        st.error(f"⚠️ Error membuat peta statis: {str(galat_peta)}")
+                        get_render_jobs().discard(peta_key)
+                        job_peta = None
+                
+                    if job_peta is None:
+                        if st.button("🖼️ Buat Peta Statis (PNG 300 DPI)", key="buat_peta_statis"):
+                            get_render_jobs().submit(
+                                peta_key, create_static_map_image,
+                                with_geometry_level(data_gdf_merged, 'detail').copy(), judul_peta
+                            )
+                            st.rerun()
+                        st.caption("💡 Peta statis resolusi tinggi dibuat hanya jika diminta dan disimpan untuk permintaan berikutnya.")
+                    elif not job_peta['future'].done():
+                        poll_render_job(peta_key)
+                    else:
+                        create_download_button_for_map(job_peta['future'].result(), "peta_sebaran_stunting_kuningan")
                         st.info("💡 Peta yang didownload adalah versi statis dengan resolusi tinggi (300 DPI) yang mencakup label nama desa dan persentase stunting.")
                 
-                st.markdown("---")
+                    st.markdown("---")
                 
-                st.markdown("""
-                <div class="info-box">
-                    <b>💡 Cara Membaca Peta</b><br><br>
-                    🎨 <b>Warna wilayah</b> menunjukkan tingkat prevalensi stunting (semakin gelap merah, semakin tinggi prevalensi)<br><br>
-                    🖱️ <b>Klik pada wilayah desa</b> untuk melihat informasi detail:<br>
-                    &nbsp;&nbsp;&nbsp;&nbsp;• Nama Desa & Kecamatan<br>
-                    &nbsp;&nbsp;&nbsp;&nbsp;• Nama Puskesmas<br>
-                    &nbsp;&nbsp;&nbsp;&nbsp;• Jumlah Balita Ditimbang & Sasaran<br>
-                    &nbsp;&nbsp;&nbsp;&nbsp;• Persentase Pencapaian Sasaran<br>
-                    &nbsp;&nbsp;&nbsp;&nbsp;• Jumlah & Prevalensi Stunting<br><br>
-                    🔍 <b>Gunakan scroll/zoom</b> untuk melihat detail wilayah tertentu<br><br>
-                    🔎 <b>Gunakan fitur pencarian di atas</b> untuk mencari desa tertentu dan melihat lokasinya di peta<br><br>
-                    🏘️ <b>Label kecamatan</b> ditampilkan langsung di peta untuk memudahkan identifikasi wilayah
-                </div>
-                """, unsafe_allow_html=True)
+                    st.markdown("""
+                    <div class="info-box">
+                        <b>💡 Cara Membaca Peta</b><br><br>
+                        🎨 <b>Warna wilayah</b> menunjukkan tingkat prevalensi stunting (semakin gelap merah, semakin tinggi prevalensi)<br><br>
+                        🖱️ <b>Klik pada wilayah desa</b> untuk melihat informasi detail:<br>
+                        &nbsp;&nbsp;&nbsp;&nbsp;• Nama Desa & Kecamatan<br>
+                        &nbsp;&nbsp;&nbsp;&nbsp;• Nama Puskesmas<br>
+                        &nbsp;&nbsp;&nbsp;&nbsp;• Jumlah Balita Ditimbang & Sasaran<br>
+                        &nbsp;&nbsp;&nbsp;&nbsp;• Persentase Pencapaian Sasaran<br>
+                        &nbsp;&nbsp;&nbsp;&nbsp;• Jumlah & Prevalensi Stunting<br><br>
+                        🔍 <b>Gunakan scroll/zoom</b> untuk melihat detail wilayah tertentu<br><br>
+                        🔎 <b>Gunakan fitur pencarian di atas</b> untuk mencari desa tertentu dan melihat lokasinya di peta<br><br>
+                        🏘️ <b>Label kecamatan</b> ditampilkan langsung di peta untuk memudahkan identifikasi wilayah
+                    </div>
+                    """, unsafe_allow_html=True)
                 
-                st.markdown("---")
+                    st.markdown("---")
                                 
-                # Row 3: Top Desa, Kecamatan, dan Puskesmas
-                col1, col2, col3 = st.columns(3)
+                    # Row 3: Top Desa, Kecamatan, dan Puskesmas
+                    col1, col2, col3 = st.columns(3)
                 
-                with col1:
-                    st.markdown("#### 🔴 10 Desa dengan Stunting Tertinggi")
-                    top_desa = data_gdf_merged[data_gdf_merged['persen_stunting'] > 0].nlargest(10, 'persen_stunting')
+                    with col1:
+                        st.markdown("#### 🔴 10 Desa dengan Stunting Tertinggi")
+                        top_desa = peringkat(kubus['desa'])
                     
-                    for idx, row in top_desa.iterrows():
-                        with st.container():
-                            st.markdown(f"""
-                            <div style='background: linear-gradient(135deg, #fff5f5 0%, #ffe0e0 100%); 
-                                        padding: 10px; border-radius: 8px; margin: 5px 0; 
-                                        border-left: 4px solid #d9534f;'>
-                                <b style='color: #d9534f;'>{row['NAMOBJ']}</b> 
-                                <span style='color: #666;'>(Puskesmas {row['puskesmas']})</span><br>
-                                <span style='font-size: 18px; font-weight: 700; color: #d9534f;'>{row['persen_stunting']:.2f}%</span> 
-                                <span style='color: #666;'>• {int(row['jumlah_stunting'])} dari {int(row['jumlah_ditimbang_d'])} balita</span>
-                            </div>
-                            """, unsafe_allow_html=True)
+                        for idx, row in top_desa.iterrows():
+                            with st.container():
+                                st.markdown(f"""
+                                <div style='background: linear-gradient(135deg, #fff5f5 0%, #ffe0e0 100%); 
+                                            padding: 10px; border-radius: 8px; margin: 5px 0; 
+                                            border-left: 4px solid #d9534f;'>
+                                    <b style='color: #d9534f;'>{row['desa']}</b> 
+                                    <span style='color: #666;'>(Puskesmas {row['puskesmas']})</span><br>
+                                    <span style='font-size: 18px; font-weight: 700; color: #d9534f;'>{row['persen_stunting']:.2f}%</span> 
+                                    <span style='color: #666;'>• {int(row['jumlah_stunting'])} dari {int(row['jumlah_ditimbang_d'])} balita</span>
+                                </div>
+                                """, unsafe_allow_html=True)
                 
-                with col2:
-                    st.markdown("#### 🔴 10 Kecamatan dengan Stunting Tertinggi")
+                    with col2:
+                        st.markdown("#### 🔴 10 Kecamatan dengan Stunting Tertinggi")
                     
-                    # Agregasi data per kecamatan
-                    if 'WADMKC' in data_gdf_merged.columns:
-                        kecamatan_col = 'WADMKC'
-                    else:
-                        kecamatan_col = 'puskesmas'
-                    
-                    kecamatan_agg = data_gdf_merged.groupby(kecamatan_col).agg({
-                        'jumlah_stunting': 'sum',
-                        'jumlah_ditimbang_d': 'sum'
-                    }).reset_index()
+                        top_kecamatan = peringkat(kubus['kecamatan'][kubus['kecamatan']['kecamatan'] != 'N/A'])
                     
-                    kecamatan_agg['persen_stunting'] = (kecamatan_agg['jumlah_stunting'] / kecamatan_agg['jumlah_ditimbang_d'] * 100).fillna(0)
-                    top_kecamatan = kecamatan_agg[kecamatan_agg['persen_stunting'] > 0].nlargest(10, 'persen_stunting')
-                    
-                    for idx, row in top_kecamatan.iterrows():
-                        with st.container():
-                            st.markdown(f"""
-                            <div style='background: linear-gradient(135deg, #fff5f5 0%, #ffe0e0 100%); 
-                                        padding: 10px; border-radius: 8px; margin: 5px 0; 
-                                        border-left: 4px solid #d9534f;'>
-                                <b style='color: #d9534f;'>{row[kecamatan_col]}</b><br>
-                                <span style='font-size: 18px; font-weight: 700; color: #d9534f;'>{row['persen_stunting']:.2f}%</span> 
-                                <span style='color: #666;'>• {int(row['jumlah_stunting'])} dari {int(row['jumlah_ditimbang_d'])} balita</span>
-                            </div>
-                            """, unsafe_allow_html=True)
+                        for idx, row in top_kecamatan.iterrows():
+                            with st.container():
+                                st.markdown(f"""
+                                <div style='background: linear-gradient(135deg, #fff5f5 0%, #ffe0e0 100%); 
+                                            padding: 10px; border-radius: 8px; margin: 5px 0; 
+                                            border-left: 4px solid #d9534f;'>
+                                    <b style='color: #d9534f;'>{row['kecamatan']}</b><br>
+                                    <span style='font-size: 18px; font-weight: 700; color: #d9534f;'>{row['persen_stunting']:.2f}%</span> 
+                                    <span style='color: #666;'>• {int(row['jumlah_stunting'])} dari {int(row['jumlah_ditimbang_d'])} balita</span>
+                                </div>
+                                """, unsafe_allow_html=True)
                 
-                with col3:
-                    st.markdown("#### 🔴 10 Puskesmas dengan Stunting Tertinggi")
-                    
-                    # Agregasi data per puskesmas
-                    puskesmas_agg = data_gdf_merged.groupby('puskesmas').agg({
-                        'jumlah_stunting': 'sum',
-                        'jumlah_ditimbang_d': 'sum'
-                    }).reset_index()
+                    with col3:
+                        st.markdown("#### 🔴 10 Puskesmas dengan Stunting Tertinggi")
                     
-                    puskesmas_agg['persen_stunting'] = (puskesmas_agg['jumlah_stunting'] / puskesmas_agg['jumlah_ditimbang_d'] * 100).fillna(0)
-                    top_puskesmas = puskesmas_agg[puskesmas_agg['persen_stunting'] > 0].nlargest(10, 'persen_stunting')
+                        top_puskesmas = peringkat(kubus['puskesmas'])
                     
-                    for idx, row in top_puskesmas.iterrows():
-                        with st.container():
-                            st.markdown(f"""
-                            <div style='background: linear-gradient(135deg, #fff5f5 0%, #ffe0e0 100%); 
-                                        padding: 10px; border-radius: 8px; margin: 5px 0; 
-                                        border-left: 4px solid #d9534f;'>
-                                <b style='color: #d9534f;'>{row['puskesmas']}</b><br>
-                                <span style='font-size: 18px; font-weight: 700; color: #d9534f;'>{row['persen_stunting']:.2f}%</span> 
-                                <span style='color: #666;'>• {int(row['jumlah_stunting'])} dari {int(row['jumlah_ditimbang_d'])} balita</span>
-                            </div>
-                            """, unsafe_allow_html=True)
+                        for idx, row in top_puskesmas.iterrows():
+                            with st.container():
+                                st.markdown(f"""
+                                <div style='background: linear-gradient(135deg, #fff5f5 0%, #ffe0e0 100%); 
+                                            padding: 10px; border-radius: 8px; margin: 5px 0; 
+                                            border-left: 4px solid #d9534f;'>
+                                    <b style='color: #d9534f;'>{row['puskesmas']}</b><br>
+                                    <span style='font-size: 18px; font-weight: 700; color: #d9534f;'>{row['persen_stunting']:.2f}%</span> 
+                                    <span style='color: #666;'>• {int(row['jumlah_stunting'])} dari {int(row['jumlah_ditimbang_d'])} balita</span>
+                                </div>
+                                """, unsafe_allow_html=True)
                                             
-            else:
-                st.error("⚠️ File shapefile tidak ditemukan di folder 'data/'.")
-                st.info("📁 Pastikan file shapefile tersedia di folder 'data/ADMINISTRASIDESA_AR_25K.shp'")
+                else:
+                    st.error("⚠️ File shapefile tidak ditemukan di folder 'data/'.")
+                    st.info("📁 Pastikan file shapefile tersedia di folder 'data/ADMINISTRASIDESA_AR_25K.shp'")
         
         with tab2:
-            waktu_info = f"Bulan {st.session_state.pilih_bulan} (Penarikan: {st.session_state.tanggal_penarikan_str})"            
-            st.markdown(f"### 📊 PERBANDINGAN ANTAR WILAYAH BULAN "f"{pilih_bulan}")
+            if tab2.open:
+                waktu_info = f"Bulan {st.session_state.pilih_bulan} (Penarikan: {st.session_state.tanggal_penarikan_str})"            
+                st.markdown(f"### 📊 PERBANDINGAN ANTAR WILAYAH BULAN "f"{pilih_bulan}")
             
-            # Filter untuk memilih level perbandingan
-            level_perbandingan = st.selectbox(
-                "📍 Tampilkan Data:",
-                ["Puskesmas", "Kecamatan", "Desa"],
-                key="level_perbandingan"
-            )
+                # Filter untuk memilih level perbandingan
+                level_perbandingan = st.selectbox(
+                    "📍 Tampilkan Data:",
+                    ["Puskesmas", "Kecamatan", "Desa"],
+                    key="level_perbandingan"
+                )
             
-            # Tentukan dataframe berdasarkan pilihan
-            if level_perbandingan == "Puskesmas":
-                df_display_source = df_agg.copy()
-                nama_kolom = 'nama_kecamatan'
-                jumlah_max = len(df_agg)
-                jumlah_default = min(15, jumlah_max)
-            elif level_perbandingan == "Kecamatan":
-                # Load shapefile untuk mendapatkan data kecamatan
-                SHP_FILE_PATH = "data/ADMINISTRASIDESA_AR_25K.shp"
-                data_gdf = load_shapefile(SHP_FILE_PATH)
-                
-                if data_gdf is not None:
-                    # Merge df_fact dengan shapefile untuk mendapatkan kecamatan
-                    df_fact['desa_normalized'] = df_fact['desa'].str.strip().str.upper()
-                    data_gdf['NAMOBJ_normalized'] = data_gdf['NAMOBJ'].str.strip().str.upper()
-                    
-                    df_with_kec = df_fact.merge(
-                        data_gdf[['NAMOBJ_normalized', 'WADMKC']],
-                        left_on='desa_normalized',
-                        right_on='NAMOBJ_normalized',
-                        how='left'
-                    )
-                    
-                    # Agregasi per kecamatan
-                    df_kec_agg = df_with_kec.groupby('WADMKC').agg({
-                        'jumlah_ditimbang_d': 'sum',
-                        'jumlah_stunting': 'sum'
-                    }).reset_index()
-                    
-                    df_kec_agg['persentase_stunting'] = (df_kec_agg['jumlah_stunting'] / df_kec_agg['jumlah_ditimbang_d'] * 100).fillna(0)
-                    df_kec_agg.columns = ['nama_kecamatan', 'jumlah_balita_ditimbang', 'jumlah_balita_stunting', 'persentase_stunting']
-                    
-                    df_display_source = df_kec_agg.copy()
+                # Tentukan dataframe berdasarkan pilihan
+                if level_perbandingan == "Puskesmas":
+                    df_display_source = df_agg.copy()
                     nama_kolom = 'nama_kecamatan'
-                    jumlah_max = len(df_kec_agg)
+                    jumlah_max = len(df_agg)
                     jumlah_default = min(15, jumlah_max)
-                else:
-                    st.error("⚠️ Shapefile tidak ditemukan. Tidak dapat menampilkan data per kecamatan.")
-                    df_display_source = pd.DataFrame()
+                elif level_perbandingan == "Kecamatan":
+                    df_kec = kubus['kecamatan'][kubus['kecamatan']['kecamatan'] != 'N/A']
+                    df_display_source = tabel_agregat(df_kec, 'nama_kecamatan')
+                    if df_display_source.empty:
+                        st.error("⚠️ Shapefile tidak ditemukan. Tidak dapat menampilkan data per kecamatan.")
                     nama_kolom = 'nama_kecamatan'
-                    jumlah_max = 0
-                    jumlah_default = 0
-            else:  # Desa
-                # Agregasi untuk desa (karena df_fact sudah punya data per desa)
-                df_display_source = df_fact[['desa', 'jumlah_ditimbang_d', 'jumlah_stunting', 'persen_stunting']].copy()
-                df_display_source.columns = ['nama_desa', 'jumlah_balita_ditimbang', 'jumlah_balita_stunting', 'persentase_stunting']
+                    jumlah_max = len(df_display_source)
+                    jumlah_default = min(15, jumlah_max)
+                else:  # Desa
+                    # Nama desa disertai puskesmas agar desa bernama sama tidak tertumpuk
+                    df_display_source = tabel_agregat(kubus['desa'], 'nama_desa')
                 
-                nama_kolom = 'nama_desa'
-                jumlah_max = len(df_display_source)
-                jumlah_default = min(15, jumlah_max)
+                    nama_kolom = 'nama_desa'
+                    jumlah_max = len(df_display_source)
+                    jumlah_default = min(15, jumlah_max)
             
-            if not df_display_source.empty:
-                col1, col2 = st.columns([2, 1])
-                with col1:
-                    jumlah_tampil = st.slider(
-                        "🔢 Jumlah yang ditampilkan:", 
-                        min_value=5, 
-                        max_value=max(jumlah_max, 5), 
-                        value=jumlah_default,
-                        key="jumlah_slider"
-                    )
-                with col2:
-                    urutan = st.radio("📈 Urutan:", ["Tertinggi", "Terendah"], key="urutan_radio")
+                if not df_display_source.empty:
+                    col1, col2 = st.columns([2, 1])
+                    with col1:
+                        jumlah_tampil = st.slider(
+                            "🔢 Jumlah yang ditampilkan:", 
+                            min_value=5, 
+                            max_value=max(jumlah_max, 5), 
+                            value=jumlah_default,
+                            key="jumlah_slider"
+                        )
+                    with col2:
+                        urutan = st.radio("📈 Urutan:", ["Tertinggi", "Terendah"], key="urutan_radio")
                 
-                st.markdown(f"#### 📊 {level_perbandingan} dengan Kasus Stunting Tertinggi Bulan " f"{pilih_bulan}")
+                    st.markdown(f"#### 📊 {level_perbandingan} dengan Kasus Stunting Tertinggi Bulan " f"{pilih_bulan}")
                 
-                # Sorting berdasarkan urutan
-                if urutan == "Tertinggi":
-                    df_display = df_display_source.nlargest(jumlah_tampil, 'persentase_stunting')
-                else:
-                    df_display = df_display_source.nsmallest(jumlah_tampil, 'persentase_stunting')
+                    # Sorting berdasarkan urutan
+                    if urutan == "Tertinggi":
+                        df_display = df_display_source.nlargest(jumlah_tampil, 'persentase_stunting')
+                    else:
+                        df_display = df_display_source.nsmallest(jumlah_tampil, 'persentase_stunting')
                 
-                # Membuat grafik
-                fig_bar = go.Figure()
+                    # Membuat grafik
+                    fig_bar = go.Figure()
                 
-                fig_bar.add_trace(go.Bar(
-                    y=df_display[nama_kolom],
-                    x=df_display['persentase_stunting'],
-                    orientation='h',
-                    text=[f"{persen:.1f}% ({int(jml)} balita)" 
-                        for persen, jml in zip(df_display['persentase_stunting'], df_display['jumlah_balita_stunting'])],
-                    textposition='outside',
-                    marker=dict(
-                        color=df_display['persentase_stunting'],
-                        colorscale=[[0, '#fff3cd'], [0.5, '#ff8c42'], [1, '#d9534f']],
-                        showscale=True,
-                        colorbar=dict(
-                            title=dict(
-                                text="Persentase (%)",
-                                font=dict(size=12, family='Poppins')
-                            ),
-                            tickfont=dict(size=11, family='Poppins')
-                        )
-                    ),
-                    hovertemplate='<b>%{y}</b><br>Persentase: %{x:.2f}%<br><extra></extra>'
-                ))
+                    fig_bar.add_trace(go.Bar(
+                        y=df_display[nama_kolom],
+                        x=df_display['persentase_stunting'],
+                        orientation='h',
+                        text=[f"{persen:.1f}% ({int(jml)} balita)" 
+                            for persen, jml in zip(df_display['persentase_stunting'], df_display['jumlah_balita_stunting'])],
+                        textposition='outside',
+                        marker=dict(
+                            color=df_display['persentase_stunting'],
+                            colorscale=[[0, '#fff3cd'], [0.5, '#ff8c42'], [1, '#d9534f']],
+                            showscale=True,
+                            colorbar=dict(
+                                title=dict(
+                                    text="Persentase (%)",
+                                    font=dict(size=12, family='Poppins')
+                                ),
+                                tickfont=dict(size=11, family='Poppins')
+                            )
+                        ),
+                        hovertemplate='<b>%{y}</b><br>Persentase: %{x:.2f}%<br><extra></extra>'
+                    ))
                 
-                fig_bar.update_layout(
-                    height=max(450, jumlah_tampil * 35),
-                    xaxis_title='Persentase Stunting (%)',
-                    yaxis_title='',
-                    yaxis={'categoryorder':'total ascending' if urutan == "Tertinggi" else 'total descending'},
-                    font=dict(size=12, family='Poppins'),
-                    margin=dict(l=150, r=150, t=30, b=50),
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
-                st.plotly_chart(fig_bar, use_container_width=True, config={'displayModeBar': False})
+                    fig_bar.update_layout(
+                        height=max(450, jumlah_tampil * 35),
+                        xaxis_title='Persentase Stunting (%)',
+                        yaxis_title='',
+                        yaxis={'categoryorder':'total ascending' if urutan == "Tertinggi" else 'total descending'},
+                        font=dict(size=12, family='Poppins'),
+                        margin=dict(l=150, r=150, t=30, b=50),
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)'
+                    )
+                    st.plotly_chart(fig_bar, use_container_width=True, config={'displayModeBar': False})
                 
-                # Tombol download grafik
-                create_download_button_for_chart(
-                    fig_bar, 
-                    f"top_{level_perbandingan.lower()}_stunting_{urutan.lower()}",
-                    f"Top {jumlah_tampil} {level_perbandingan} dengan Stunting {urutan} {waktu_info}"
-                )
+                    # Tombol download grafik
+                    create_download_button_for_chart(
+                        fig_bar, 
+                        f"top_{level_perbandingan.lower()}_stunting_{urutan.lower()}",
+                        f"Top {jumlah_tampil} {level_perbandingan} dengan Stunting {urutan} {waktu_info}"
+                    )
+                             
+        with tab_tren:
+            if tab_tren.open:
+                st.markdown("### 📈 TREN BULANAN STUNTING, UNDERWEIGHT DAN WASTING")
+                
+                # Seri tren dibaca dari tabel rollup gudang data (sudah diagregasi per periode)
+                periode_gudang = get_warehouse().periods()
+                
+                if not periode_gudang:
+                    st.info("📚 Belum ada periode tersimpan. Upload data bulanan untuk mulai membangun riwayat tren.")
+                else:
+                    label_indikator = {
+                        'persen_stunting': 'Stunting (S/D)',
+                        'persen_kurang_gizi': 'Underweight (U/D)',
+                        'persen_wasting': 'Wasting (W/D)',
+                    }
+                    
+                    col1, col2 = st.columns([1, 2])
+                    with col1:
+                        level_tren = st.selectbox(
+                            "📍 Level Wilayah:",
+                            ["Kabupaten", "Puskesmas", "Kecamatan", "Desa"],
+                            key="level_tren"
+                        )
+                    with col2:
+                        if len(periode_gudang) > 1:
+                            dari_tren, sampai_tren = st.select_slider(
+                                "📅 Rentang Periode:",
+                                options=periode_gudang,
+                                value=(periode_gudang[0], periode_gudang[-1]),
+                                format_func=label_periode,
+                                key="rentang_tren"
+                            )
+                        else:
+                            dari_tren = sampai_tren = periode_gudang[0]
+                            st.caption(f"📅 Baru ada satu periode tersimpan: {label_periode(dari_tren)}")
+                    
+                    df_tren = get_warehouse().load_rollup(level_tren.lower(), dari_tren, sampai_tren)
+                    urutan_periode = [label_periode(p) for p in sorted(df_tren['id_waktu'].unique())]
+                    df_tren['periode'] = df_tren['id_waktu'].map(dict(zip(sorted(df_tren['id_waktu'].unique()), urutan_periode)))
+                    df_terakhir = df_tren[df_tren['id_waktu'] == df_tren['id_waktu'].max()]
+                    
+                    if level_tren == "Kabupaten":
+                        # Satu wilayah: tiga indikator dalam satu grafik
+                        df_plot = df_tren.melt(
+                            id_vars=['periode'], value_vars=list(label_indikator),
+                            var_name='indikator', value_name='persentase'
+                        )
+                        df_plot['indikator'] = df_plot['indikator'].map(label_indikator)
+                        warna_garis = 'indikator'
+                        kolom_y = 'persentase'
+                        judul_tren = f"Tren Prevalensi Kabupaten Kuningan {urutan_periode[0]} - {urutan_periode[-1]}"
+                    else:
+                        col1, col2 = st.columns([1, 2])
+                        with col1:
+                            indikator_tren = st.radio(
+                                "📊 Indikator:",
+                                list(label_indikator),
+                                format_func=label_indikator.get,
+                                key="indikator_tren"
+                            )
+                        with col2:
+                            default_wilayah = df_terakhir.nlargest(5, indikator_tren)['wilayah'].tolist()
+                            pilihan_wilayah = st.multiselect(
+                                f"🏘️ Pilih {level_tren}:",
+                                sorted(df_tren['wilayah'].unique()),
+                                default=default_wilayah,
+                                key=f"wilayah_tren_{level_tren.lower()}",
+                                help="Default: 5 wilayah dengan prevalensi tertinggi pada periode terakhir"
+                            )
+                        df_plot = df_tren[df_tren['wilayah'].isin(pilihan_wilayah)]
+                        warna_garis = 'wilayah'
+                        kolom_y = indikator_tren
+                        judul_tren = f"Tren {label_indikator[indikator_tren]} per {level_tren} {urutan_periode[0]} - {urutan_periode[-1]}"
+                    
+                    fig_tren = px.line(
+                        df_plot, x='periode', y=kolom_y, color=warna_garis, markers=True,
+                        category_orders={'periode': urutan_periode},
+                        labels={'periode': '', kolom_y: 'Persentase (%)', warna_garis: ''}
+                    )
+                    fig_tren.update_traces(hovertemplate='<b>%{fullData.name}</b><br>%{x}: %{y:.2f}%<extra></extra>')
+                    fig_tren.update_layout(
+                        height=450,
+                        font=dict(size=12, family='Poppins'),
+                        margin=dict(l=50, r=50, t=30, b=50),
+                        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='left', x=0),
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)'
+                    )
+                    st.plotly_chart(fig_tren, use_container_width=True, config={'displayModeBar': False})
+                    
+                    create_download_button_for_chart(
+                        fig_tren,
+                        f"tren_{level_tren.lower()}",
+                        judul_tren
+                    )
+                    
+                    # Perubahan periode terakhir: bulan ke bulan (MoM) dan tahun ke tahun (YoY)
+                    st.markdown(f"#### 🔁 Perubahan Periode {urutan_periode[-1]}")
+                    if level_tren == "Kabupaten":
+                        kolom_metric = st.columns(len(label_indikator))
+                        baris = df_terakhir.iloc[0]
+                        for kolom, (indikator, label) in zip(kolom_metric, label_indikator.items()):
+                            with kolom:
+                                mom = baris[f'mom_{indikator}']
+                                yoy = baris[f'yoy_{indikator}']
+                                st.metric(
+                                    label,
+                                    f"{baris[indikator]:.2f}%",
+                                    delta=None if pd.isna(mom) else f"{mom:+.2f} poin vs bulan lalu",
+                                    delta_color="inverse"
+                                )
+                                st.caption(
+                                    "YoY: " + ("belum ada data tahun lalu" if pd.isna(yoy) else f"{yoy:+.2f} poin")
+                                )
+                    else:
+                        df_perubahan = df_terakhir[[
+                            'wilayah', indikator_tren, f'mom_{indikator_tren}', f'yoy_{indikator_tren}'
+                        ]].sort_values(indikator_tren, ascending=False)
+                        st.dataframe(
+                            df_perubahan,
+                            hide_index=True,
+                            use_container_width=True,
+                            column_config={
+                                'wilayah': level_tren,
+                                indikator_tren: st.column_config.NumberColumn(label_indikator[indikator_tren], format="%.2f%%"),
+                                f'mom_{indikator_tren}': st.column_config.NumberColumn("MoM (poin)", format="%+.2f"),
+                                f'yoy_{indikator_tren}': st.column_config.NumberColumn("YoY (poin)", format="%+.2f"),
+                            }
+                        )
                              
         with tab3:
-            waktu_info = f"Bulan {st.session_state.pilih_bulan} (Penarikan: {st.session_state.tanggal_penarikan_str})"            
-            st.markdown(f"### 🎯 SEBARAN STATUS GIZI BALITA KABUPATEN KUNINGAN")
+            if tab3.open:
+                waktu_info = f"Bulan {st.session_state.pilih_bulan} (Penarikan: {st.session_state.tanggal_penarikan_str})"            
+                st.markdown(f"### 🎯 SEBARAN STATUS GIZI BALITA KABUPATEN KUNINGAN")
             
-            col1, col2 = st.columns([1, 1])
+                col1, col2 = st.columns([1, 1])
             
-            with col1:
-                st.markdown(f"#### 📊 Komposisi Status Gizi Balita Bulan " f"{pilih_bulan}")
+                with col1:
+                    st.markdown(f"#### 📊 Komposisi Status Gizi Balita Bulan " f"{pilih_bulan}")
                 
-                total_normal = total_ditimbang - total_stunting - total_kurang_gizi - total_wasting
+                    total_normal = total_ditimbang - total_stunting - total_kurang_gizi - total_wasting
                 
-                labels = ['Stunting', 'Underweight', 'Wasting', 'Normal']
-                values = [total_stunting, total_kurang_gizi, total_wasting, total_normal]
-                colors = ['#d9534f', '#f0ad4e', '#ff8c42', '#5bc0de']
+                    labels = ['Stunting', 'Underweight', 'Wasting', 'Normal']
+                    values = [total_stunting, total_kurang_gizi, total_wasting, total_normal]
+                    colors = ['#d9534f', '#f0ad4e', '#ff8c42', '#5bc0de']
                 
-                fig_pie = go.Figure(data=[go.Pie(
-                    labels=labels,
-                    values=values,
-                    hole=0.5,
-                    marker_colors=colors,
-                    textinfo='label+percent',
-                    textfont=dict(size=13, family='Poppins', color='white'),
-                    hovertemplate='<b>%{label}</b><br>Jumlah: %{value:,} balita<br>Persentase: %{percent}<extra></extra>'
-                )])
+                    fig_pie = go.Figure(data=[go.Pie(
+                        labels=labels,
+                        values=values,
+                        hole=0.5,
+                        marker_colors=colors,
+                        textinfo='label+percent',
+                        textfont=dict(size=13, family='Poppins', color='white'),
+                        hovertemplate='<b>%{label}</b><br>Jumlah: %{value:,} balita<br>Persentase: %{percent}<extra></extra>'
+                    )])
                 
-                fig_pie.update_layout(
-                    height=500,
-                    title_text="",
-                    title_font=dict(size=16, family='Poppins', color='#667eea'),
-                    font=dict(size=12, family='Poppins'),
-                    showlegend=True,
-                    legend=dict(
-                        orientation="v",
-                        yanchor="middle",
-                        y=0.5,
-                        xanchor="left",
-                        x=1.02
-                    ),
-                    margin=dict(t=80, b=20, l=20, r=150),
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
-                st.plotly_chart(fig_pie, use_container_width=True, config={'displayModeBar': False})
+                    fig_pie.update_layout(
+                        height=500,
+                        title_text="",
+                        title_font=dict(size=16, family='Poppins', color='#667eea'),
+                        font=dict(size=12, family='Poppins'),
+                        showlegend=True,
+                        legend=dict(
+                            orientation="v",
+                            yanchor="middle",
+                            y=0.5,
+                            xanchor="left",
+                            x=1.02
+                        ),
+                        margin=dict(t=80, b=20, l=20, r=150),
+                        paper_bgcolor='rgba(0,0,0,0)'
+                    )
+                    st.plotly_chart(fig_pie, use_container_width=True, config={'displayModeBar': False})
                 
-                # Tombol download grafik
-                create_download_button_for_chart(
-                    fig_pie, 
-                    "komposisi_status_gizi_balita",
-                    f"Komposisi Status Gizi Balita Bulan " f"{pilih_bulan}"
-                )
+                    # Tombol download grafik
+                    create_download_button_for_chart(
+                        fig_pie, 
+                        "komposisi_status_gizi_balita",
+                        f"Komposisi Status Gizi Balita Bulan " f"{pilih_bulan}"
+                    )
             
-            with col2:
-                st.markdown("<br>", unsafe_allow_html=True)
-                st.markdown("<br>", unsafe_allow_html=True)
-                st.markdown("<br>", unsafe_allow_html=True)
-                st.markdown("<br>", unsafe_allow_html=True)
-                st.markdown("<br>", unsafe_allow_html=True)
-                st.markdown("<br>", unsafe_allow_html=True)
+                with col2:
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    st.markdown("<br>", unsafe_allow_html=True)
 
                 
-                # Row 1: Stunting dan Underweight
-                col_card1, col_card2 = st.columns(2, gap="medium")
+                    # Row 1: Stunting dan Underweight
+                    col_card1, col_card2 = st.columns(2, gap="medium")
                 
-                with col_card1:
-                    # Card Stunting
-                    persen_stunting_total = (total_stunting / total_ditimbang * 100) if total_ditimbang > 0 else 0
-                    st.markdown(f"""
-                    <div style='background: linear-gradient(135deg, #fff5f5 0%, #ffe0e0 100%); 
-                                padding: 12px 15px; border-radius: 10px; 
-                                border-left: 4px solid #d9534f; box-shadow: 0 2px 8px rgba(0,0,0,0.08);'>
-                        <h4 style='color: #d9534f; margin: 0 0 8px 0; font-size: 14px;'>
-                            🔴 Stunting (S)
-                        </h4>
-                        <div style='display: flex; justify-content: space-between; align-items: center;'>
-                            <div>
-                                <p style='margin: 0; font-size: 10px; color: #888;'>Jumlah</p>
-                                <p style='margin: 2px 0 0 0; font-size: 20px; font-weight: 700; color: #d9534f;'>
-                                    {total_stunting:,}
-                                </p>
+                    with col_card1:
+                        # Card Stunting
+                        persen_stunting_total = (total_stunting / total_ditimbang * 100) if total_ditimbang > 0 else 0
+                        st.markdown(f"""
+                        <div style='background: linear-gradient(135deg, #fff5f5 0%, #ffe0e0 100%); 
+                                    padding: 12px 15px; border-radius: 10px; 
+                                    border-left: 4px solid #d9534f; box-shadow: 0 2px 8px rgba(0,0,0,0.08);'>
+                            <h4 style='color: #d9534f; margin: 0 0 8px 0; font-size: 14px;'>
+                                🔴 Stunting (S)
+                            </h4>
+                            <div style='display: flex; justify-content: space-between; align-items: center;'>
+                                <div>
+                                    <p style='margin: 0; font-size: 10px; color: #888;'>Jumlah</p>
+                                    <p style='margin: 2px 0 0 0; font-size: 20px; font-weight: 700; color: #d9534f;'>
+                                        {total_stunting:,}
+                                    </p>
+                                </div>
+                                <div style='text-align: right;'>
+                                    <p style='margin: 0; font-size: 10px; color: #888;'>Ditimbang (D)</p>
+                                    <p style='margin: 2px 0 0 0; font-size: 16px; font-weight: 600; color: #666;'>
+                                        {total_ditimbang:,}
+                                    </p>
+                                </div>
                             </div>
-                            <div style='text-align: right;'>
-                                <p style='margin: 0; font-size: 10px; color: #888;'>Ditimbang (D)</p>
-                                <p style='margin: 2px 0 0 0; font-size: 16px; font-weight: 600; color: #666;'>
-                                    {total_ditimbang:,}
+                            <div style='margin-top: 8px; padding-top: 8px; border-top: 1px solid #ffcccc;'>
+                                <p style='margin: 0; font-size: 16px; font-weight: 700; color: #d9534f; text-align: center;'>
+                                    {persen_stunting_total:.2f}% (S/D)
                                 </p>
                             </div>
                         </div>
-                        <div style='margin-top: 8px; padding-top: 8px; border-top: 1px solid #ffcccc;'>
-                            <p style='margin: 0; font-size: 16px; font-weight: 700; color: #d9534f; text-align: center;'>
-                                {persen_stunting_total:.2f}% (S/D)
-                            </p>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                        """, unsafe_allow_html=True)
                 
-                with col_card2:
-                    # Card Underweight (Kurang Gizi)
-                    persen_kurang_gizi_total = (total_kurang_gizi / total_ditimbang * 100) if total_ditimbang > 0 else 0
-                    st.markdown(f"""
-                    <div style='background: linear-gradient(135deg, #fff9f0 0%, #ffe8cc 100%); 
-                                padding: 12px 15px; border-radius: 10px; 
-                                border-left: 4px solid #f0ad4e; box-shadow: 0 2px 8px rgba(0,0,0,0.08);'>
-                        <h4 style='color: #f0ad4e; margin: 0 0 8px 0; font-size: 14px;'>
-                            🟡 Underweight (U)
-                        </h4>
-                        <div style='display: flex; justify-content: space-between; align-items: center;'>
-                            <div>
-                                <p style='margin: 0; font-size: 10px; color: #888;'>Jumlah</p>
-                                <p style='margin: 2px 0 0 0; font-size: 20px; font-weight: 700; color: #f0ad4e;'>
-                                    {total_kurang_gizi:,}
-                                </p>
+                    with col_card2:
+                        # Card Underweight (Kurang Gizi)
+                        persen_kurang_gizi_total = (total_kurang_gizi / total_ditimbang * 100) if total_ditimbang > 0 else 0
+                        st.markdown(f"""
+                        <div style='background: linear-gradient(135deg, #fff9f0 0%, #ffe8cc 100%); 
+                                    padding: 12px 15px; border-radius: 10px; 
+                                    border-left: 4px solid #f0ad4e; box-shadow: 0 2px 8px rgba(0,0,0,0.08);'>
+                            <h4 style='color: #f0ad4e; margin: 0 0 8px 0; font-size: 14px;'>
+                                🟡 Underweight (U)
+                            </h4>
+                            <div style='display: flex; justify-content: space-between; align-items: center;'>
+                                <div>
+                                    <p style='margin: 0; font-size: 10px; color: #888;'>Jumlah</p>
+                                    <p style='margin: 2px 0 0 0; font-size: 20px; font-weight: 700; color: #f0ad4e;'>
+                                        {total_kurang_gizi:,}
+                                    </p>
+                                </div>
+                                <div style='text-align: right;'>
+                                    <p style='margin: 0; font-size: 10px; color: #888;'>Ditimbang (D)</p>
+                                    <p style='margin: 2px 0 0 0; font-size: 16px; font-weight: 600; color: #666;'>
+                                        {total_ditimbang:,}
+                                    </p>
+                                </div>
                             </div>
-                            <div style='text-align: right;'>
-                                <p style='margin: 0; font-size: 10px; color: #888;'>Ditimbang (D)</p>
-                                <p style='margin: 2px 0 0 0; font-size: 16px; font-weight: 600; color: #666;'>
-                                    {total_ditimbang:,}
+                            <div style='margin-top: 8px; padding-top: 8px; border-top: 1px solid #ffe0b3;'>
+                                <p style='margin: 0; font-size: 16px; font-weight: 700; color: #f0ad4e; text-align: center;'>
+                                    {persen_kurang_gizi_total:.2f}% (U/D)
                                 </p>
                             </div>
                         </div>
-                        <div style='margin-top: 8px; padding-top: 8px; border-top: 1px solid #ffe0b3;'>
-                            <p style='margin: 0; font-size: 16px; font-weight: 700; color: #f0ad4e; text-align: center;'>
-                                {persen_kurang_gizi_total:.2f}% (U/D)
-                            </p>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                        """, unsafe_allow_html=True)
                 
-                st.markdown("<br>", unsafe_allow_html=True)
+                    st.markdown("<br>", unsafe_allow_html=True)
                 
-                # Row 2: Wasting dan Normal
-                col_card3, col_card4 = st.columns(2, gap="medium")
+                    # Row 2: Wasting dan Normal
+                    col_card3, col_card4 = st.columns(2, gap="medium")
                 
-                with col_card3:
-                    # Card Wasting
-                    persen_wasting_total = (total_wasting / total_ditimbang * 100) if total_ditimbang > 0 else 0
-                    st.markdown(f"""
-                    <div style='background: linear-gradient(135deg, #fff5f0 0%, #ffd9cc 100%); 
-                                padding: 12px 15px; border-radius: 10px; 
-                                border-left: 4px solid #ff8c42; box-shadow: 0 2px 8px rgba(0,0,0,0.08);'>
-                        <h4 style='color: #ff8c42; margin: 0 0 8px 0; font-size: 14px;'>
-                            🟠 Wasting (W)
-                        </h4>
-                        <div style='display: flex; justify-content: space-between; align-items: center;'>
-                            <div>
-                                <p style='margin: 0; font-size: 10px; color: #888;'>Jumlah</p>
-                                <p style='margin: 2px 0 0 0; font-size: 20px; font-weight: 700; color: #ff8c42;'>
-                                    {total_wasting:,}
-                                </p>
+                    with col_card3:
+                        # Card Wasting
+                        persen_wasting_total = (total_wasting / total_ditimbang * 100) if total_ditimbang > 0 else 0
+                        st.markdown(f"""
+                        <div style='background: linear-gradient(135deg, #fff5f0 0%, #ffd9cc 100%); 
+                                    padding: 12px 15px; border-radius: 10px; 
+                                    border-left: 4px solid #ff8c42; box-shadow: 0 2px 8px rgba(0,0,0,0.08);'>
+                            <h4 style='color: #ff8c42; margin: 0 0 8px 0; font-size: 14px;'>
+                                🟠 Wasting (W)
+                            </h4>
+                            <div style='display: flex; justify-content: space-between; align-items: center;'>
+                                <div>
+                                    <p style='margin: 0; font-size: 10px; color: #888;'>Jumlah</p>
+                                    <p style='margin: 2px 0 0 0; font-size: 20px; font-weight: 700; color: #ff8c42;'>
+                                        {total_wasting:,}
+                                    </p>
+                                </div>
+                                <div style='text-align: right;'>
+                                    <p style='margin: 0; font-size: 10px; color: #888;'>Ditimbang (D)</p>
+                                    <p style='margin: 2px 0 0 0; font-size: 16px; font-weight: 600; color: #666;'>
+                                        {total_ditimbang:,}
+                                    </p>
+                                </div>
                             </div>
-                            <div style='text-align: right;'>
-                                <p style='margin: 0; font-size: 10px; color: #888;'>Ditimbang (D)</p>
-                                <p style='margin: 2px 0 0 0; font-size: 16px; font-weight: 600; color: #666;'>
-                                    {total_ditimbang:,}
+                            <div style='margin-top: 8px; padding-top: 8px; border-top: 1px solid #ffccb3;'>
+                                <p style='margin: 0; font-size: 16px; font-weight: 700; color: #ff8c42; text-align: center;'>
+                                    {persen_wasting_total:.2f}% (W/D)
                                 </p>
                             </div>
                         </div>
-                        <div style='margin-top: 8px; padding-top: 8px; border-top: 1px solid #ffccb3;'>
-                            <p style='margin: 0; font-size: 16px; font-weight: 700; color: #ff8c42; text-align: center;'>
-                                {persen_wasting_total:.2f}% (W/D)
-                            </p>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                        """, unsafe_allow_html=True)
                 
-                with col_card4:
-                    # Card Normal
-                    persen_normal_total = (total_normal / total_ditimbang * 100) if total_ditimbang > 0 else 0
-                    st.markdown(f"""
-                    <div style='background: linear-gradient(135deg, #f0f8ff 0%, #d9eeff 100%); 
-                                padding: 12px 15px; border-radius: 10px; 
-                                border-left: 4px solid #5bc0de; box-shadow: 0 2px 8px rgba(0,0,0,0.08);'>
-                        <h4 style='color: #5bc0de; margin: 0 0 8px 0; font-size: 14px;'>
-                            🔵 Normal (N)
-                        </h4>
-                        <div style='display: flex; justify-content: space-between; align-items: center;'>
-                            <div>
-                                <p style='margin: 0; font-size: 10px; color: #888;'>Jumlah</p>
-                                <p style='margin: 2px 0 0 0; font-size: 20px; font-weight: 700; color: #5bc0de;'>
-                                    {total_normal:,}
-                                </p>
+                    with col_card4:
+                        # Card Normal
+                        persen_normal_total = (total_normal / total_ditimbang * 100) if total_ditimbang > 0 else 0
+                        st.markdown(f"""
+                        <div style='background: linear-gradient(135deg, #f0f8ff 0%, #d9eeff 100%); 
+                                    padding: 12px 15px; border-radius: 10px; 
+                                    border-left: 4px solid #5bc0de; box-shadow: 0 2px 8px rgba(0,0,0,0.08);'>
+                            <h4 style='color: #5bc0de; margin: 0 0 8px 0; font-size: 14px;'>
+                                🔵 Normal (N)
+                            </h4>
+                            <div style='display: flex; justify-content: space-between; align-items: center;'>
+                                <div>
+                                    <p style='margin: 0; font-size: 10px; color: #888;'>Jumlah</p>
+                                    <p style='margin: 2px 0 0 0; font-size: 20px; font-weight: 700; color: #5bc0de;'>
+                                        {total_normal:,}
+                                    </p>
+                                </div>
+                                <div style='text-align: right;'>
+                                    <p style='margin: 0; font-size: 10px; color: #888;'>Ditimbang (D)</p>
+                                    <p style='margin: 2px 0 0 0; font-size: 16px; font-weight: 600; color: #666;'>
+                                        {total_ditimbang:,}
+                                    </p>
+                                </div>
                             </div>
-                            <div style='text-align: right;'>
-                                <p style='margin: 0; font-size: 10px; color: #888;'>Ditimbang (D)</p>
-                                <p style='margin: 2px 0 0 0; font-size: 16px; font-weight: 600; color: #666;'>
-                                    {total_ditimbang:,}
+                            <div style='margin-top: 8px; padding-top: 8px; border-top: 1px solid #b3e0ff;'>
+                                <p style='margin: 0; font-size: 16px; font-weight: 700; color: #5bc0de; text-align: center;'>
+                                    {persen_normal_total:.2f}% (N/D)
                                 </p>
                             </div>
                         </div>
-                        <div style='margin-top: 8px; padding-top: 8px; border-top: 1px solid #b3e0ff;'>
-                            <p style='margin: 0; font-size: 16px; font-weight: 700; color: #5bc0de; text-align: center;'>
-                                {persen_normal_total:.2f}% (N/D)
-                            </p>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)            
+                        """, unsafe_allow_html=True)            
             
-            st.markdown("""
-            <div class="info-box">
-                <b>📚 Penjelasan Indikator Gizi</b><br><br>
-                🔴 <b>BB/U (Berat Badan per Usia)</b><br>
-                &nbsp;&nbsp;&nbsp;&nbsp;Mengukur kecukupan berat badan anak sesuai usianya<br><br>
-                🟡 <b>TB/U (Tinggi Badan per Usia)</b><br>
-                &nbsp;&nbsp;&nbsp;&nbsp;Mengukur stunting atau kekurangan gizi kronis<br><br>
-                🟠 <b>BB/TB (Berat Badan per Tinggi Badan)</b><br>
-                &nbsp;&nbsp;&nbsp;&nbsp;Mengukur wasting atau kekurangan gizi akut
-            </div>
-            """, unsafe_allow_html=True)
+                st.markdown("""
+                <div class="info-box">
+                    <b>📚 Penjelasan Indikator Gizi</b><br><br>
+                    🔴 <b>BB/U (Berat Badan per Usia)</b><br>
+                    &nbsp;&nbsp;&nbsp;&nbsp;Mengukur kecukupan berat badan anak sesuai usianya<br><br>
+                    🟡 <b>TB/U (Tinggi Badan per Usia)</b><br>
+                    &nbsp;&nbsp;&nbsp;&nbsp;Mengukur stunting atau kekurangan gizi kronis<br><br>
+                    🟠 <b>BB/TB (Berat Badan per Tinggi Badan)</b><br>
+                    &nbsp;&nbsp;&nbsp;&nbsp;Mengukur wasting atau kekurangan gizi akut
+                </div>
+                """, unsafe_allow_html=True)
         
         with tab4:
-            waktu_info = f"Bulan {st.session_state.pilih_bulan} (Penarikan: {st.session_state.tanggal_penarikan_str})"            
-            st.markdown(f"### 📋 DATA STUNTING PER WILAYAH KABUPATEN KUNINGAN DALAM TABLE BULAN "f"{pilih_bulan}")
-            
-            df_desa_table = df_fact.copy()
-
+            if tab4.open:
+                waktu_info = f"Bulan {st.session_state.pilih_bulan} (Penarikan: {st.session_state.tanggal_penarikan_str})"            
+                st.markdown(f"### 📋 DATA STUNTING PER WILAYAH KABUPATEN KUNINGAN DALAM TABLE BULAN "f"{pilih_bulan}")
             
-            # Load shapefile untuk mendapatkan data kecamatan
-            SHP_FILE_PATH = "data/ADMINISTRASIDESA_AR_25K.shp"
-            data_gdf = load_shapefile(SHP_FILE_PATH)
+                df_table = tabel_data(df_fact, df_wilayah)
             
-            if data_gdf is not None:
-                # Buat mapping desa ke kecamatan dari shapefile
-                desa_kecamatan_map = data_gdf[['NAMOBJ', 'WADMKC']].copy()
-                desa_kecamatan_map['NAMOBJ'] = desa_kecamatan_map['NAMOBJ'].str.strip().str.upper()
-                desa_kecamatan_map = desa_kecamatan_map.drop_duplicates(subset=['NAMOBJ'])
-                desa_kecamatan_map = dict(zip(desa_kecamatan_map['NAMOBJ'], desa_kecamatan_map['WADMKC']))
-            else:
-                desa_kecamatan_map = {}
-            
-            # Siapkan data desa dengan kolom yang sesuai
-            df_display = df_desa_table[['desa', 'puskesmas', 'sasaran_total', 'jumlah_ditimbang_d', 
-                                        'persentase_ds', 'jumlah_stunting', 'persen_stunting',
-                                        'jumlah_kurang_gizi', 'persen_kurang_gizi',
-                                        'jumlah_wasting', 'persen_wasting']].copy()
-            
-            df_display.columns = ['nama_desa', 'nama_puskesmas', 'sasaran_total', 'jumlah_balita_ditimbang',
-                                'persentase_sasaran', 'jumlah_balita_stunting', 'persentase_stunting',
-                                'jumlah_balita_kurang_gizi', 'persentase_kurang_gizi',
-                                'jumlah_balita_wasting', 'persentase_wasting']
-            
-            # Tambahkan kolom kecamatan dari mapping shapefile
-            df_display['nama_kecamatan'] = df_display['nama_desa'].map(desa_kecamatan_map)
-            df_display['nama_kecamatan'] = df_display['nama_kecamatan'].fillna('N/A')
-            
-            # Tambahkan kategori untuk desa
-            df_display['kategori'] = pd.cut(
-                df_display['persentase_stunting'],
-                bins=[0, 5, 10, 20, 100],
-                labels=['Rendah (<5%)', 'Sedang (5-10%)', 'Tinggi (10-20%)', 'Sangat Tinggi (>20%)']
-            )
-            
-            st.markdown("---")
-            
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                search_term = st.text_input(
-                    "🔍 Cari Desa:", 
-                    placeholder="Ketik nama desa...",
-                    key="search_wilayah"
-                )
-            with col2:
-                sort_by = st.selectbox(
-                    "📊 Urutkan:", 
-                    ["Nama", "% Stunting", "Jml Stunting", "Jml Ditimbang"],
-                    key="sort_by_table"
-                )
-            
-            # Filter berdasarkan pencarian
-            if search_term:
-                df_display = df_display[df_display['nama_desa'].str.contains(search_term.upper(), na=False)]
-            
-            # Sorting
-            if sort_by == "Nama":
-                df_display = df_display.sort_values('nama_desa')
-            elif sort_by == "% Stunting":
-                df_display = df_display.sort_values('persentase_stunting', ascending=False)
-            elif sort_by == "Jml Stunting":
-                df_display = df_display.sort_values('jumlah_balita_stunting', ascending=False)
-            else:
-                df_display = df_display.sort_values('jumlah_balita_ditimbang', ascending=False)
+                st.markdown("---")
             
-            # Siapkan tabel untuk ditampilkan dengan urutan: Desa, Kecamatan, Puskesmas
-            df_table = df_display[['nama_desa', 'nama_kecamatan', 'nama_puskesmas', 'sasaran_total', 'jumlah_balita_ditimbang', 
-                                'persentase_sasaran', 'jumlah_balita_stunting', 
-                                'persentase_stunting', 'jumlah_balita_kurang_gizi', 
-                                'persentase_kurang_gizi', 'jumlah_balita_wasting', 
-                                'persentase_wasting', 'kategori']].copy()
+                def ke_halaman_pertama():
+                    st.session_state.halaman_tabel = 1
             
-            df_table.columns = ['Desa', 'Kecamatan', 'Puskesmas', 'Sasaran (Sa)', 'Ditimbang (D)', 'Prevalensi Sasaran (D/Sa)', 'Stunting (S)', 'Prevalensi Stunting (S/D)', 
-                            'Underweight (U)', 'Prevalensi Underweight (U/D)', 'Wasting (W)', 'Prevalensi Wasting (W/D)', 'Kategori']
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    search_term = st.text_input(
+                        "🔍 Cari Desa / Kecamatan / Puskesmas:", 
+                        placeholder="Ketik nama desa, kecamatan atau puskesmas...",
+                        key="search_wilayah",
+                        on_change=ke_halaman_pertama
+                    )
+                with col2:
+                    sort_by = st.selectbox(
+                        "📊 Urutkan:", 
+                        ["Nama", "% Stunting", "Jml Stunting", "Jml Ditimbang"],
+                        key="sort_by_table",
+                        on_change=ke_halaman_pertama
+                    )
             
-            # Format angka
-            df_table['Sasaran (Sa)'] = df_table['Sasaran (Sa)'].apply(lambda x: f"{int(x):,}")
-            df_table['Ditimbang (D)'] = df_table['Ditimbang (D)'].apply(lambda x: f"{int(x):,}")
-            df_table['Prevalensi Sasaran (D/Sa)'] = df_table['Prevalensi Sasaran (D/Sa)'].apply(lambda x: f"{x:.2f}%")
-            df_table['Stunting (S)'] = df_table['Stunting (S)'].apply(lambda x: f"{int(x):,}")
-            df_table['Prevalensi Stunting (S/D)'] = df_table['Prevalensi Stunting (S/D)'].apply(lambda x: f"{x:.2f}%")
-            df_table['Underweight (U)'] = df_table['Underweight (U)'].apply(lambda x: f"{int(x):,}")
-            df_table['Prevalensi Underweight (U/D)'] = df_table['Prevalensi Underweight (U/D)'].apply(lambda x: f"{x:.2f}%")
-            df_table['Wasting (W)'] = df_table['Wasting (W)'].apply(lambda x: f"{int(x):,}")
-            df_table['Prevalensi Wasting (W/D)'] = df_table['Prevalensi Wasting (W/D)'].apply(lambda x: f"{x:.2f}%")
+                # Filter lewat indeks pencarian (awalan, potongan nama dan ejaan mirip)
+                if search_term:
+                    relevansi = relevansi_baris(indeks_tabel_data(df_fact, df_wilayah), df_table, search_term)
+                    df_table = df_table.assign(relevansi=relevansi)[relevansi >= 0]
             
-            # Fungsi highlight berdasarkan kategori
-            def highlight_kategori(row):
-                if 'Sangat Tinggi' in str(row['Kategori']):
-                    return ['background-color: #ffcccc'] * len(row)
-                elif 'Tinggi' in str(row['Kategori']):
-                    return ['background-color: #ffe6cc'] * len(row)
-                elif 'Sedang' in str(row['Kategori']):
-                    return ['background-color: #fff4cc'] * len(row)
+                # Sorting (kolom numerik, bukan teks hasil format)
+                if sort_by == "Nama":
+                    df_table = df_table.sort_values('desa')
+                elif sort_by == "% Stunting":
+                    df_table = df_table.sort_values('persen_stunting', ascending=False)
+                elif sort_by == "Jml Stunting":
+                    df_table = df_table.sort_values('jumlah_stunting', ascending=False)
                 else:
-                    return ['background-color: #d4edda'] * len(row)
+                    df_table = df_table.sort_values('jumlah_ditimbang_d', ascending=False)
+                if search_term:
+                    # Hasil paling relevan di atas; urutan pilihan berlaku di antara yang setara
+                    df_table = df_table.sort_values('relevansi', ascending=False, kind='stable')
             
-            df_styled = df_table.style.apply(highlight_kategori, axis=1)
+                # Paginasi di server: hanya satu halaman yang diserialisasi ke browser
+                jumlah_halaman = max(1, -(-len(df_table) // UKURAN_HALAMAN_TABEL))
+                if st.session_state.get('halaman_tabel', 1) > jumlah_halaman:
+                    st.session_state.halaman_tabel = 1
+                awal = (st.session_state.get('halaman_tabel', 1) - 1) * UKURAN_HALAMAN_TABEL
             
-            st.dataframe(df_styled, use_container_width=True, height=500)
+                st.dataframe(
+                    df_table.iloc[awal:awal + UKURAN_HALAMAN_TABEL][list(KOLOM_TABEL_DATA)],
+                    hide_index=True,
+                    use_container_width=True,
+                    height=500,
+                    column_config=KONFIGURASI_TABEL_DATA,
+                )
             
-            # Info jumlah data
-            total_data = len(df_fact)
-            st.info(f"📊 Menampilkan **{len(df_display)}** dari **{total_data}** desa")
+                col_info, col_halaman = st.columns([3, 1])
+                with col_halaman:
+                    st.number_input(
+                        f"Halaman (dari {jumlah_halaman})", min_value=1, max_value=jumlah_halaman,
+                        step=1, key="halaman_tabel"
+                    )
+                with col_info:
+                    # Info jumlah data
+                    total_data = len(df_fact)
+                    if len(df_table):
+                        st.info(
+                            f"📊 Menampilkan **{awal + 1}-{min(awal + UKURAN_HALAMAN_TABEL, len(df_table))}** "
+                            f"dari **{len(df_table)}** desa (total {total_data})"
+                        )
+                    else:
+                        st.info(f"📊 Menampilkan **0** dari **{total_data}** desa")
         
         with tab5:
-            st.markdown("### 💾 DOWNLOAD HASIL ETL DAN ANALISIS")
+            if tab5.open:
+                st.markdown("### 💾 DOWNLOAD HASIL ETL DAN ANALISIS")
             
-            col1, col2 = st.columns(2)
+                col1, col2 = st.columns(2)
             
-            with col1:
-                st.markdown("#### 📊 Hasil ETL (Star Schema)")
+                with col1:
+                    st.markdown("#### 📊 Hasil ETL (Star Schema)")
                 
-                csv_fact = df_fact.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Fact Gizi Balita",
-                    data=csv_fact,
-                    file_name="fact_kesehatan.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+                    csv_fact = df_fact.to_csv(index=False)
+                    st.download_button(
+                        label="📥 Download Fact Gizi Balita",
+                        data=csv_fact,
+                        file_name="fact_kesehatan.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
                 
-                csv_wilayah = df_wilayah.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Dimensi Wilayah",
-                    data=csv_wilayah,
-                    file_name="dim_wilayah.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+                    csv_wilayah = df_wilayah.to_csv(index=False)
+                    st.download_button(
+                        label="📥 Download Dimensi Wilayah",
+                        data=csv_wilayah,
+                        file_name="dim_wilayah.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
                 
-                csv_waktu = df_waktu.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Dimensi Waktu",
-                    data=csv_waktu,
-                    file_name="dim_waktu.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+                    csv_waktu = df_waktu.to_csv(index=False)
+                    st.download_button(
+                        label="📥 Download Dimensi Waktu",
+                        data=csv_waktu,
+                        file_name="dim_waktu.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
             
-            with col2:
-                st.markdown("#### 📈 Data Analisis")
+                with col2:
+                    st.markdown("#### 📈 Data Analisis")
                 
-                csv_agg = df_agg.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Data Agregat",
-                    data=csv_agg,
-                    file_name="data_agregat_puskesmas.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+                    csv_agg = df_agg.to_csv(index=False)
+                    st.download_button(
+                        label="📥 Download Data Agregat",
+                        data=csv_agg,
+                        file_name="data_agregat_puskesmas.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
                 
-                summary_data = {
-                    'Indikator': ['Total Balita Ditimbang', 'Total Stunting', 'Persentase Stunting Rata-rata',
-                                 'Total Kurang Gizi', 'Total Wasting', 'Jumlah Puskesmas'],
-                    'Nilai': [total_ditimbang, total_stunting, f"{avg_stunting:.2f}%",
-                             total_kurang_gizi, total_wasting, len(df_agg)]
-                }
-                df_summary = pd.DataFrame(summary_data)
-                csv_summary = df_summary.to_csv(index=False)
+                    summary_data = {
+                        'Indikator': ['Total Balita Ditimbang', 'Total Stunting', 'Persentase Stunting Rata-rata',
+                                     'Total Kurang Gizi', 'Total Wasting', 'Jumlah Puskesmas'],
+                        'Nilai': [total_ditimbang, total_stunting, f"{avg_stunting:.2f}%",
+                                 total_kurang_gizi, total_wasting, len(df_agg)]
+                    }
+                    df_summary = pd.DataFrame(summary_data)
+                    csv_summary = df_summary.to_csv(index=False)
                 
-                st.download_button(
-                    label="📥 Download Ringkasan Statistik",
-                    data=csv_summary,
-                    file_name="ringkasan_statistik.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+                    st.download_button(
+                        label="📥 Download Ringkasan Statistik",
+                        data=csv_summary,
+                        file_name="ringkasan_statistik.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
             
-            st.markdown("---")
+                st.markdown("---")
             
-            st.markdown("""
-            <div class="info-box">
-                <b>ℹ️ Informasi File</b><br><br>
-                📄 <b>Fact Kesehatan:</b> Tabel fakta berisi semua data gizi per puskesmas/desa<br>
-                🏥 <b>Dimensi Wilayah:</b> Daftar puskesmas dan desa<br>
-                📅 <b>Dimensi Waktu:</b> Informasi waktu pengambilan data<br>
-                📊 <b>Data Agregat:</b> Ringkasan data per puskesmas (sudah diagregasi)<br>
-                📈 <b>Ringkasan Statistik:</b> Statistik umum untuk laporan<br>
-                🖼️ <b>Grafik PNG:</b> Tersedia tombol download di setiap grafik
-            </div>
-            """, unsafe_allow_html=True)
+                st.markdown("""
+                <div class="info-box">
+                    <b>ℹ️ Informasi File</b><br><br>
+                    📄 <b>Fact Kesehatan:</b> Tabel fakta berisi semua data gizi per puskesmas/desa<br>
+                    🏥 <b>Dimensi Wilayah:</b> Daftar puskesmas dan desa<br>
+                    📅 <b>Dimensi Waktu:</b> Informasi waktu pengambilan data<br>
+                    📊 <b>Data Agregat:</b> Ringkasan data per puskesmas (sudah diagregasi)<br>
+                    📈 <b>Ringkasan Statistik:</b> Statistik umum untuk laporan<br>
+                    🖼️ <b>Grafik PNG:</b> Tersedia tombol download di setiap grafik
+                </div>
+                """, unsafe_allow_html=True)
 
         # Footer dengan styling baru
         st.markdown("---")
@@ -0,0 +1,32 @@
+"""
+Pengukuran waktu bersama untuk subperintah benchmark setiap modul
+
+Waktu yang dilaporkan adalah waktu terbaik (minimum) dari beberapa kali
+pengulangan: gangguan dari proses lain hanya bisa menambah waktu, sehingga nilai
+minimum paling dekat dengan biaya sebenarnya fungsi yang diukur.
+"""
+
+import time
+
+def ukur_hasil(fn, repeat=3):
+    """
+    Waktu terbaik fn() dari beberapa pengulangan beserta hasil pemanggilannya
+
+    Parameters:
+    - fn: Fungsi tanpa argumen yang diukur
+    - repeat: Jumlah pengulangan (minimal 1)
+
+    Returns:
+    - Tuple (waktu terbaik dalam detik, hasil fn() terakhir)
+    """
+    waktu = []
+    hasil = None
+    for _ in range(max(repeat, 1)):
+        t0 = time.perf_counter()
+        hasil = fn()
+        waktu.append(time.perf_counter() - t0)
+    return min(waktu), hasil
+
+def ukur(fn, repeat=3):
+    """Waktu terbaik fn() dalam detik dari beberapa pengulangan"""
+    return ukur_hasil(fn, repeat)[0]
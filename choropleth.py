@@ -0,0 +1,142 @@
+"""
+Klasifikasi prevalensi stunting untuk peta dan tabel dashboard
+
+Satu sumber kelas, warna dan label yang dipakai peta folium, peta statis
+matplotlib, layer TopoJSON dan tabel data. Klasifikasi dihitung sekaligus untuk
+satu kolom dengan np.digitize, bukan lewat callback Python per baris/fitur.
+
+Pemakaian:
+    python choropleth.py benchmark   # bandingkan callback per fitur vs vektor
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from bench import ukur
+
+# Kelas peta: 0 = tidak ada data (0%), lalu batas bawah inklusif 5, 10, 15, 20 persen
+BATAS_KELAS_PETA = [5, 10, 15, 20]
+
+KELAS_PETA = [
+    {'warna': '#e0e0e0', 'tepi': '#ccc', 'label': 'Tidak ada data'},
+    {'warna': '#fff3cd', 'tepi': '#ffeeba', 'label': '< 5% (Sangat Rendah)'},
+    {'warna': '#ffcc80', 'tepi': '#ffb84d', 'label': '5-10% (Rendah)'},
+    {'warna': '#ff8c42', 'tepi': '#ff7700', 'label': '10-15% (Sedang)'},
+    {'warna': '#ff6b6b', 'tepi': '#ff5555', 'label': '15-20% (Tinggi)'},
+    {'warna': '#d9534f', 'tepi': '#c9302c', 'label': '> 20% (Sangat Tinggi)'},
+]
+
+# Kategori tabel (lebih kasar): batas bawah inklusif 5, 10, 20 persen
+BATAS_KATEGORI_TABEL = [5, 10, 20]
+
+KATEGORI_TABEL = [
+    {'label': 'Rendah (<5%)', 'ikon': '🟢'},
+    {'label': 'Sedang (5-10%)', 'ikon': '🟡'},
+    {'label': 'Tinggi (10-20%)', 'ikon': '🟠'},
+    {'label': 'Sangat Tinggi (>20%)', 'ikon': '🔴'},
+]
+
+_WARNA_PETA = np.array([k['warna'] for k in KELAS_PETA], dtype=object)
+_LABEL_PETA = [k['label'] for k in KELAS_PETA]
+_LABEL_TABEL = [k['label'] for k in KATEGORI_TABEL]
+_LABEL_TABEL_IKON = [f"{k['ikon']} {k['label']}" for k in KATEGORI_TABEL]
+
+def classify_stunting(persen):
+    """
+    Kode kelas peta (0-5) untuk array persentase stunting
+
+    Nilai 0 atau kosong masuk kelas 0 (tidak ada data).
+    """
+    persen = np.nan_to_num(np.asarray(persen, dtype=float), nan=0.0)
+    kelas = np.digitize(persen, BATAS_KELAS_PETA) + 1
+    kelas[persen <= 0] = 0
+    return kelas.astype(np.int8)
+
+def stunting_colors(persen):
+    """Array warna peta untuk array persentase stunting"""
+    return _WARNA_PETA[classify_stunting(persen)]
+
+def add_stunting_classes(df, col='persen_stunting'):
+    """
+    Tambahkan kolom kelas_stunting, warna_stunting dan label_stunting
+
+    Dihitung sekali per dataset; renderer cukup membaca kolom hasilnya.
+    Mengembalikan salinan df.
+    """
+    kelas = classify_stunting(df[col].to_numpy())
+    df = df.copy(deep=False)
+    df['kelas_stunting'] = kelas
+    df['warna_stunting'] = _WARNA_PETA[kelas]
+    df['label_stunting'] = pd.Categorical.from_codes(kelas, categories=_LABEL_PETA)
+    return df
+
+def table_category_codes(persen):
+    """Kode kategori tabel (0-3) untuk array persentase stunting"""
+    persen = np.nan_to_num(np.asarray(persen, dtype=float), nan=0.0)
+    return np.digitize(persen, BATAS_KATEGORI_TABEL).astype(np.int8)
+
+def table_category(persen, ikon=False):
+    """
+    Kategori tabel sebagai pd.Categorical (terurut dari rendah ke sangat tinggi)
+
+    ikon=True menambahkan penanda warna (🟢🟡🟠🔴) di depan label sebagai
+    pengganti warna latar baris, sehingga tabel tidak perlu Styler.
+    """
+    label = _LABEL_TABEL_IKON if ikon else _LABEL_TABEL
+    return pd.Categorical.from_codes(table_category_codes(persen), categories=label, ordered=True)
+
+def _get_color_lama(persen_stunting):
+    if persen_stunting == 0:
+        return '#e0e0e0'
+    elif persen_stunting < 5:
+        return '#fff3cd'
+    elif persen_stunting < 10:
+        return '#ffcc80'
+    elif persen_stunting < 15:
+        return '#ff8c42'
+    elif persen_stunting < 20:
+        return '#ff6b6b'
+    else:
+        return '#d9534f'
+
+def benchmark(n=440, repeat=20):
+    """
+    Microbenchmark: warna via callback per fitur vs kolom hasil np.digitize
+
+    Callback meniru pola lama (Series.apply dan style_function folium yang
+    mengklasifikasi per fitur); versi vektor mengklasifikasi satu kolom sekaligus.
+    """
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'persen_stunting': np.round(rng.uniform(0, 30, n), 2)})
+    df.loc[df.sample(frac=0.1, random_state=0).index, 'persen_stunting'] = 0
+    features = [{'properties': {'persen_stunting': v}} for v in df['persen_stunting']]
+
+    t_apply = ukur(lambda: df['persen_stunting'].apply(_get_color_lama), repeat)
+    t_callback = ukur(lambda: [
+        _get_color_lama(f['properties'].get('persen_stunting', 0)) for f in features
+    ], repeat)
+    persen = df['persen_stunting'].to_numpy()
+    t_vektor = ukur(lambda: stunting_colors(persen), repeat)
+    t_kolom = ukur(lambda: add_stunting_classes(df), repeat)
+
+    hasil = add_stunting_classes(df)['warna_stunting'].tolist()
+    assert hasil == df['persen_stunting'].apply(_get_color_lama).tolist()
+
+    print(f"{n:,} fitur, terbaik dari {repeat} kali")
+    print(f"Series.apply(get_color)        : {t_apply * 1e6:10.1f} µs  ({t_apply / n * 1e6:.2f} µs/fitur)")
+    print(f"style_function per fitur       : {t_callback * 1e6:10.1f} µs  ({t_callback / n * 1e6:.2f} µs/fitur)")
+    print(f"np.digitize (warna)            : {t_vektor * 1e6:10.1f} µs  ({t_vektor / n * 1e6:.2f} µs/fitur)")
+    print(f"add_stunting_classes (3 kolom) : {t_kolom * 1e6:10.1f} µs  (sekali per dataset)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Klasifikasi prevalensi stunting")
+    parser.add_argument("perintah", choices=["benchmark"])
+    parser.add_argument("--n", type=int, default=440, help="Jumlah fitur")
+    parser.add_argument("--repeat", type=int, default=20, help="Jumlah pengulangan")
+    args = parser.parse_args(argv)
+    benchmark(args.n, args.repeat)
+
+if __name__ == "__main__":
+    main()
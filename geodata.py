@@ -0,0 +1,497 @@
+"""
+Cache geometri desa untuk peta dashboard stunting
+
+Shapefile ADMINISTRASIDESA_AR_25K berisi 27 atribut (termasuk kolom REMARK dan
+METADATA yang panjang) dan CRS gabungan dengan VERTCS, sehingga setiap cold start
+membaca semua kolom lalu menjalankan to_crs. Modul ini membangun artefak GeoParquet
+yang ringkas: hanya kolom yang dipakai dashboard, geometri 2D, sudah EPSG:4326.
+
+Artefak juga menyimpan beberapa level geometri yang disederhanakan dengan
+shapely.coverage_simplify, sehingga batas desa yang berimpitan tetap identik
+(tidak ada celah/tumpang tindih) dan payload GeoJSON peta folium jauh lebih kecil.
+
+Untuk mode peta TopoJSON, geometri diekspor sekali sebagai file TopoJSON statis
+(arc bersama disimpan satu kali, koordinat terkuantisasi) yang diunduh browser satu
+kali lalu diwarnai di sisi klien dari tabel lookup kecil per desa.
+
+Titik label desa (kolom label_x/label_y) dan kecamatan (metadata kecamatan_labels)
+dihitung sekali saat membangun artefak sebagai pusat lingkaran dalam terbesar
+(pole of inaccessibility), sehingga label tetap berada di dalam desa yang cekung
+atau multipoligon, tidak seperti centroid.
+
+Pemakaian:
+    python geodata.py build       # bangun ulang artefak dari shapefile
+    python geodata.py benchmark   # bandingkan waktu load shapefile vs artefak
+    python geodata.py report      # ukuran payload GeoJSON per level geometri
+"""
+
+import argparse
+import json
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from bench import ukur
+
+SHP_FILE_PATH = "data/ADMINISTRASIDESA_AR_25K.shp"
+CACHE_DIR = "data/cache"
+
+# Folder yang disajikan Streamlit di /app/static (server.enableStaticServing)
+STATIC_DIR = "static"
+
+# Naikkan versi ini setiap kali isi artefak berubah (kolom, geometri, dsb.)
+GEODATA_VERSION = 5
+
+# Grid kuantisasi koordinat TopoJSON (derajat), 1e-5° ≈ 1 m
+TOPOJSON_QUANTUM = 1e-5
+
+KOLOM_SHAPEFILE = ['NAMOBJ', 'WADMKC', 'WADMKK']
+
+# Level geometri untuk peta: nama -> toleransi penyederhanaan (derajat, 0.0001° ≈ 11 m)
+GEOMETRY_LEVELS = {
+    'detail': 0.0,
+    'tinggi': 0.0002,
+    'sedang': 0.0005,
+    'rendah': 0.002,
+}
+
+# Presisi koordinat untuk level yang disederhanakan (5 desimal ≈ 1 m)
+GEOMETRY_LEVEL_DECIMALS = 5
+
+# Toleransi pencarian titik label (derajat, 0.0001° ≈ 11 m)
+LABEL_TOLERANCE = 0.0001
+
+def normalize_name(series):
+    """Kunci join nama wilayah: tanpa spasi di tepi dan huruf besar"""
+    return series.str.strip().str.upper()
+
+def geodata_cache_path(shp_path=SHP_FILE_PATH):
+    """Path artefak GeoParquet untuk sebuah shapefile"""
+    nama = os.path.splitext(os.path.basename(shp_path))[0]
+    return os.path.join(CACHE_DIR, f"{nama}.v{GEODATA_VERSION}.parquet")
+
+def read_shapefile(shp_path=SHP_FILE_PATH):
+    """
+    Baca shapefile desa dan siapkan kolom yang dibutuhkan dashboard
+
+    Returns:
+    - GeoDataFrame EPSG:4326 dengan kolom id_geo (nomor urut fitur), NAMOBJ, WADMKC,
+      WADMKK, NAMOBJ_normalized, WADMKC_normalized dan geometry 2D
+    """
+    gdf = gpd.read_file(shp_path, columns=KOLOM_SHAPEFILE)
+
+    # CRS shapefile berupa compound CRS (GEOGCS + VERTCS); bagian horizontalnya WGS84
+    if gdf.crs is None or gdf.crs.to_epsg() != 4326:
+        if gdf.crs is not None and gdf.crs.is_compound and gdf.crs.sub_crs_list[0].to_epsg() == 4326:
+            gdf = gdf.set_crs(epsg=4326, allow_override=True)
+        else:
+            gdf = gdf.to_crs(epsg=4326)
+
+    gdf['geometry'] = shapely.force_2d(gdf.geometry.values)
+    gdf['id_geo'] = np.arange(len(gdf), dtype='int32')
+    gdf['NAMOBJ_normalized'] = normalize_name(gdf['NAMOBJ'])
+    gdf['WADMKC_normalized'] = normalize_name(gdf['WADMKC'])
+
+    return gdf[['id_geo', 'NAMOBJ', 'WADMKC', 'WADMKK', 'NAMOBJ_normalized', 'WADMKC_normalized', 'geometry']]
+
+def level_column(level):
+    """Nama kolom geometri untuk sebuah level"""
+    return 'geometry' if level == 'detail' else f'geometry_{level}'
+
+def add_geometry_levels(gdf):
+    """
+    Tambahkan kolom geometry_<level> hasil penyederhanaan coverage
+
+    coverage_simplify menyederhanakan semua poligon sekaligus sehingga tepi yang
+    dipakai bersama dua desa disederhanakan dengan cara yang sama.
+    """
+    for level, toleransi in GEOMETRY_LEVELS.items():
+        if toleransi <= 0:
+            continue
+        simplified = shapely.coverage_simplify(gdf.geometry.values, toleransi)
+        simplified = shapely.transform(
+            simplified, lambda coords: np.round(coords, GEOMETRY_LEVEL_DECIMALS)
+        )
+        gdf[level_column(level)] = gpd.GeoSeries(simplified, index=gdf.index, crs=gdf.crs)
+    return gdf
+
+def with_geometry_level(gdf, level, columns=None):
+    """
+    GeoDataFrame dengan geometri level tertentu sebagai kolom 'geometry'
+
+    Kolom geometri level lain dibuang agar bisa langsung diserialisasi ke GeoJSON.
+
+    Parameters:
+    - gdf: GeoDataFrame hasil load_geodata (boleh sudah di-merge)
+    - level: Nama level pada GEOMETRY_LEVELS
+    - columns: Kolom atribut yang dipertahankan (default: semua)
+    """
+    kolom_level = [level_column(lv) for lv in GEOMETRY_LEVELS if lv != 'detail']
+    geometry = gdf[level_column(level)].values if level_column(level) in gdf.columns else gdf.geometry.values
+
+    if columns is None:
+        columns = [c for c in gdf.columns if c not in kolom_level and c != gdf.geometry.name]
+    return gpd.GeoDataFrame(gdf[list(columns)], geometry=geometry, crs=gdf.crs)
+
+def label_points(geometry, tolerance=LABEL_TOLERANCE):
+    """
+    Titik label (pole of inaccessibility) untuk array geometri
+
+    Memakai pusat lingkaran dalam terbesar (shapely.maximum_inscribed_circle), yang
+    selalu berada di dalam poligon. Untuk multipoligon lingkaran dicari di semua
+    bagian sekaligus, jadi label jatuh di bagian yang paling lebar (belum tentu
+    bagian terluas, misalnya jika bagian terluas berupa jalur sempit).
+
+    Returns:
+    - Tuple (x, y) berupa array numpy
+    """
+    lingkaran = shapely.maximum_inscribed_circle(geometry, tolerance)
+    pusat = shapely.get_point(lingkaran, 0)
+    return shapely.get_x(pusat), shapely.get_y(pusat)
+
+def add_label_points(gdf):
+    """
+    Tambahkan titik label desa dan kecamatan
+
+    Desa: kolom label_x dan label_y. Kecamatan: gdf.attrs['kecamatan_labels'],
+    list dict {WADMKC, x, y} dari gabungan poligon desa per kecamatan.
+    """
+    gdf['label_x'], gdf['label_y'] = label_points(gdf.geometry.values)
+
+    grup = gdf.groupby('WADMKC', sort=True).indices
+    gabungan = [shapely.union_all(gdf.geometry.values[idx]) for idx in grup.values()]
+    x, y = label_points(np.array(gabungan, dtype=object))
+    gdf.attrs['kecamatan_labels'] = [
+        {'WADMKC': nama, 'x': float(lx), 'y': float(ly)}
+        for nama, lx, ly in zip(grup.keys(), x, y)
+    ]
+    return gdf
+
+def kecamatan_labels(gdf):
+    """DataFrame titik label kecamatan (WADMKC, x, y) dari attrs artefak"""
+    return pd.DataFrame(gdf.attrs.get('kecamatan_labels', []), columns=['WADMKC', 'x', 'y'])
+
+def geojson_payload_bytes(gdf, level, properties=('NAMOBJ', 'WADMKC')):
+    """Ukuran (byte) FeatureCollection GeoJSON untuk sebuah level geometri"""
+    return len(with_geometry_level(gdf, level, [c for c in properties if c in gdf.columns]).to_json())
+
+def geometry_level_report(gdf):
+    """
+    Ringkasan per level geometri: toleransi, jumlah titik dan ukuran payload
+
+    Returns:
+    - dict level -> {'tolerance', 'coords', 'bytes'}
+    """
+    report = {}
+    for level, toleransi in GEOMETRY_LEVELS.items():
+        kolom = level_column(level)
+        if kolom not in gdf.columns:
+            continue
+        report[level] = {
+            'tolerance': toleransi,
+            'coords': int(shapely.get_num_coordinates(gdf[kolom].values).sum()),
+            'bytes': geojson_payload_bytes(gdf, level),
+        }
+    return report
+
+def pick_geometry_level(level_bytes, budget_bytes):
+    """
+    Pilih level paling detail yang payload-nya masih di bawah anggaran
+
+    Parameters:
+    - level_bytes: dict level -> ukuran payload (byte)
+    - budget_bytes: Anggaran ukuran payload peta
+    """
+    tersedia = [lv for lv in GEOMETRY_LEVELS if lv in level_bytes]
+    if not tersedia:
+        return 'detail'
+    for level in tersedia:
+        if level_bytes[level] <= budget_bytes:
+            return level
+    return tersedia[-1]
+
+def _quantize_ring(ring, x0, y0):
+    coords = np.asarray(ring.coords)
+    q = np.rint((coords - (x0, y0)) / TOPOJSON_QUANTUM).astype(np.int64)
+    # Buang titik berurutan yang sama setelah kuantisasi
+    keep = np.ones(len(q), dtype=bool)
+    keep[1:] = np.any(q[1:] != q[:-1], axis=1)
+    return [tuple(p) for p in q[keep]]
+
+def _polygon_rings(geom):
+    polygons = geom.geoms if geom.geom_type == 'MultiPolygon' else [geom]
+    return [[p.exterior] + list(p.interiors) for p in polygons if not p.is_empty]
+
+def to_topojson(gdf, object_name='desa', properties=('id_geo', 'NAMOBJ', 'WADMKC')):
+    """
+    Encode GeoDataFrame poligon (coverage) menjadi dict TopoJSON
+
+    Tepi yang dipakai bersama beberapa desa disimpan sebagai satu arc. Titik
+    pertemuan (junction) dicari dari titik yang tetangganya berbeda antar ring;
+    ring tanpa junction (mis. desa enclave) disimpan utuh sebagai satu arc.
+
+    Parameters:
+    - gdf: GeoDataFrame EPSG:4326
+    - object_name: Nama objek di topology.objects
+    - properties: Kolom atribut yang disertakan per fitur
+    """
+    x0, y0 = gdf.total_bounds[:2]
+    features = [
+        [[_quantize_ring(r, x0, y0) for r in rings] for rings in _polygon_rings(geom)]
+        for geom in gdf.geometry.values
+    ]
+
+    # 1. Cari junction: titik yang muncul dengan pasangan tetangga berbeda
+    tetangga = {}
+    junctions = set()
+    for polygons in features:
+        for rings in polygons:
+            for ring in rings:
+                n = len(ring) - 1  # titik terakhir = titik pertama
+                for i in range(n):
+                    pasangan = frozenset((ring[i - 1] if i else ring[n - 1], ring[i + 1]))
+                    lama = tetangga.setdefault(ring[i], pasangan)
+                    if lama != pasangan:
+                        junctions.add(ring[i])
+
+    # 2. Potong ring di junction menjadi arc, arc kembar (searah/berlawanan) dipakai ulang
+    arcs = []
+    arc_index = {}
+
+    def arc_id(points):
+        key = tuple(points)
+        if key in arc_index:
+            return arc_index[key]
+        rev = key[::-1]
+        if rev in arc_index:
+            return ~arc_index[rev]
+        arc_index[key] = len(arcs)
+        arcs.append(key)
+        return arc_index[key]
+
+    def ring_arcs(ring):
+        titik = ring[:-1]
+        if len(titik) < 3:
+            return []
+        posisi = [i for i, p in enumerate(titik) if p in junctions]
+        if not posisi:
+            # Ring tertutup tanpa junction: rotasi ke titik terkecil agar ring kembar terdeteksi
+            start = titik.index(min(titik))
+            putar = titik[start:] + titik[:start]
+            return [arc_id(putar + [putar[0]])]
+        start = posisi[0]
+        putar = titik[start:] + titik[:start] + [titik[start]]
+        potong = [i - start for i in posisi] + [len(titik)]
+        return [arc_id(putar[a:b + 1]) for a, b in zip(potong[:-1], potong[1:])]
+
+    geometries = []
+    for (_, row), polygons in zip(gdf.iterrows(), features):
+        arcs_polygon = [[ring_arcs(r) for r in rings] for rings in polygons]
+        arcs_polygon = [[a for a in rings if a] for rings in arcs_polygon]
+        arcs_polygon = [rings for rings in arcs_polygon if rings]
+        geometries.append({
+            'type': 'MultiPolygon',
+            'arcs': arcs_polygon,
+            'properties': {
+                k: (row[k].item() if hasattr(row[k], 'item') else row[k])
+                for k in properties if k in gdf.columns
+            },
+        })
+
+    # 3. Delta-encode arc
+    encoded = []
+    for arc in arcs:
+        a = np.asarray(arc, dtype=np.int64)
+        a[1:] = a[1:] - a[:-1]
+        encoded.append(a.tolist())
+
+    return {
+        'type': 'Topology',
+        'transform': {'scale': [TOPOJSON_QUANTUM, TOPOJSON_QUANTUM], 'translate': [float(x0), float(y0)]},
+        'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': encoded,
+    }
+
+def topojson_filename(level):
+    """Nama file TopoJSON statis untuk sebuah level (berversi agar cache browser aman)"""
+    return f"desa_v{GEODATA_VERSION}_{level}.topojson"
+
+def write_topojson(gdf, level, static_dir=STATIC_DIR, shp_path=None):
+    """
+    Tulis file TopoJSON statis untuk satu level geometri jika belum ada
+
+    Parameters:
+    - shp_path: Shapefile sumber gdf; jika diberikan, file yang lebih lama dari
+      shapefile ditulis ulang
+
+    Returns:
+    - Path file TopoJSON
+    """
+    out_path = os.path.join(static_dir, topojson_filename(level))
+    if shp_path:
+        sudah_ada = cache_valid(out_path, shp_path)
+    else:
+        sudah_ada = os.path.exists(out_path)
+    if sudah_ada:
+        return out_path
+
+    topo = to_topojson(with_geometry_level(gdf, level, ['id_geo', 'NAMOBJ', 'WADMKC']))
+    os.makedirs(static_dir, exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(topo, f, separators=(',', ':'))
+    os.replace(tmp_path, out_path)
+    return out_path
+
+def prepare_geodata(shp_path=SHP_FILE_PATH):
+    """Shapefile -> GeoDataFrame lengkap isi artefak (kolom ringkas, level geometri, titik label)"""
+    gdf = add_label_points(add_geometry_levels(read_shapefile(shp_path)))
+    gdf.attrs['geometry_levels'] = geometry_level_report(gdf)
+    return gdf
+
+def build_geodata(shp_path=SHP_FILE_PATH, out_path=None):
+    """
+    Bangun artefak GeoParquet dari shapefile
+
+    Returns:
+    - Path artefak yang ditulis
+    """
+    out_path = out_path or geodata_cache_path(shp_path)
+    _write_parquet(prepare_geodata(shp_path), out_path)
+    return out_path
+
+def _write_parquet(gdf, out_path):
+    """Tulis GeoParquet secara atomik (file sementara lalu rename)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    table = pa.Table.from_pandas(gdf.to_wkb(), preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'geometry_levels'] = json.dumps(gdf.attrs.get('geometry_levels', {})).encode()
+    metadata[b'kecamatan_labels'] = json.dumps(gdf.attrs.get('kecamatan_labels', [])).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, out_path)
+
+def _read_parquet(cache_path):
+    """
+    Baca artefak GeoParquet
+
+    gpd.read_parquet membangun CRS dari metadata PROJJSON pada setiap pembacaan
+    (puluhan ms); artefak ini selalu EPSG:4326, jadi geometri cukup didekode
+    langsung dari WKB.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(cache_path)
+    kolom_geom = [c for c in table.column_names if c.startswith('geometry')]
+    gdf = gpd.GeoDataFrame(
+        table.drop(kolom_geom).to_pandas(),
+        geometry=shapely.from_wkb(table.column('geometry').to_numpy()),
+        crs="EPSG:4326",
+    )
+    for kolom in kolom_geom:
+        if kolom != 'geometry':
+            gdf[kolom] = gpd.GeoSeries(
+                shapely.from_wkb(table.column(kolom).to_numpy()), index=gdf.index, crs="EPSG:4326"
+            )
+
+    metadata = table.schema.metadata or {}
+    gdf.attrs['geometry_levels'] = json.loads(metadata.get(b'geometry_levels', b'{}'))
+    gdf.attrs['kecamatan_labels'] = json.loads(metadata.get(b'kecamatan_labels', b'[]'))
+    return gdf
+
+def cache_valid(cache_path, shp_path):
+    """Artefak turunan ada dan tidak lebih lama dari shapefile sumbernya"""
+    return (
+        os.path.exists(cache_path)
+        and os.path.getmtime(cache_path) >= os.path.getmtime(shp_path)
+    )
+
+def load_geodata(shp_path=SHP_FILE_PATH, build_if_missing=True):
+    """
+    Load geometri desa dari artefak GeoParquet, fallback ke shapefile
+
+    Artefak dipakai jika ada dan tidak lebih lama dari shapefile. Jika belum ada,
+    shapefile dibaca lalu (bila memungkinkan) artefak ditulis untuk start berikutnya.
+
+    Parameters:
+    - shp_path: Path shapefile sumber
+    - build_if_missing: Tulis artefak jika belum tersedia
+    """
+    cache_path = geodata_cache_path(shp_path)
+
+    if cache_valid(cache_path, shp_path):
+        try:
+            return _read_parquet(cache_path)
+        except (ImportError, OSError, ValueError):
+            # pyarrow tidak tersedia atau artefak rusak: pakai shapefile
+            pass
+
+    gdf = prepare_geodata(shp_path)
+
+    if build_if_missing:
+        try:
+            _write_parquet(gdf, cache_path)
+        except (ImportError, OSError):
+            pass
+
+    return gdf
+
+def benchmark(shp_path=SHP_FILE_PATH, repeat=5):
+    """Bandingkan waktu startup: shapefile lengkap + to_crs vs artefak GeoParquet"""
+    cache_path = geodata_cache_path(shp_path)
+    if not cache_valid(cache_path, shp_path):
+        build_geodata(shp_path, cache_path)
+
+    def load_lama():
+        gdf = gpd.read_file(shp_path)
+        if gdf.crs != "EPSG:4326":
+            gdf = gdf.to_crs(epsg=4326)
+        return gdf
+
+    t_shp = ukur(load_lama, repeat)
+    t_fallback = ukur(lambda: prepare_geodata(shp_path), repeat)
+    gdf_cache = _read_parquet(cache_path)
+    t_cache = ukur(lambda: _read_parquet(cache_path), repeat)
+    t_label_lama = ukur(lambda: gdf_cache.groupby('WADMKC').apply(
+        lambda x: x.geometry.union_all().centroid, include_groups=False
+    ), repeat)
+    t_label = ukur(lambda: kecamatan_labels(gdf_cache), repeat)
+    ukuran_shp = os.path.getsize(shp_path) + os.path.getsize(os.path.splitext(shp_path)[0] + '.dbf')
+
+    print(f"Shapefile lengkap (cara lama, 27 kolom) : {t_shp * 1000:8.1f} ms  ({ukuran_shp:,} byte)")
+    print(f"Shapefile + level geometri (fallback)   : {t_fallback * 1000:8.1f} ms")
+    print(f"Artefak GeoParquet (semua level)        : {t_cache * 1000:8.1f} ms  ({os.path.getsize(cache_path):,} byte)")
+    print(f"Percepatan vs fallback                  : {t_fallback / t_cache:8.1f}x")
+    print(f"Label kecamatan: union + centroid       : {t_label_lama * 1000:8.1f} ms per rerun")
+    print(f"Label kecamatan: dari artefak           : {t_label * 1000:8.1f} ms per rerun")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cache geometri desa untuk dashboard stunting")
+    parser.add_argument("perintah", choices=["build", "benchmark", "report"])
+    parser.add_argument("--shp", default=SHP_FILE_PATH, help="Path shapefile desa")
+    parser.add_argument("--repeat", type=int, default=5, help="Jumlah pengulangan benchmark")
+    args = parser.parse_args(argv)
+
+    if args.perintah == "build":
+        path = build_geodata(args.shp)
+        print(f"Artefak ditulis: {path} ({os.path.getsize(path):,} byte)")
+    elif args.perintah == "report":
+        report = geometry_level_report(load_geodata(args.shp))
+        bytes_detail = report['detail']['bytes']
+        print(f"{'Level':<8} {'Toleransi':>10} {'Titik':>8} {'GeoJSON':>12} {'Rasio':>7}")
+        for level, info in report.items():
+            print(
+                f"{level:<8} {info['tolerance']:>10g} {info['coords']:>8,} "
+                f"{info['bytes']:>12,} {bytes_detail / info['bytes']:>6.1f}x"
+            )
+    else:
+        benchmark(args.shp, args.repeat)
+
+if __name__ == "__main__":
+    main()
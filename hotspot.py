@@ -0,0 +1,407 @@
+"""
+Analisis hotspot spasial prevalensi stunting desa (Local Moran's I, Getis-Ord Gi*)
+
+Daftar 10 desa tertinggi tidak membedakan desa tinggi yang terisolasi dari
+kelompok desa bertetangga yang sama-sama tinggi. Modul ini menghitung statistik
+autokorelasi spasial lokal per desa:
+- Local Moran's I (LISA): klaster Tinggi-Tinggi / Rendah-Rendah dan pencilan
+  Tinggi-Rendah / Rendah-Tinggi
+- Getis-Ord Gi*: hotspot / coldspot (rerata desa dan tetangganya dibanding
+  rerata kabupaten)
+
+Matriks bobot ketetanggaan (queen: bersinggungan di titik atau sisi; rook:
+berbagi sisi) dibangun sekali dari poligon desa dan disimpan sebagai matriks
+jarang berformat CSR (indptr/indices numpy) di data/cache, mengikuti versi
+artefak geometri. Untuk setiap bulan matriks cukup dipotong ke desa yang punya
+data; lag spasial dihitung dengan np.bincount atas daftar tetangga (perkalian
+matriks jarang-vektor), tanpa scipy.
+
+Signifikansi memakai permutasi bersyarat (nilai desa tetap, nilai tetangga
+diacak dari desa lain) seperti esda/PySAL: sampel acak yang sama dipakai untuk
+semua desa, desa dikelompokkan per jumlah tetangga, dan kelompok dihitung
+paralel di thread pool. Kedua statistik monoton terhadap rerata nilai tetangga,
+sehingga satu set permutasi melayani keduanya.
+
+Pemakaian:
+    python hotspot.py bobot               # ringkasan matriks ketetanggaan
+    python hotspot.py benchmark           # waktu analisis per bulan
+"""
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from bench import ukur
+from geodata import CACHE_DIR, GEODATA_VERSION, SHP_FILE_PATH, cache_valid, load_geodata
+
+JENIS_BOBOT = ('queen', 'rook')
+
+JUMLAH_PERMUTASI = 999
+ALFA = 0.05
+
+# math.erfc sebagai ufunc: p-value normal dua arah tanpa scipy (bukan dependensi)
+_ERFC = np.frompyfunc(math.erfc, 1, 1)
+
+# Jumlah desa maksimum per tugas permutasi (membatasi memori per thread)
+UKURAN_TUGAS = 64
+
+# Kode klaster LISA mengikuti kuadran esda: 1 HH, 2 LH, 3 LL, 4 HL
+KLASTER_LISA = {
+    0: {'label': 'Tidak signifikan', 'warna': '#eeeeee'},
+    1: {'label': 'Tinggi-Tinggi (hotspot)', 'warna': '#d7191c'},
+    2: {'label': 'Rendah-Tinggi (pencilan)', 'warna': '#abd9e9'},
+    3: {'label': 'Rendah-Rendah (coldspot)', 'warna': '#2c7bb6'},
+    4: {'label': 'Tinggi-Rendah (pencilan)', 'warna': '#fdae61'},
+}
+
+KLASTER_GI = {
+    0: {'label': 'Tidak signifikan', 'warna': '#eeeeee'},
+    1: {'label': 'Hotspot', 'warna': '#d7191c'},
+    2: {'label': 'Coldspot', 'warna': '#2c7bb6'},
+}
+
+# ========================================
+# MATRIKS BOBOT KETETANGGAAN
+# ========================================
+
+class ContiguityWeights:
+    """
+    Matriks ketetanggaan biner simetris dalam format CSR
+
+    Parameters:
+    - baris, kolom: Pasangan tetangga (kedua arah atau satu arah; disimetrikan)
+    - n: Jumlah fitur
+    - id_geo: id_geo per baris matriks (default 0..n-1)
+    """
+
+    def __init__(self, baris, kolom, n, id_geo=None):
+        baris = np.asarray(baris, dtype=np.int64)
+        kolom = np.asarray(kolom, dtype=np.int64)
+        pasangan = np.unique(np.r_[baris * n + kolom, kolom * n + baris])
+        baris, kolom = np.divmod(pasangan, n)
+        bukan_diri = baris != kolom
+        baris, kolom = baris[bukan_diri], kolom[bukan_diri]
+
+        self.n = n
+        self.id_geo = np.arange(n, dtype=np.int32) if id_geo is None else np.asarray(id_geo, dtype=np.int32)
+        self.indptr = np.r_[0, np.cumsum(np.bincount(baris, minlength=n))].astype(np.int64)
+        self.indices = kolom.astype(np.int32)
+
+    @classmethod
+    def from_geometry(cls, geometry, jenis='queen', id_geo=None):
+        """Bobot queen/rook dari array poligon (batas bersama harus berimpitan)"""
+        if jenis not in JENIS_BOBOT:
+            raise ValueError(f"Jenis bobot harus salah satu dari {', '.join(JENIS_BOBOT)}")
+        geometry = np.asarray(geometry)
+        baris, kolom = shapely.STRtree(geometry).query(geometry, predicate='intersects')
+        satu_arah = baris < kolom
+        baris, kolom = baris[satu_arah], kolom[satu_arah]
+        if jenis == 'rook':
+            # Rook: irisan batas berupa garis (panjang > 0), bukan hanya titik sudut
+            sisi = shapely.length(shapely.intersection(geometry[baris], geometry[kolom])) > 0
+            baris, kolom = baris[sisi], kolom[sisi]
+        return cls(baris, kolom, len(geometry), id_geo)
+
+    @property
+    def kardinalitas(self):
+        """Jumlah tetangga per fitur"""
+        return np.diff(self.indptr)
+
+    @property
+    def baris(self):
+        """Indeks baris setiap entri (pasangan dengan self.indices)"""
+        return np.repeat(np.arange(self.n), self.kardinalitas)
+
+    def subset(self, pilih):
+        """
+        Matriks untuk sebagian fitur (misalnya desa yang punya data bulan ini)
+
+        Parameters:
+        - pilih: Mask boolean panjang n
+
+        Returns:
+        - ContiguityWeights baru dengan urutan fitur terpilih yang sama
+        """
+        pilih = np.asarray(pilih, dtype=bool)
+        posisi_baru = np.cumsum(pilih) - 1
+        baris, kolom = self.baris, self.indices
+        tetap = pilih[baris] & pilih[kolom]
+        return ContiguityWeights(
+            posisi_baru[baris[tetap]], posisi_baru[kolom[tetap]], int(pilih.sum()), self.id_geo[pilih]
+        )
+
+    def lag(self, x):
+        """Rerata nilai tetangga per fitur (bobot distandarkan per baris; 0 untuk pulau)"""
+        x = np.asarray(x, dtype=float)
+        jumlah = np.bincount(self.baris, weights=x[self.indices], minlength=self.n)
+        return np.divide(jumlah, self.kardinalitas, out=np.zeros(self.n), where=self.kardinalitas > 0)
+
+    def simpan(self, path):
+        """Simpan ke .npz (atomik)"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, n=self.n, id_geo=self.id_geo, indptr=self.indptr, indices=self.indices)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def muat(cls, path):
+        """Baca matriks hasil simpan"""
+        with np.load(path) as data:
+            bobot = cls.__new__(cls)
+            bobot.n = int(data['n'])
+            bobot.id_geo = data['id_geo']
+            bobot.indptr = data['indptr']
+            bobot.indices = data['indices']
+        return bobot
+
+def weights_path(jenis='queen', shp_path=SHP_FILE_PATH):
+    """Path cache matriks bobot (mengikuti versi artefak geometri)"""
+    nama = os.path.splitext(os.path.basename(shp_path))[0]
+    return os.path.join(CACHE_DIR, f"{nama}.bobot_{jenis}.v{GEODATA_VERSION}.npz")
+
+def load_weights(jenis='queen', shp_path=SHP_FILE_PATH):
+    """
+    Matriks bobot ketetanggaan semua fitur desa shapefile
+
+    Dibaca dari cache data/cache jika ada dan tidak lebih lama dari shapefile;
+    jika tidak, dibangun dari geometri detail lalu disimpan (gagal simpan tidak
+    menghentikan analisis).
+    """
+    path = weights_path(jenis, shp_path)
+    if cache_valid(path, shp_path):
+        try:
+            return ContiguityWeights.muat(path)
+        except (OSError, KeyError, ValueError):
+            pass
+    gdf = load_geodata(shp_path)
+    bobot = ContiguityWeights.from_geometry(gdf.geometry.values, jenis, gdf['id_geo'].to_numpy())
+    try:
+        bobot.simpan(path)
+    except OSError:
+        pass
+    return bobot
+
+# ========================================
+# STATISTIK LOKAL & PERMUTASI
+# ========================================
+
+def _hitung_permutasi(x, tugas, sampel, rerata_obs):
+    """
+    Jumlah permutasi dengan rerata tetangga >= rerata teramati, untuk satu tugas
+
+    Parameters:
+    - tugas: Tuple (posisi desa, jumlah tetangga k) - semua desa ber-k sama
+    """
+    posisi, k = tugas
+    indeks = sampel[None, :, :k]
+    # Sampel diambil dari n-1 desa lain: geser indeks >= posisi desa itu sendiri
+    indeks = indeks + (indeks >= posisi[:, None, None])
+    rerata = x[indeks].mean(axis=2)
+    return posisi, (rerata >= rerata_obs[posisi, None]).sum(axis=1)
+
+def permutasi_bersyarat(x, bobot, permutasi=JUMLAH_PERMUTASI, seed=0, workers=None):
+    """
+    p-value pseudo (dua arah, dilipat seperti esda) untuk rerata nilai tetangga
+
+    Parameters:
+    - x: Nilai per fitur
+    - bobot: ContiguityWeights
+    - permutasi: Jumlah permutasi
+    - seed: Seed acak (hasil tidak bergantung pada jumlah worker)
+    - workers: Jumlah thread (default: jumlah core)
+
+    Returns:
+    - Array p-value per fitur (NaN untuk pulau tanpa tetangga)
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    kardinalitas = bobot.kardinalitas
+    p = np.full(n, np.nan)
+    k_maks = int(kardinalitas.max(initial=0))
+    if n < 3 or k_maks == 0:
+        return p
+    k_maks = min(k_maks, n - 1)
+
+    rng = np.random.default_rng(seed)
+    sampel = rng.permuted(np.tile(np.arange(n - 1, dtype=np.int32), (permutasi, 1)), axis=1)[:, :k_maks]
+    rerata_obs = bobot.lag(x)
+
+    tugas = []
+    for k in np.unique(kardinalitas[kardinalitas > 0]):
+        posisi = np.flatnonzero(kardinalitas == k)
+        for mulai in range(0, len(posisi), UKURAN_TUGAS):
+            tugas.append((posisi[mulai:mulai + UKURAN_TUGAS], min(int(k), k_maks)))
+
+    lebih = np.zeros(n, dtype=np.int64)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        hasil = [_hitung_permutasi(x, t, sampel, rerata_obs) for t in tugas]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            hasil = list(pool.map(lambda t: _hitung_permutasi(x, t, sampel, rerata_obs), tugas))
+    for posisi, jumlah in hasil:
+        lebih[posisi] = jumlah
+
+    terlipat = np.minimum(lebih, permutasi - lebih)
+    ada_tetangga = kardinalitas > 0
+    p[ada_tetangga] = (terlipat[ada_tetangga] + 1) / (permutasi + 1)
+    return p
+
+def local_moran(x, bobot, p_sim=None, alfa=ALFA):
+    """
+    Local Moran's I dengan bobot distandarkan per baris
+
+    Returns:
+    - DataFrame kolom moran_i, lag (rerata tetangga dari nilai terpusat),
+      kuadran (1 HH, 2 LH, 3 LL, 4 HL), p_moran dan klaster_lisa (0 jika p > alfa)
+    """
+    x = np.asarray(x, dtype=float)
+    z = x - x.mean()
+    penyebut = (z * z).sum()
+    lag = bobot.lag(z)
+    moran_i = (len(x) - 1) * z * lag / penyebut if penyebut > 0 else np.zeros(len(x))
+
+    kuadran = np.select(
+        [(z > 0) & (lag > 0), (z <= 0) & (lag > 0), (z <= 0) & (lag <= 0)], [1, 2, 3], 4
+    ).astype(np.int8)
+    p = np.full(len(x), np.nan) if p_sim is None else np.asarray(p_sim, dtype=float).copy()
+    p[z == 0] = 1.0
+    signifikan = np.nan_to_num(p, nan=1.0) <= alfa
+    return pd.DataFrame({
+        'moran_i': moran_i, 'lag': lag, 'kuadran': kuadran, 'p_moran': p,
+        'klaster_lisa': np.where(signifikan, kuadran, 0).astype(np.int8),
+    })
+
+def getis_ord_gi_star(x, bobot, p_sim=None, alfa=ALFA):
+    """
+    Getis-Ord Gi* (bobot biner, desa sendiri ikut dihitung) sebagai skor z
+
+    Returns:
+    - DataFrame kolom gi_star (skor z), p_gi (permutasi jika p_sim diberikan,
+      selain itu pendekatan normal dua arah) dan klaster_gi (1 hotspot, 2 coldspot)
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    w_i = bobot.kardinalitas + 1.0
+    jumlah = x + bobot.lag(x) * bobot.kardinalitas
+    rerata = x.mean()
+    s = math.sqrt(max((x * x).mean() - rerata * rerata, 0.0))
+    penyebut = s * np.sqrt(np.maximum(n * w_i - w_i * w_i, 0.0) / max(n - 1, 1))
+    gi_star = np.divide(jumlah - rerata * w_i, penyebut, out=np.zeros(n), where=penyebut > 0)
+
+    if p_sim is None:
+        p = _ERFC(np.abs(gi_star) / math.sqrt(2)).astype(float)
+    else:
+        p = np.asarray(p_sim, dtype=float)
+    signifikan = np.nan_to_num(p, nan=1.0) <= alfa
+    klaster = np.where(signifikan & (gi_star > 0), 1, np.where(signifikan & (gi_star < 0), 2, 0))
+    return pd.DataFrame({'gi_star': gi_star, 'p_gi': p, 'klaster_gi': klaster.astype(np.int8)})
+
+def analisis_hotspot(id_geo, nilai, bobot, permutasi=JUMLAH_PERMUTASI, alfa=ALFA, seed=0, workers=None):
+    """
+    Local Moran's I dan Gi* untuk satu periode
+
+    Parameters:
+    - id_geo: id_geo desa yang dianalisis (misalnya desa dengan data bulan ini)
+    - nilai: Nilai indikator per desa, misalnya persen_stunting
+    - bobot: ContiguityWeights semua fitur (hasil load_weights); dipotong ke id_geo
+    - permutasi: Jumlah permutasi (0 = tanpa uji permutasi; Gi* memakai
+      pendekatan normal dan klaster LISA tidak dihitung)
+
+    Returns:
+    - DataFrame per desa: id_geo, nilai, jumlah_tetangga, kolom local_moran dan
+      getis_ord_gi_star
+    """
+    id_geo = np.asarray(id_geo, dtype=np.int32)
+    nilai = np.asarray(nilai, dtype=float)
+    urutan = np.argsort(id_geo, kind='stable')
+    id_geo, nilai = id_geo[urutan], nilai[urutan]
+
+    pilih = np.isin(bobot.id_geo, id_geo)
+    bobot = bobot.subset(pilih)
+    ada = np.isin(id_geo, bobot.id_geo)
+    id_geo, nilai = id_geo[ada], nilai[ada]
+
+    p_sim = permutasi_bersyarat(nilai, bobot, permutasi, seed, workers) if permutasi else None
+    return pd.concat([
+        pd.DataFrame({'id_geo': id_geo, 'nilai': nilai, 'jumlah_tetangga': bobot.kardinalitas}),
+        local_moran(nilai, bobot, p_sim, alfa),
+        getis_ord_gi_star(nilai, bobot, p_sim, alfa),
+    ], axis=1)
+
+def ringkasan_klaster(hasil):
+    """Jumlah desa per klaster LISA dan Gi* (label -> jumlah)"""
+    return {
+        'lisa': {KLASTER_LISA[k]['label']: int((hasil['klaster_lisa'] == k).sum()) for k in KLASTER_LISA},
+        'gi': {KLASTER_GI[k]['label']: int((hasil['klaster_gi'] == k).sum()) for k in KLASTER_GI},
+    }
+
+# ========================================
+# BENCHMARK
+# ========================================
+
+def _nilai_sintetis(gdf, bobot, seed=0):
+    """Prevalensi sintetis desa Kabupaten Kuningan dengan satu kelompok desa tinggi"""
+    rng = np.random.default_rng(seed)
+    id_geo = gdf.loc[gdf['WADMKK'] == 'Kabupaten Kuningan', 'id_geo'].to_numpy()
+    nilai = pd.Series(rng.gamma(2.0, 5.0, len(id_geo)), index=id_geo)
+    pusat = id_geo[0]
+    kelompok = bobot.indices[bobot.indptr[pusat]:bobot.indptr[pusat + 1]]
+    nilai.loc[nilai.index.intersection(np.r_[pusat, kelompok])] += 40
+    return nilai.index.to_numpy(), nilai.to_numpy()
+
+def benchmark(shp_path=SHP_FILE_PATH, permutasi=JUMLAH_PERMUTASI, repeat=5):
+    """Waktu bangun bobot (sekali) dan analisis per bulan, serial vs paralel"""
+    gdf = load_geodata(shp_path)
+    t0 = time.perf_counter()
+    bobot = ContiguityWeights.from_geometry(gdf.geometry.values, 'queen', gdf['id_geo'].to_numpy())
+    t_queen = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ContiguityWeights.from_geometry(gdf.geometry.values, 'rook', gdf['id_geo'].to_numpy())
+    t_rook = time.perf_counter() - t0
+    id_geo, nilai = _nilai_sintetis(gdf, bobot)
+
+    serial = analisis_hotspot(id_geo, nilai, bobot, permutasi, workers=1)
+    paralel = analisis_hotspot(id_geo, nilai, bobot, permutasi)
+    assert serial.equals(paralel)
+
+    t_serial = ukur(lambda: analisis_hotspot(id_geo, nilai, bobot, permutasi, workers=1), repeat)
+    t_paralel = ukur(lambda: analisis_hotspot(id_geo, nilai, bobot, permutasi), repeat)
+    ringkas = ringkasan_klaster(paralel)
+    print(f"{len(id_geo):,} desa, {permutasi} permutasi, terbaik dari {repeat} kali")
+    print(f"Bangun bobot queen / rook   : {t_queen * 1000:8.1f} / {t_rook * 1000:.1f} ms (sekali, lalu cache)")
+    print(f"Analisis per bulan (1 thread): {t_serial * 1000:8.1f} ms")
+    print(f"Analisis per bulan ({os.cpu_count()} thread): {t_paralel * 1000:8.1f} ms")
+    print(f"Hotspot Gi* {ringkas['gi']['Hotspot']} desa, LISA Tinggi-Tinggi "
+          f"{ringkas['lisa'][KLASTER_LISA[1]['label']]} desa")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analisis hotspot spasial prevalensi stunting desa")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    bobot = sub.add_parser("bobot", help="Bangun/cache matriks ketetanggaan dan tampilkan ringkasannya")
+    bobot.add_argument("--jenis", choices=JENIS_BOBOT, default="queen")
+    bench = sub.add_parser("benchmark", help="Waktu analisis per bulan")
+    bench.add_argument("--permutasi", type=int, default=JUMLAH_PERMUTASI)
+    bench.add_argument("--repeat", type=int, default=5, help="Jumlah pengulangan")
+    parser.add_argument("--shp", default=SHP_FILE_PATH, help="Path shapefile desa")
+    args = parser.parse_args(argv)
+
+    if args.perintah == "benchmark":
+        benchmark(args.shp, args.permutasi, args.repeat)
+        return
+
+    w = load_weights(args.jenis, args.shp)
+    k = w.kardinalitas
+    print(f"Bobot {args.jenis}: {w.n} desa, {len(w.indices) // 2:,} pasangan tetangga "
+          f"({weights_path(args.jenis, args.shp)})")
+    print(f"Tetangga per desa: min {k.min()}, median {np.median(k):.0f}, maks {k.max()}, "
+          f"{int((k == 0).sum())} desa tanpa tetangga")
+
+if __name__ == "__main__":
+    main()
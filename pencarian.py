@@ -0,0 +1,192 @@
+"""
+Indeks pencarian nama wilayah (desa, kecamatan, puskesmas)
+
+Indeks dibangun sekali per dataset lalu dipakai ulang di setiap rerun, sehingga
+kotak pencarian peta dan filter tabel data tidak lagi memindai seluruh tabel
+dengan str.contains untuk setiap ketikan. Nama dicocokkan lewat kunci_nama
+(huruf besar, tanpa spasi/tanda baca) dengan peringkat:
+1. nama sama persis
+2. awalan nama ("CIKUBANG" menemukan "CIKUBANGSARI")
+3. awalan salah satu kata ("BARAT" menemukan "SAKERTA BARAT")
+4. potongan nama
+5. ejaan mirip (koefisien Dice trigram, lihat wilayah.TrigramIndex), misalnya
+   "CIKUBANSARI" menemukan "CIKUBANGSARI"
+
+Awalan dicari dengan binary search pada kunci terurut; potongan dan ejaan mirip
+lewat indeks terbalik trigram, jadi satu query tidak menyentuh semua nama.
+
+Pemakaian:
+    python pencarian.py cari QUERY   # coba cari nama desa/kecamatan di shapefile
+    python pencarian.py benchmark    # waktu per query: str.contains vs indeks
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench import ukur
+from geodata import SHP_FILE_PATH, load_geodata, normalize_name
+from wilayah import TrigramIndex, kunci_nama, kunci_teks
+
+# Skor Dice minimum agar nama dengan ejaan mirip ikut ditampilkan
+BATAS_MIRIP_CARI = 0.45
+
+# Tingkat kecocokan; skor hasil = tingkat + setengah skor Dice sebagai pemecah seri
+PERSIS, AWALAN, AWALAN_KATA, POTONGAN, MIRIP = 4, 3, 2, 1, 0
+
+_AKHIR_KUNCI = chr(0x10FFFF)
+
+def _rentang_awalan(kunci_urut, awalan):
+    """Rentang posisi kunci terurut yang diawali awalan (binary search)"""
+    kiri = np.searchsorted(kunci_urut, awalan, side='left')
+    kanan = np.searchsorted(kunci_urut, awalan + _AKHIR_KUNCI, side='left')
+    return kiri, kanan
+
+class SearchIndex:
+    """
+    Indeks pencarian untuk daftar nama
+
+    Parameters:
+    - teks: Nama yang ditampilkan (boleh berulang, misalnya desa bernama sama)
+    - jenis: Jenis tiap nama ('desa', 'kecamatan', 'puskesmas'), satu nilai
+      untuk semua atau satu per nama
+    """
+
+    def __init__(self, teks, jenis='desa'):
+        teks = pd.Series(list(teks), dtype=object)
+        self.teks = teks.to_numpy()
+        self.jenis = np.asarray(
+            [jenis] * len(teks) if isinstance(jenis, str) else list(jenis), dtype=object
+        )
+        self.kunci = kunci_nama(teks).to_numpy(dtype=str)
+
+        self._urut = np.argsort(self.kunci, kind='stable')
+        self._kunci_urut = self.kunci[self._urut]
+
+        # Kunci per kata untuk awalan kata; kata pertama sudah tercakup awalan nama
+        kata = normalize_name(teks.astype(str)).str.split().explode()
+        kata = kata[kata.index.duplicated(keep='first')]
+        kunci_kata = kunci_nama(kata).to_numpy(dtype=str)
+        urut_kata = np.argsort(kunci_kata, kind='stable')
+        self._kata_urut = kunci_kata[urut_kata]
+        self._kata_posisi = kata.index.to_numpy()[urut_kata]
+
+        self._trigram = TrigramIndex(self.kunci, self.jenis)
+
+    def __len__(self):
+        return len(self.teks)
+
+    def cari(self, query, n=10, jenis=None):
+        """
+        Nama yang cocok dengan query, urut dari yang paling relevan
+
+        Parameters:
+        - query: Teks yang diketik pengguna (huruf besar/kecil bebas)
+        - n: Jumlah hasil maksimum (None = semua)
+        - jenis: Batasi ke satu jenis nama, misalnya 'desa'
+
+        Returns:
+        - List (posisi, skor); skor = tingkat kecocokan (PERSIS..MIRIP) + setengah
+          skor Dice, sehingga int(skor) adalah tingkatnya
+        """
+        q = kunci_teks(query)
+        if not q:
+            return []
+
+        tingkat = np.full(len(self.teks), -1, dtype=np.int8)
+        kiri, kanan = _rentang_awalan(self._kata_urut, q)
+        tingkat[self._kata_posisi[kiri:kanan]] = AWALAN_KATA
+        kiri, kanan = _rentang_awalan(self._kunci_urut, q)
+        awalan = self._urut[kiri:kanan]
+        tingkat[awalan] = AWALAN
+        tingkat[awalan[self.kunci[awalan] == q]] = PERSIS
+
+        # Query pendek (< 3 huruf) hanya dicocokkan sebagai awalan
+        dice = self._trigram.skor(q) if len(q) >= 3 else np.zeros(len(self.teks))
+        for i in np.flatnonzero((dice > 0) & (tingkat < 0)):
+            if q in self.kunci[i]:
+                tingkat[i] = POTONGAN
+        tingkat[(tingkat < 0) & (dice >= BATAS_MIRIP_CARI)] = MIRIP
+
+        cocok = tingkat >= 0
+        if jenis is not None:
+            cocok &= self.jenis == jenis
+        posisi = np.flatnonzero(cocok)
+        skor = tingkat[posisi] + 0.5 * dice[posisi]
+        urutan = np.lexsort((self.kunci[posisi], -skor))[:n]
+        return [(int(posisi[i]), float(skor[i])) for i in urutan]
+
+def index_wilayah(df, kolom=('desa', 'kecamatan', 'puskesmas')):
+    """SearchIndex atas nama unik beberapa kolom wilayah (jenis = nama kolom)"""
+    teks, jenis = [], []
+    for k in kolom:
+        if k in df.columns:
+            unik = pd.unique(df[k].dropna().astype(str))
+            teks.extend(unik)
+            jenis.extend([k] * len(unik))
+    return SearchIndex(teks, jenis)
+
+def relevansi_baris(indeks, df, query):
+    """
+    Skor relevansi setiap baris df untuk query pada indeks dari index_wilayah
+
+    Skor baris adalah skor tertinggi di antara nama desa/kecamatan/puskesmasnya;
+    -1 untuk baris yang tidak cocok.
+    """
+    skor_nama = {}
+    for posisi, skor in indeks.cari(query, n=None):
+        skor_nama.setdefault(indeks.jenis[posisi], {})[indeks.teks[posisi]] = skor
+    hasil = np.full(len(df), -1.0)
+    for kolom, peta in skor_nama.items():
+        skor = df[kolom].astype(str).map(peta).to_numpy(dtype=float, na_value=-1.0)
+        hasil = np.maximum(hasil, skor)
+    return hasil
+
+# ========================================
+# BENCHMARK
+# ========================================
+
+def benchmark(shp_path=SHP_FILE_PATH, repeat=200):
+    """Waktu per query pada nama desa dan kecamatan shapefile: str.contains vs indeks"""
+    gdf = load_geodata(shp_path)
+    nama = gdf['NAMOBJ'].dropna().astype(str)
+    t0 = time.perf_counter()
+    indeks = index_wilayah(gdf.rename(columns={'NAMOBJ': 'desa', 'WADMKC': 'kecamatan'}))
+    t_bangun = time.perf_counter() - t0
+
+    queries = ['ci', 'cikub', 'barat', 'kuningan', 'cikubansari', 'sukamulya', 'darma']
+
+    def per_query(fn):
+        return ukur(lambda: [fn(q) for q in queries], repeat) / len(queries)
+
+    t_contains = per_query(lambda q: nama[nama.str.upper().str.contains(q.upper(), regex=False)])
+    t_indeks = per_query(lambda q: indeks.cari(q))
+    print(f"{len(indeks):,} nama, {len(queries)} query, terbaik dari {repeat} kali")
+    print(f"Bangun indeks             : {t_bangun * 1000:8.2f} ms (sekali per dataset)")
+    print(f"str.contains (lama)       : {t_contains * 1000:8.3f} ms per query")
+    print(f"SearchIndex.cari          : {t_indeks * 1000:8.3f} ms per query")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indeks pencarian nama wilayah")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    cari = sub.add_parser("cari", help="Cari nama desa/kecamatan di shapefile")
+    cari.add_argument("query")
+    cari.add_argument("-n", type=int, default=10, help="Jumlah hasil")
+    bench = sub.add_parser("benchmark", help="Waktu per query: str.contains vs indeks")
+    bench.add_argument("--repeat", type=int, default=200, help="Jumlah pengulangan")
+    parser.add_argument("--shp", default=SHP_FILE_PATH, help="Path shapefile desa")
+    args = parser.parse_args(argv)
+
+    if args.perintah == "benchmark":
+        benchmark(args.shp, args.repeat)
+        return
+
+    gdf = load_geodata(args.shp)
+    indeks = index_wilayah(gdf.rename(columns={'NAMOBJ': 'desa', 'WADMKC': 'kecamatan'}))
+    for posisi, skor in indeks.cari(args.query, n=args.n):
+        print(f"{skor:5.2f}  {indeks.jenis[posisi]:<10} {indeks.teks[posisi]}")
+
+if __name__ == "__main__":
+    main()
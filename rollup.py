@@ -0,0 +1,189 @@
+"""
+Kubus agregat (OLAP) data gizi balita: desa -> puskesmas -> kecamatan -> kabupaten
+
+Semua level wilayah dihitung sekali per dataset: fakta dijumlahkan ke level desa,
+lalu level yang lebih kasar dijumlahkan dari tabel desa. Setiap level menyimpan
+pembilang dan penyebut (KOLOM_JUMLAH) sehingga persentase selalu dihitung ulang
+dari jumlah, bukan rata-rata persentase level di bawahnya. Dashboard (metrik,
+daftar 10 teratas, grafik batang) dan tabel rollup gudang data membaca kubus
+yang sama sehingga angkanya selalu sama.
+
+Pemakaian:
+    python rollup.py benchmark   # bandingkan groupby terpisah vs kubus sekali hitung
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from bench import ukur
+
+# Urutan dari level terhalus ke terkasar; kunci desa memuat kecamatan agar
+# level kecamatan bisa dijumlahkan dari tabel desa
+LEVELS = {
+    'desa': ['id_wilayah', 'puskesmas', 'desa', 'kecamatan'],
+    'puskesmas': ['puskesmas'],
+    'kecamatan': ['kecamatan'],
+    'kabupaten': [],
+}
+
+NAMA_KABUPATEN = 'KABUPATEN KUNINGAN'
+
+KOLOM_JUMLAH = [
+    'sasaran_total', 'jumlah_ditimbang_d', 'jumlah_kurang_gizi', 'jumlah_stunting', 'jumlah_wasting'
+]
+
+# Indikator: kolom persentase -> (pembilang, penyebut)
+INDIKATOR = {
+    'persen_stunting': ('jumlah_stunting', 'jumlah_ditimbang_d'),
+    'persen_kurang_gizi': ('jumlah_kurang_gizi', 'jumlah_ditimbang_d'),
+    'persen_wasting': ('jumlah_wasting', 'jumlah_ditimbang_d'),
+    'persentase_ds': ('jumlah_ditimbang_d', 'sasaran_total'),
+}
+
+def periode_berikutnya(id_waktu):
+    """id_waktu bulan berikutnya (vektor), misalnya 202412 -> 202501"""
+    id_waktu = np.asarray(id_waktu)
+    return np.where(id_waktu % 100 == 12, id_waktu + 89, id_waktu + 1)
+
+# ========================================
+# FUNGSI KUBUS AGREGAT
+# ========================================
+
+def _jumlahkan(df, kunci):
+    """
+    Jumlah KOLOM_JUMLAH per id_waktu (jika ada) dan kolom kunci
+
+    Jumlah selalu int64: fakta bertipe uint16 (lihat skema.py) dan selisih
+    bilangan unsigned bisa melingkar.
+    """
+    grup = (['id_waktu'] if 'id_waktu' in df.columns else []) + kunci
+    if not grup:
+        total = df[KOLOM_JUMLAH].sum().to_frame().T.reset_index(drop=True)
+    else:
+        total = df.groupby(grup, as_index=False, dropna=False, sort=True, observed=True)[KOLOM_JUMLAH].sum()
+    return total.astype({kolom: 'int64' for kolom in KOLOM_JUMLAH})
+
+def hitung_indikator(tabel):
+    """Tambahkan kolom persentase INDIKATOR yang dihitung dari pembilang/penyebut"""
+    kolom_baru = {}
+    for kolom, (pembilang, penyebut) in INDIKATOR.items():
+        pembagi = tabel[penyebut].to_numpy(dtype=float)
+        kolom_baru[kolom] = np.divide(
+            tabel[pembilang].to_numpy(dtype=float) * 100, pembagi,
+            out=np.zeros(len(tabel)), where=pembagi > 0
+        )
+    return tabel.assign(**kolom_baru)
+
+def _lengkapi(tabel, level):
+    """Tambahkan kolom wilayah dan persentase ke satu level"""
+    if level == 'kabupaten':
+        wilayah = np.full(len(tabel), NAMA_KABUPATEN, dtype=object)
+    elif level == 'desa':
+        wilayah = tabel['desa'].astype(str) + " (" + tabel['puskesmas'].astype(str) + ")"
+    else:
+        wilayah = tabel[LEVELS[level][-1]].fillna('N/A').astype(str)
+    return hitung_indikator(tabel.assign(wilayah=wilayah))
+
+def build_cube(fact):
+    """
+    Hitung semua level wilayah sekaligus dari fakta desa
+
+    Parameters:
+    - fact: Fakta dengan kolom puskesmas, desa, KOLOM_JUMLAH, dan opsional
+      id_wilayah, kecamatan dan id_waktu (beberapa periode diagregasi per id_waktu)
+
+    Returns:
+    - dict level -> DataFrame (kolom kunci, wilayah, KOLOM_JUMLAH, persentase INDIKATOR)
+    """
+    fact = fact.assign(**{
+        kolom: 'N/A' for kolom in ('id_wilayah', 'kecamatan') if kolom not in fact.columns
+    })
+    desa = _jumlahkan(fact, LEVELS['desa'])
+    kubus = {'desa': _lengkapi(desa, 'desa')}
+    for level in ('puskesmas', 'kecamatan', 'kabupaten'):
+        kubus[level] = _lengkapi(_jumlahkan(desa, LEVELS[level]), level)
+    return kubus
+
+def peringkat(tabel, indikator='persen_stunting', n=10):
+    """
+    n wilayah dengan nilai indikator tertinggi (nilai 0 tidak diikutkan)
+
+    Urutan seri dipecah dengan nama wilayah agar daftar stabil antar rerun.
+    """
+    tabel = tabel[tabel[indikator] > 0]
+    return tabel.sort_values([indikator, 'wilayah'], ascending=[False, True], kind='stable').head(n)
+
+def tambah_perubahan(rollup):
+    """
+    Tambahkan kolom mom_<indikator> dan yoy_<indikator> (selisih poin persen)
+
+    MoM dibandingkan dengan bulan kalender sebelumnya, YoY dengan bulan yang sama
+    tahun sebelumnya; kosong (NaN) jika periode pembanding tidak tersimpan.
+    """
+    rollup = rollup.sort_values(['id_waktu', 'wilayah'], ignore_index=True)
+    dasar = rollup[['wilayah', 'id_waktu'] + list(INDIKATOR)]
+    for nama, geser in (('mom', periode_berikutnya), ('yoy', lambda p: np.asarray(p) + 100)):
+        lalu = dasar.assign(id_waktu=geser(dasar['id_waktu']))
+        pembanding = rollup[['wilayah', 'id_waktu']].merge(lalu, on=['wilayah', 'id_waktu'], how='left')
+        for kolom in INDIKATOR:
+            rollup[f'{nama}_{kolom}'] = rollup[kolom].to_numpy() - pembanding[kolom].to_numpy()
+    return rollup
+
+# ========================================
+# BENCHMARK
+# ========================================
+
+def _fakta_sintetis(jumlah_desa=400, jumlah_puskesmas=37, jumlah_kecamatan=32, seed=0):
+    rng = np.random.default_rng(seed)
+    pkm = rng.integers(0, jumlah_puskesmas, jumlah_desa)
+    fact = pd.DataFrame({
+        'id_wilayah': np.arange(1, jumlah_desa + 1),
+        'puskesmas': [f"PKM {i:02d}" for i in pkm],
+        'desa': [f"DESA {i:03d}" for i in range(jumlah_desa)],
+        'kecamatan': [f"KEC {i % jumlah_kecamatan:02d}" for i in pkm],
+        'sasaran_total': rng.integers(50, 500, jumlah_desa),
+    })
+    fact['jumlah_ditimbang_d'] = (fact['sasaran_total'] * rng.uniform(0.6, 1.0, jumlah_desa)).astype(int)
+    for kolom, batas in (('jumlah_kurang_gizi', 0.15), ('jumlah_stunting', 0.3), ('jumlah_wasting', 0.1)):
+        fact[kolom] = (fact['jumlah_ditimbang_d'] * rng.uniform(0, batas, jumlah_desa)).astype(int)
+    return fact
+
+def benchmark(jumlah_desa=400, repeat=20):
+    """
+    Microbenchmark: groupby terpisah per tampilan vs kubus yang dihitung sekali
+
+    Pola lama meniru dashboard sebelum kubus: agregat puskesmas untuk metrik,
+    agregat kecamatan dan puskesmas lagi untuk daftar 10 teratas, lalu agregat
+    kecamatan sekali lagi untuk grafik batang.
+    """
+    fact = _fakta_sintetis(jumlah_desa)
+
+    def pola_lama():
+        for kunci in (['puskesmas'], ['kecamatan'], ['puskesmas'], ['kecamatan']):
+            agg = fact.groupby(kunci, as_index=False)[KOLOM_JUMLAH].sum()
+            agg['persen_stunting'] = (agg['jumlah_stunting'] / agg['jumlah_ditimbang_d'] * 100).fillna(0)
+
+    kubus = build_cube(fact)
+    for level in ('puskesmas', 'kecamatan', 'kabupaten'):
+        assert kubus[level][KOLOM_JUMLAH].sum().equals(fact[KOLOM_JUMLAH].sum())
+
+    t_lama = ukur(pola_lama, repeat)
+    t_kubus = ukur(lambda: build_cube(fact), repeat)
+    t_baca = ukur(lambda: peringkat(kubus['kecamatan']), repeat)
+    print(f"{jumlah_desa:,} desa, terbaik dari {repeat} kali")
+    print(f"4x groupby terpisah (lama)    : {t_lama * 1000:8.2f} ms per rerun")
+    print(f"build_cube (4 level, sekali)  : {t_kubus * 1000:8.2f} ms per dataset")
+    print(f"peringkat dari kubus          : {t_baca * 1000:8.2f} ms per rerun")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kubus agregat desa/puskesmas/kecamatan/kabupaten")
+    parser.add_argument("perintah", choices=["benchmark"])
+    parser.add_argument("--desa", type=int, default=400, help="Jumlah desa sintetis")
+    parser.add_argument("--repeat", type=int, default=20, help="Jumlah pengulangan")
+    args = parser.parse_args(argv)
+    benchmark(args.desa, args.repeat)
+
+if __name__ == "__main__":
+    main()
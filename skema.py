@@ -0,0 +1,183 @@
+"""
+Skema tipe data tabel star schema (fakta, dimensi wilayah, dimensi waktu)
+
+Hasil parsing export e-PPGBM berupa float64 untuk semua angka dan string object
+untuk nama wilayah. Gudang data riwayat dan cache ETL menyimpan banyak bulan
+sekaligus, jadi tabel diubah ke tipe ringkas di akhir proses_etl:
+- jumlah (hitungan balita): bilangan cacah uint16, atau uint32 jika ada nilai > 65.535
+- persentase: float32
+- nama puskesmas/desa: category (setiap nama disimpan sekali)
+- kunci id_wilayah/id_waktu: int32
+
+Kolom wajib harus ada; jika tidak, ETL gagal. Sel hitungan yang kosong diisi 0,
+dan sel negatif, pecahan atau melebihi uint32 ditolak (juga diisi 0) alih-alih
+terpotong diam-diam saat di-cast. Jumlah sel yang diisi 0 dicatat di
+df.attrs['koreksi_jumlah'] dan dilaporkan proses_etl.
+
+Pemakaian:
+    python skema.py report FILE_GIZI FILE_SASARAN   # byte per baris sebelum/sesudah skema
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Tipe logis untuk hitungan balita: uint16, naik ke uint32 jika perlu
+JUMLAH = 'jumlah'
+
+KOLOM_JUMLAH_FACT = [
+    'sasaran_total', 'sasaran_laki', 'sasaran_perempuan',
+    'jumlah_ditimbang_d', 'jumlah_kurang_gizi', 'jumlah_stunting', 'jumlah_wasting',
+    'bbu_sangat_kurang', 'bbu_kurang', 'tbu_sangat_pendek', 'tbu_pendek',
+    'bbtb_gizi_buruk', 'bbtb_gizi_kurang', 'bbtb_obesitas',
+]
+
+KOLOM_PERSEN_FACT = ['persentase_ds', 'persen_kurang_gizi', 'persen_stunting', 'persen_wasting']
+
+SKEMA_FACT = {
+    'id_wilayah': 'int32',
+    'id_waktu': 'int32',
+    'puskesmas': 'category',
+    'desa': 'category',
+    **{kolom: JUMLAH for kolom in KOLOM_JUMLAH_FACT},
+    **{kolom: 'float32' for kolom in KOLOM_PERSEN_FACT},
+}
+
+SKEMA_WILAYAH = {
+    'id_wilayah': 'int32',
+    'puskesmas': 'category',
+    'desa': 'category',
+}
+
+SKEMA_WAKTU = {
+    'id_waktu': 'int32',
+    'tahun': 'int16',
+    'tanggal': 'int8',
+    'jam': 'int8',
+    'menit': 'int8',
+}
+
+def _jumlah(series):
+    """
+    Cast satu kolom hitungan ke uint16/uint32
+
+    Sel kosong atau bukan angka diisi 0; sel negatif, pecahan atau melebihi
+    batas uint32 ditolak dan juga diisi 0.
+
+    Returns:
+    - Tuple (array hitungan, jumlah sel kosong, jumlah sel ditolak)
+    """
+    nilai = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float, copy=True)
+    kosong = np.isnan(nilai)
+    with np.errstate(invalid='ignore'):
+        ditolak = ~kosong & ((nilai < 0) | (nilai != np.floor(nilai)) | (nilai > np.iinfo(np.uint32).max))
+    nilai[kosong | ditolak] = 0
+    tipe = np.uint16 if nilai.max(initial=0) <= np.iinfo(np.uint16).max else np.uint32
+    return nilai.astype(tipe), int(kosong.sum()), int(ditolak.sum())
+
+def apply_schema(df, skema, nama_tabel="tabel"):
+    """
+    Ubah tipe kolom DataFrame sesuai skema (kolom di luar skema tidak diubah)
+
+    Parameters:
+    - df: DataFrame sumber
+    - skema: dict kolom -> tipe ('category', JUMLAH, atau dtype numpy/pandas)
+    - nama_tabel: Nama tabel untuk pesan error
+
+    Returns:
+    - DataFrame baru dengan tipe sesuai skema; attrs['koreksi_jumlah'] berisi
+      dict kolom -> {'kosong': n, 'ditolak': n} untuk kolom hitungan yang
+      selnya diisi 0 (kosong jika semua valid)
+
+    Raises:
+    - ValueError jika kolom skema tidak ada
+    """
+    hilang = [kolom for kolom in skema if kolom not in df.columns]
+    if hilang:
+        raise ValueError(f"{nama_tabel}: kolom {', '.join(hilang)} tidak ada")
+
+    kolom_baru = {}
+    koreksi = {}
+    for kolom, tipe in skema.items():
+        if tipe == JUMLAH:
+            kolom_baru[kolom], kosong, ditolak = _jumlah(df[kolom])
+            if kosong or ditolak:
+                koreksi[kolom] = {'kosong': kosong, 'ditolak': ditolak}
+        elif tipe == 'category':
+            kolom_baru[kolom] = df[kolom].astype('category')
+        else:
+            kolom_baru[kolom] = df[kolom].astype(tipe)
+    hasil = df.assign(**kolom_baru)
+    hasil.attrs['koreksi_jumlah'] = koreksi
+    return hasil
+
+def ringkasan_koreksi(df):
+    """Teks ringkas sel hitungan yang diisi 0 oleh apply_schema ('' jika tidak ada)"""
+    koreksi = df.attrs.get('koreksi_jumlah', {})
+    kosong = sum(k['kosong'] for k in koreksi.values())
+    ditolak = {kolom: k['ditolak'] for kolom, k in koreksi.items() if k['ditolak']}
+    bagian = []
+    if kosong:
+        bagian.append(f"{kosong} sel hitungan kosong diisi 0")
+    if ditolak:
+        bagian.append(
+            f"{sum(ditolak.values())} sel hitungan tidak valid (negatif/pecahan) diisi 0: "
+            + ", ".join(f"{kolom} ({n})" for kolom, n in ditolak.items())
+        )
+    return "; ".join(bagian)
+
+def bytes_per_row(df):
+    """Pemakaian memori (deep) per baris"""
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+
+def memory_report(sebelum, sesudah):
+    """
+    Ringkasan memori tabel sebelum/sesudah skema
+
+    Parameters:
+    - sebelum, sesudah: dict nama tabel -> DataFrame
+
+    Returns:
+    - DataFrame tabel, baris, byte/baris sebelum & sesudah, total KB dan rasio
+    """
+    baris = []
+    for nama, df in sebelum.items():
+        b0, b1 = bytes_per_row(df), bytes_per_row(sesudah[nama])
+        baris.append({
+            'tabel': nama,
+            'baris': len(df),
+            'byte_per_baris_sebelum': round(b0, 1),
+            'byte_per_baris_sesudah': round(b1, 1),
+            'kb_sebelum': round(b0 * len(df) / 1024, 1),
+            'kb_sesudah': round(b1 * len(df) / 1024, 1),
+            'rasio': round(b0 / b1, 2) if b1 else None,
+        })
+    return pd.DataFrame(baris)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Skema tipe data star schema")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    report = sub.add_parser("report", help="Byte per baris hasil ETL sebelum/sesudah skema")
+    report.add_argument("file_gizi")
+    report.add_argument("file_sasaran")
+    args = parser.parse_args(argv)
+
+    from etl import proses_etl
+
+    hasil = {}
+    for pakai_skema in (False, True):
+        df_fact, df_wilayah, df_waktu, success, message = proses_etl(
+            args.file_gizi, args.file_sasaran, pakai_skema=pakai_skema
+        )
+        if not success:
+            parser.error(message)
+        hasil[pakai_skema] = {'fact': df_fact, 'wilayah': df_wilayah, 'waktu': df_waktu}
+
+    laporan = memory_report(hasil[False], hasil[True])
+    print(laporan.to_string(index=False))
+    fact = laporan.iloc[0]
+    print(f"Proyeksi 24 bulan fakta: {fact['kb_sebelum'] * 24 / 1024:.2f} MB -> {fact['kb_sesudah'] * 24 / 1024:.2f} MB")
+
+if __name__ == "__main__":
+    main()
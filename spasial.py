@@ -0,0 +1,165 @@
+"""
+Indeks spasial desa: koordinat (lon/lat) -> fitur desa shapefile (id_geo)
+
+Indeks STRtree dibangun sekali atas geometri desa detail dari artefak geodata.
+Pencarian satu titik (klik peta) hanya menguji poligon yang kotak batasnya
+memuat titik itu (O(log n) lewat pohon), bukan memindai semua geometri. Titik
+dalam jumlah besar (koordinat posyandu, kunjungan rumah) dicari sekaligus
+dengan satu query STRtree tervektorisasi.
+
+Titik di batas dua desa masuk ke desa dengan id_geo terkecil agar hasilnya
+selalu sama. Titik di luar semua poligon mendapat TANPA_FITUR, kecuali
+jarak_maks diberikan: titik itu lalu masuk ke desa terdekat dalam jarak tersebut
+(misalnya titik GPS yang sedikit melenceng di tepi kabupaten).
+
+Pemakaian:
+    python spasial.py titik 108.48 -6.98   # desa yang memuat koordinat
+    python spasial.py benchmark            # pindai semua geometri vs STRtree
+"""
+
+import argparse
+import time
+
+import numpy as np
+import shapely
+
+from bench import ukur
+from geodata import SHP_FILE_PATH, load_geodata
+
+# id_geo untuk titik di luar semua desa (sama dengan wilayah.TANPA_FITUR)
+TANPA_FITUR = -1
+
+class SpatialIndex:
+    """
+    Indeks STRtree atas poligon desa
+
+    Parameters:
+    - gdf: GeoDataFrame desa dengan kolom id_geo dan geometry (EPSG:4326)
+    """
+
+    def __init__(self, gdf):
+        self.id_geo = gdf['id_geo'].to_numpy(dtype=np.int32)
+        self.geometry = np.asarray(gdf.geometry.values)
+        shapely.prepare(self.geometry)
+        self._tree = shapely.STRtree(self.geometry)
+
+    def __len__(self):
+        return len(self.id_geo)
+
+    def desa_di_titik(self, lon, lat):
+        """id_geo desa yang memuat satu koordinat, None jika di luar semua desa"""
+        posisi = self._tree.query(shapely.Point(lon, lat), predicate='intersects')
+        if not len(posisi):
+            return None
+        return int(self.id_geo[posisi].min())
+
+    def desa_massal(self, lon, lat, jarak_maks=None):
+        """
+        id_geo desa untuk banyak titik sekaligus
+
+        Parameters:
+        - lon, lat: Array koordinat (derajat, EPSG:4326)
+        - jarak_maks: Jarak maksimum (derajat) ke desa terdekat untuk titik di
+          luar semua poligon; None = tetap TANPA_FITUR
+
+        Returns:
+        - Array int32 id_geo per titik (TANPA_FITUR jika tidak ada desa)
+        """
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        hasil = np.full(len(lon), TANPA_FITUR, dtype=np.int32)
+        valid = np.isfinite(lon) & np.isfinite(lat)
+        if not valid.any():
+            return hasil
+
+        idx_valid = np.flatnonzero(valid)
+        lon, lat = lon[valid], lat[valid]
+        titik = shapely.points(lon, lat)
+        # Kandidat dari kotak batas, lalu uji titik-dalam-poligon pada geometri
+        # yang sudah di-prepare (jauh lebih cepat daripada predicate di query)
+        idx_titik, posisi = self._tree.query(titik)
+        di_dalam = shapely.intersects_xy(self.geometry[posisi], lon[idx_titik], lat[idx_titik])
+        idx_titik, posisi = idx_titik[di_dalam], posisi[di_dalam]
+        if len(idx_titik):
+            # Titik di batas: id_geo terkecil (minimum per titik lewat urutan)
+            id_cocok = self.id_geo[posisi]
+            urutan = np.lexsort((id_cocok, idx_titik))
+            pertama = np.r_[True, np.diff(idx_titik[urutan]) != 0]
+            hasil[idx_valid[idx_titik[urutan][pertama]]] = id_cocok[urutan][pertama]
+
+        if jarak_maks is not None:
+            sisa = np.flatnonzero(hasil[idx_valid] == TANPA_FITUR)
+            if len(sisa):
+                idx_sisa, posisi = self._tree.query_nearest(titik[sisa], max_distance=jarak_maks, all_matches=False)
+                hasil[idx_valid[sisa[idx_sisa]]] = self.id_geo[posisi]
+        return hasil
+
+# ========================================
+# BENCHMARK
+# ========================================
+
+def _titik_acak(gdf, jumlah, seed=0):
+    """Titik acak di dalam kotak batas semua desa"""
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = gdf.total_bounds
+    return rng.uniform(minx, maxx, jumlah), rng.uniform(miny, maxy, jumlah)
+
+def benchmark(shp_path=SHP_FILE_PATH, jumlah=100_000, repeat=3):
+    """Satu klik: pindai semua geometri vs STRtree; titik massal: satu query STRtree"""
+    gdf = load_geodata(shp_path)
+    t0 = time.perf_counter()
+    indeks = SpatialIndex(gdf)
+    t_bangun = time.perf_counter() - t0
+    geometri = np.asarray(gdf.geometry.values)
+
+    lon, lat = _titik_acak(gdf, jumlah)
+    klik = list(zip(lon[:200], lat[:200]))
+
+    def pindai():
+        for x, y in klik:
+            titik = shapely.Point(x, y)
+            cocok = np.flatnonzero(shapely.intersects(geometri, titik))
+            _ = int(indeks.id_geo[cocok].min()) if len(cocok) else None
+
+    for x, y in klik:
+        titik = shapely.Point(x, y)
+        cocok = np.flatnonzero(shapely.intersects(geometri, titik))
+        assert indeks.desa_di_titik(x, y) == (int(indeks.id_geo[cocok].min()) if len(cocok) else None)
+
+    t_pindai = ukur(pindai, repeat) / len(klik)
+    t_pohon = ukur(lambda: [indeks.desa_di_titik(x, y) for x, y in klik], repeat) / len(klik)
+    t_massal = ukur(lambda: indeks.desa_massal(lon, lat), repeat)
+    tercakup = (indeks.desa_massal(lon, lat) != TANPA_FITUR).mean()
+
+    print(f"{len(indeks):,} desa, bangun STRtree {t_bangun * 1000:.1f} ms (sekali per proses)")
+    print(f"Klik peta: pindai semua geometri : {t_pindai * 1000:8.3f} ms per titik")
+    print(f"Klik peta: STRtree               : {t_pohon * 1000:8.3f} ms per titik")
+    print(f"{jumlah:,} titik sekaligus (STRtree)  : {t_massal * 1000:8.1f} ms  "
+          f"({jumlah / t_massal:,.0f} titik/s, {tercakup:.0%} di dalam desa)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indeks spasial desa (titik -> desa)")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    titik = sub.add_parser("titik", help="Desa yang memuat satu koordinat")
+    titik.add_argument("lon", type=float)
+    titik.add_argument("lat", type=float)
+    bench = sub.add_parser("benchmark", help="Pindai semua geometri vs STRtree")
+    bench.add_argument("--titik", type=int, default=100_000, help="Jumlah titik acak")
+    bench.add_argument("--repeat", type=int, default=3, help="Jumlah pengulangan")
+    parser.add_argument("--shp", default=SHP_FILE_PATH, help="Path shapefile desa")
+    args = parser.parse_args(argv)
+
+    if args.perintah == "benchmark":
+        benchmark(args.shp, args.titik, args.repeat)
+        return
+
+    gdf = load_geodata(args.shp)
+    id_geo = SpatialIndex(gdf).desa_di_titik(args.lon, args.lat)
+    if id_geo is None:
+        print("Koordinat di luar semua desa")
+    else:
+        fitur = gdf[gdf['id_geo'] == id_geo].iloc[0]
+        print(f"id_geo {id_geo}: {fitur['NAMOBJ']}, Kec. {fitur['WADMKC']}, {fitur['WADMKK']}")
+
+if __name__ == "__main__":
+    main()
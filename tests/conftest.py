@@ -0,0 +1,86 @@
+"""
+Fixture bersama pengujian
+
+Modul dashboard memakai path relatif terhadap root repo (data/, static/), jadi
+setiap test dijalankan dari root repo. Gudang data, cache dan file sumber
+ditulis ke folder sementara pytest.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Pasangan puskesmas/desa Kabupaten Kuningan yang ada di shapefile
+DESA_CONTOH = [
+    ('CIAWI GERBANG', 'SUKADANA'),
+    ('CIAWI GERBANG', 'CIHIRUP'),
+    ('CIAWI GERBANG', 'PADARAMA'),
+]
+
+@pytest.fixture(autouse=True)
+def root_repo(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+def html_gizi(tanggal, nilai):
+    """
+    Export status gizi e-PPGBM mini (.xls HTML) dengan header rowspan/colspan
+
+    Parameters:
+    - tanggal: Teks "YYYY-MM-DD HH:MM:SS" untuk baris Data Tanggal
+    - nilai: List 16 angka per desa DESA_CONTOH (BB/U, TB/U, BB/TB)
+    """
+    baris = [
+        f'<html><body><p>Data Tanggal : {tanggal}</p><table>',
+        '<tr><th rowspan="2">No</th><th rowspan="2">Puskesmas</th><th rowspan="2">Desa</th>'
+        '<th colspan="5">BB/U</th><th colspan="5">TB/U</th><th colspan="6">BB/TB</th></tr>',
+        '<tr>' + ''.join(f'<th>k{i}</th>' for i in range(16)) + '</tr>',
+    ]
+    for no, ((puskesmas, desa), angka) in enumerate(zip(DESA_CONTOH, nilai), 1):
+        baris.append(
+            f'<tr><td>{no}</td><td>{puskesmas}</td><td>{desa}</td>'
+            + ''.join(f'<td>{a}</td>' for a in angka) + '</tr>'
+        )
+    baris.append('<tr><td colspan="3">Jumlah</td>' + '<td>0</td>' * 16 + '</tr></table></body></html>')
+    return '\n'.join(baris)
+
+def html_sasaran(tanggal, sasaran):
+    """Export sasaran balita mini (.xls HTML); sasaran = list (laki, perempuan) per desa"""
+    baris = [
+        f'<html><body><p>Data Tanggal : {tanggal}</p><table>',
+        '<tr><th rowspan="2">No</th><th rowspan="2">Puskesmas</th><th rowspan="2">Desa</th>'
+        '<th colspan="3">Sasaran</th></tr>',
+        '<tr><th>L</th><th>P</th><th>Total</th></tr>',
+    ]
+    for no, ((puskesmas, desa), (laki, perempuan)) in enumerate(zip(DESA_CONTOH, sasaran), 1):
+        baris.append(
+            f'<tr><td>{no}</td><td>{puskesmas}</td><td>{desa}</td>'
+            f'<td>{laki}</td><td>{perempuan}</td><td>{laki + perempuan}</td></tr>'
+        )
+    baris.append('</table></body></html>')
+    return '\n'.join(baris)
+
+@pytest.fixture
+def export_mini(tmp_path):
+    """
+    Tulis pasangan file export mini dan kembalikan path-nya
+
+    Returns:
+    - Fungsi (nama, tanggal, geser=0, folder=None) -> (path gizi, path sasaran);
+      geser mengubah semua angka agar isi file (dan hash sumbernya) berbeda,
+      folder adalah subfolder tmp_path tujuan
+    """
+    def tulis(nama, tanggal='2025-08-30 10:11:12', geser=0, folder=None):
+        nilai = [[(d * 16 + i + geser) % 40 for i in range(16)] for d in range(len(DESA_CONTOH))]
+        sasaran = [(100 + d + geser, 90 + d) for d in range(len(DESA_CONTOH))]
+        tujuan = tmp_path / folder if folder else tmp_path
+        tujuan.mkdir(parents=True, exist_ok=True)
+        path_gizi = tujuan / f"status_gizi_{nama}.xls"
+        path_sasaran = tujuan / f"sasaran_{nama}.xls"
+        path_gizi.write_text(html_gizi(tanggal, nilai), encoding='utf-8')
+        path_sasaran.write_text(html_sasaran(tanggal, sasaran), encoding='utf-8')
+        return str(path_gizi), str(path_sasaran)
+    return tulis
@@ -0,0 +1,108 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from conftest import DESA_CONTOH
+from etl import jenis_engine, parse_html_xls, proses_etl, read_source_excel
+
+def test_parse_html_xls_expands_spans(export_mini):
+    path_gizi, _ = export_mini('08')
+    tanggal_info, rows = parse_html_xls(path_gizi)
+
+    assert tanggal_info == 'Data Tanggal : 2025-08-30 10:11:12'
+    # 2 baris header + 3 desa + baris Jumlah
+    assert len(rows) == 6
+    assert all(len(r) == 19 for r in rows)
+    # colspan: hanya sel kiri-atas yang berisi teks
+    assert rows[0][:4] == ['No', 'Puskesmas', 'Desa', 'BB/U'] and rows[0][4:8] == [None] * 4
+    # rowspan: sel yang tertutup baris di atasnya bernilai None, isi bergeser ke kanan
+    assert rows[1][:4] == [None, None, None, 'k0'] and rows[1][18] == 'k15'
+    assert rows[2][:4] == ['1', 'CIAWI GERBANG', 'SUKADANA', '0']
+    assert rows[5][:4] == ['Jumlah', None, None, '0']
+
+def test_parse_html_xls_bukan_html():
+    assert parse_html_xls(io.BytesIO(b'bukan tabel')) == (None, None)
+
+def test_read_source_excel_bytes_sama_dengan_path(export_mini):
+    path_gizi, _ = export_mini('08')
+    with open(path_gizi, 'rb') as f:
+        data = f.read()
+    waktu_path, df_path = read_source_excel(path_gizi)
+    waktu_bytes, df_bytes = read_source_excel(data)
+
+    assert waktu_path == waktu_bytes == 'Data Tanggal : 2025-08-30 10:11:12'
+    assert df_path.equals(df_bytes)
+
+def test_jenis_engine_dari_isi_bukan_ekstensi(tmp_path, export_mini):
+    path_gizi, _ = export_mini('08')
+    html_xlsx = tmp_path / 'html_bernama.xlsx'
+    html_xlsx.write_bytes(open(path_gizi, 'rb').read())
+    xlsx_xls = tmp_path / 'disimpan_ulang.xls'
+    pd.DataFrame([['Data Tanggal : 2025-08-30 10:11:12']]).to_excel(
+        xlsx_xls, header=False, index=False, engine='openpyxl'
+    )
+
+    assert jenis_engine(str(html_xlsx)) == 'html'
+    assert jenis_engine(str(xlsx_xls), engine='openpyxl') == 'openpyxl'
+    assert read_source_excel(str(xlsx_xls))[0] == 'Data Tanggal : 2025-08-30 10:11:12'
+
+def test_proses_etl_export_mini(export_mini):
+    df_fact, df_wilayah, df_waktu, ok, pesan = proses_etl(*export_mini('08'))
+
+    assert ok, pesan
+    assert list(zip(df_wilayah['puskesmas'], df_wilayah['desa'])) == DESA_CONTOH
+    assert df_waktu[['tahun', 'bulan', 'tanggal']].iloc[0].tolist() == [2025, 'AGUSTUS', 30]
+    # id_waktu YYYYMM dari Data Tanggal
+    assert df_waktu['id_waktu'].tolist() == [202508] and (df_fact['id_waktu'] == 202508).all()
+    # Desa pertama: BB/U 0..4, TB/U 5..9, sasaran 100 + 90
+    pertama = df_fact.iloc[0]
+    assert pertama['jumlah_ditimbang_d'] == 0 + 1 + 2 + 3 + 4
+    assert pertama['jumlah_stunting'] == 5 + 6
+    assert pertama['sasaran_total'] == 190
+    assert np.isclose(pertama['persen_stunting'], 11 / 10 * 100)
+
+def test_batch_cli_gudang(tmp_path, export_mini):
+    from etl import main
+    from warehouse import Warehouse
+
+    export_mini('2025-07', tanggal='2025-07-31 08:00:00', folder='export')
+    export_mini('2025-08', geser=3, folder='export')
+    export_mini('tanpa_periode', tanggal='2025-09-30 08:00:00', geser=5, folder='export/lain')
+    (tmp_path / 'export' / 'status_gizi_yatim.xls').write_text('<html></html>', encoding='utf-8')
+    root = str(tmp_path / 'gudang')
+
+    assert main(['batch', str(tmp_path / 'export'), '--gudang', root, '--workers', '1']) == 0
+
+    gudang = Warehouse(root)
+    # Periode dari nama file, atau dari tanggal penarikan jika nama tidak memuat periode
+    assert gudang.periods() == [202507, 202508, 202509]
+    assert sorted(gudang.load_rollup('kabupaten')['id_waktu']) == [202507, 202508, 202509]
+    assert len(gudang.load_period(202508)[0]) == len(DESA_CONTOH)
+
+def test_batch_cli_format_csv(tmp_path, export_mini):
+    from etl import main
+
+    export_mini('2025-08', folder='export')
+    keluaran = tmp_path / 'hasil'
+
+    assert main(['batch', str(tmp_path / 'export'), '--format', 'csv', '--keluaran', str(keluaran),
+                 '--workers', '1']) == 0
+    folder = keluaran / 'periode=202508'
+    assert sorted(p.name for p in folder.iterdir()) == ['dim_waktu.csv', 'dim_wilayah.csv', 'fact_kesehatan.csv']
+
+def test_batch_cli_tidak_menimpa_tanpa_timpa(tmp_path, export_mini):
+    from etl import main
+    from warehouse import Warehouse
+
+    export_mini('2025-08', folder='bulan_lalu')
+    export_mini('2025-08', geser=9, folder='koreksi')
+    root = str(tmp_path / 'gudang')
+    assert main(['batch', str(tmp_path / 'bulan_lalu'), '--gudang', root, '--workers', '1']) == 0
+    sumber = Warehouse(root).dim_waktu()['sumber'].iloc[0]
+
+    assert main(['batch', str(tmp_path / 'koreksi'), '--gudang', root, '--workers', '1']) == 1
+    assert Warehouse(root).dim_waktu()['sumber'].iloc[0] == sumber
+
+    assert main(['batch', str(tmp_path / 'koreksi'), '--gudang', root, '--workers', '1', '--timpa']) == 0
+    assert Warehouse(root).dim_waktu()['sumber'].iloc[0] != sumber
@@ -0,0 +1,78 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely.geometry import MultiPolygon, Polygon, box
+
+from geodata import TOPOJSON_QUANTUM, label_points, to_topojson
+
+LANGKAH = 0.01
+
+def grid_desa(kolom=3, baris=3, x0=108.4, y0=-7.1):
+    """Kotak-kotak bersebelahan seperti coverage desa (batas bersama berimpitan)"""
+    kotak = [
+        box(x0 + i * LANGKAH, y0 + j * LANGKAH, x0 + (i + 1) * LANGKAH, y0 + (j + 1) * LANGKAH)
+        for j in range(baris) for i in range(kolom)
+    ]
+    return gpd.GeoDataFrame({'id_geo': range(len(kotak))}, geometry=kotak, crs='EPSG:4326')
+
+def decode_arcs(topo):
+    """Arc delta-encoded -> koordinat asli per arc"""
+    skala = np.asarray(topo['transform']['scale'])
+    geser = np.asarray(topo['transform']['translate'])
+    return [np.cumsum(np.asarray(arc), axis=0) * skala + geser for arc in topo['arcs']]
+
+def decode_geometry(geometry, arcs):
+    """Geometri TopoJSON (MultiPolygon) -> shapely"""
+    def ring(indeks):
+        bagian = [arcs[i] if i >= 0 else arcs[~i][::-1] for i in indeks]
+        return np.vstack([bagian[0]] + [b[1:] for b in bagian[1:]])
+    return MultiPolygon([
+        Polygon(ring(rings[0]), [ring(r) for r in rings[1:]]) for rings in geometry['arcs']
+    ])
+
+def sama(a, b):
+    return shapely.equals_exact(shapely.normalize(a), shapely.normalize(b), tolerance=TOPOJSON_QUANTUM / 10)
+
+def test_to_topojson_round_trip_grid():
+    gdf = grid_desa()
+    topo = to_topojson(gdf, properties=('id_geo',))
+    arcs = decode_arcs(topo)
+    geometries = topo['objects']['desa']['geometries']
+
+    assert [g['properties']['id_geo'] for g in geometries] == list(range(9))
+    for geometry, asli in zip(geometries, gdf.geometry):
+        assert sama(decode_geometry(geometry, arcs), MultiPolygon([asli]))
+    # Junction hanya di titik temu 3-4 desa: 12 sisi dalam + 8 potongan batas luar,
+    # setiap sisi dalam disimpan sekali dan dipakai dua desa
+    assert len(arcs) == 20
+    pakai = np.bincount([i if i >= 0 else ~i for g in geometries for r in g['arcs'][0] for i in r])
+    assert sorted(np.bincount(pakai))[-2:] == [8, 12]
+
+def test_to_topojson_enclave_dan_multipolygon():
+    luar = box(108.40, -7.10, 108.43, -7.07)
+    dalam = box(108.41, -7.09, 108.42, -7.08)
+    pulau = box(108.45, -7.10, 108.46, -7.09)
+    gdf = gpd.GeoDataFrame(
+        {'id_geo': [0, 1]},
+        geometry=[MultiPolygon([luar.difference(dalam), pulau]), dalam],
+        crs='EPSG:4326',
+    )
+    topo = to_topojson(gdf, properties=('id_geo',))
+    arcs = decode_arcs(topo)
+    geometries = topo['objects']['desa']['geometries']
+
+    assert sama(decode_geometry(geometries[0], arcs), gdf.geometry[0])
+    assert sama(decode_geometry(geometries[1], arcs), MultiPolygon([dalam]))
+    # Ring enclave tanpa junction disimpan sekali: lubang desa 0 memakai arc desa 1
+    lubang, = geometries[0]['arcs'][0][1]
+    enclave, = geometries[1]['arcs'][0][0]
+    assert lubang in (enclave, ~enclave)
+    assert len(arcs) == 3
+
+def test_label_points_multipolygon_di_bagian_terlebar():
+    jalur = box(0, 0, 30, 1)  # terluas tetapi sempit
+    kotak = box(20, 3, 23, 6)
+    x, y = label_points(np.array([MultiPolygon([jalur, kotak]), jalur], dtype=object), tolerance=0.01)
+
+    assert kotak.contains(shapely.points(x[0], y[0]))
+    assert jalur.contains(shapely.points(x[1], y[1]))
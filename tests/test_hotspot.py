@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+from shapely.geometry import box
+
+from hotspot import ContiguityWeights, analisis_hotspot, getis_ord_gi_star, local_moran
+
+def grid(kolom=5, baris=4):
+    return np.array([box(i, j, i + 1, j + 1) for j in range(baris) for i in range(kolom)], dtype=object)
+
+def matriks_padat(bobot):
+    w = np.zeros((bobot.n, bobot.n))
+    w[bobot.baris, bobot.indices] = 1
+    return w
+
+@pytest.fixture
+def data_grid():
+    x = np.random.default_rng(1).gamma(2.0, 5.0, 20)
+    x[[0, 1, 5]] += 30
+    return x, ContiguityWeights.from_geometry(grid(), 'queen')
+
+def test_bobot_queen_rook_grid():
+    queen = ContiguityWeights.from_geometry(grid(), 'queen')
+    rook = ContiguityWeights.from_geometry(grid(), 'rook')
+
+    w = matriks_padat(queen)
+    assert (w == w.T).all() and not w.diagonal().any()
+    # Sudut 3 tetangga queen / 2 rook, tengah 8 / 4
+    assert (queen.kardinalitas[0], rook.kardinalitas[0]) == (3, 2)
+    assert (queen.kardinalitas[6], rook.kardinalitas[6]) == (8, 4)
+    assert set(rook.indices[rook.indptr[6]:rook.indptr[7]]) == {1, 5, 7, 11}
+
+def test_subset_dan_simpan(tmp_path, data_grid):
+    _, bobot = data_grid
+    pilih = np.ones(bobot.n, dtype=bool)
+    pilih[[6, 13]] = False
+    potong = bobot.subset(pilih)
+    assert (matriks_padat(potong) == matriks_padat(bobot)[np.ix_(pilih, pilih)]).all()
+    assert potong.id_geo.tolist() == np.flatnonzero(pilih).tolist()
+
+    path = str(tmp_path / 'bobot.npz')
+    bobot.simpan(path)
+    muat = ContiguityWeights.muat(path)
+    assert muat.n == bobot.n and (matriks_padat(muat) == matriks_padat(bobot)).all()
+
+def test_local_moran_sama_dengan_matriks_padat(data_grid):
+    x, bobot = data_grid
+    n = len(x)
+    w = matriks_padat(bobot)
+    r = w / w.sum(axis=1, keepdims=True)
+    z = x - x.mean()
+
+    hasil = local_moran(x, bobot)
+
+    np.testing.assert_allclose(hasil['lag'], r @ z)
+    np.testing.assert_allclose(hasil['moran_i'], (n - 1) * z * (r @ z) / (z @ z))
+    assert hasil['kuadran'][0] == 1
+
+def test_getis_ord_gi_star_sama_dengan_matriks_padat(data_grid):
+    x, bobot = data_grid
+    n = len(x)
+    ws = matriks_padat(bobot) + np.eye(n)
+    wi = ws.sum(axis=1)
+    s = np.sqrt((x * x).mean() - x.mean() ** 2)
+    harapan = (ws @ x - x.mean() * wi) / (s * np.sqrt((n * wi - wi * wi) / (n - 1)))
+
+    hasil = getis_ord_gi_star(x, bobot)
+
+    np.testing.assert_allclose(hasil['gi_star'], harapan)
+    assert hasil['klaster_gi'][0] == 1
+    # Tanpa permutasi: p-value normal dua arah
+    np.testing.assert_allclose(hasil['p_gi'], [math.erfc(abs(z) / math.sqrt(2)) for z in harapan])
+    assert hasil['p_gi'].dtype == float
+
+def test_analisis_hotspot_tidak_bergantung_urutan_dan_worker(data_grid):
+    x, bobot = data_grid
+    id_geo = np.arange(len(x))
+    acak = np.random.default_rng(2).permutation(len(x))
+
+    serial = analisis_hotspot(id_geo, x, bobot, permutasi=199, workers=1)
+    paralel = analisis_hotspot(id_geo[acak], x[acak], bobot, permutasi=199, workers=4)
+
+    assert serial.equals(paralel)
+    assert serial['p_moran'].between(1 / 200, 1).all()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from pencarian import AWALAN, AWALAN_KATA, MIRIP, PERSIS, POTONGAN, SearchIndex, index_wilayah, relevansi_baris
+
+NAMA = ['CIKUBANGSARI', 'CIKUBANGMULYA', 'SAKERTA BARAT', 'SAKERTA TIMUR', 'KUNINGAN', 'CIBUNTU', 'CIBUNTU']
+
+def cari(indeks, query, **kwargs):
+    return [(indeks.teks[posisi], int(skor)) for posisi, skor in indeks.cari(query, **kwargs)]
+
+def test_cari_tingkat_kecocokan():
+    indeks = SearchIndex(NAMA)
+
+    assert cari(indeks, 'kuningan')[0] == ('KUNINGAN', PERSIS)
+    assert sorted(cari(indeks, 'cikubang')) == [('CIKUBANGMULYA', AWALAN), ('CIKUBANGSARI', AWALAN)]
+    assert cari(indeks, 'barat') == [('SAKERTA BARAT', AWALAN_KATA)]
+    assert ('CIKUBANGSARI', POTONGAN) in cari(indeks, 'bangsari')
+    assert cari(indeks, 'cikubansari')[0] == ('CIKUBANGSARI', MIRIP)
+
+def test_cari_query_pendek_kosong_dan_batas():
+    indeks = SearchIndex(NAMA)
+
+    # Kurang dari 3 huruf: hanya awalan, bukan potongan
+    assert {t for t, _ in cari(indeks, 'ci')} == {'CIKUBANGSARI', 'CIKUBANGMULYA', 'CIBUNTU'}
+    assert cari(indeks, '  ') == []
+    assert len(indeks.cari('ci', n=2)) == 2
+    # Nama berulang tetap muncul di setiap posisinya
+    assert [p for p, _ in indeks.cari('cibuntu')] == [5, 6]
+
+def test_index_wilayah_jenis_dan_relevansi_baris():
+    df = pd.DataFrame({
+        'puskesmas': ['CIAWI GERBANG', 'CIAWI GERBANG', 'CIBEUREUM'],
+        'desa': ['SUKADANA', 'CIHIRUP', 'SUKADANA'],
+        'kecamatan': ['CIAWIGEBANG', 'CIAWIGEBANG', 'CIBEUREUM'],
+    })
+    indeks = index_wilayah(df)
+
+    assert sorted(indeks.jenis[p] for p, _ in indeks.cari('cibeureum')) == ['kecamatan', 'puskesmas']
+    assert [indeks.teks[p] for p, _ in indeks.cari('cibeureum', jenis='kecamatan')] == ['CIBEUREUM']
+    skor = relevansi_baris(indeks, df, 'sukadana')
+    assert (skor[[0, 2]] >= PERSIS).all() and skor[1] == -1
+    assert np.array_equal(relevansi_baris(indeks, df, 'zzz'), [-1, -1, -1])
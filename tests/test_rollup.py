@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from rollup import KOLOM_JUMLAH, NAMA_KABUPATEN, build_cube, peringkat, tambah_perubahan
+
+def fakta_contoh():
+    return pd.DataFrame({
+        'id_wilayah': [1, 2, 3, 4],
+        'puskesmas': ['PKM A', 'PKM A', 'PKM B', 'PKM B'],
+        'desa': ['DESA 1', 'DESA 2', 'DESA 3', 'DESA 4'],
+        'kecamatan': ['KEC X', 'KEC X', 'KEC X', 'KEC Y'],
+        'sasaran_total': [100, 200, 50, 0],
+        'jumlah_ditimbang_d': [80, 100, 40, 0],
+        'jumlah_kurang_gizi': [8, 5, 4, 0],
+        'jumlah_stunting': [20, 10, 2, 0],
+        'jumlah_wasting': [4, 0, 1, 0],
+    }).astype({kolom: 'uint16' for kolom in KOLOM_JUMLAH})
+
+def test_build_cube_persentase_dari_jumlah():
+    kubus = build_cube(fakta_contoh())
+
+    assert set(kubus) == {'desa', 'puskesmas', 'kecamatan', 'kabupaten'}
+    kecamatan = kubus['kecamatan'].set_index('wilayah')
+    # Dihitung ulang dari jumlah (32/220), bukan rata-rata persentase desa
+    assert np.isclose(kecamatan.loc['KEC X', 'persen_stunting'], 32 / 220 * 100)
+    # Penyebut 0 menghasilkan 0, bukan NaN/inf
+    assert kecamatan.loc['KEC Y', 'persen_stunting'] == 0
+    kabupaten = kubus['kabupaten'].iloc[0]
+    assert kabupaten['wilayah'] == NAMA_KABUPATEN and kabupaten['jumlah_stunting'] == 32
+    # Jumlah int64 agar selisih antar periode tidak melingkar
+    assert (kubus['desa'][KOLOM_JUMLAH].dtypes == 'int64').all()
+    assert kubus['desa']['wilayah'].tolist()[0] == 'DESA 1 (PKM A)'
+
+def test_build_cube_per_periode():
+    fakta = pd.concat([fakta_contoh().assign(id_waktu=202501), fakta_contoh().assign(id_waktu=202502)])
+    kubus = build_cube(fakta)
+
+    assert kubus['kabupaten']['id_waktu'].tolist() == [202501, 202502]
+    assert kubus['puskesmas'].groupby('id_waktu').size().tolist() == [2, 2]
+
+def test_peringkat_tanpa_nol_dan_stabil():
+    desa = build_cube(fakta_contoh())['desa']
+    hasil = peringkat(desa, n=2)
+
+    assert hasil['wilayah'].tolist() == ['DESA 1 (PKM A)', 'DESA 2 (PKM A)']
+    assert (peringkat(desa)['persen_stunting'] > 0).all()
+
+def test_tambah_perubahan_mom_yoy():
+    fakta = pd.concat([
+        fakta_contoh().assign(id_waktu=periode, jumlah_stunting=np.uint16(stunting))
+        for periode, stunting in ((202312, 10), (202401, 20), (202412, 30))
+    ])
+    kabupaten = tambah_perubahan(build_cube(fakta)['kabupaten']).set_index('id_waktu')
+    persen = kabupaten['persen_stunting']
+
+    # Desember -> Januari tahun berikutnya tetap berurutan
+    assert np.isclose(kabupaten.loc[202401, 'mom_persen_stunting'], persen[202401] - persen[202312])
+    assert np.isclose(kabupaten.loc[202412, 'yoy_persen_stunting'], persen[202412] - persen[202312])
+    # Bulan pembanding tidak tersimpan
+    assert np.isnan(kabupaten.loc[202412, 'mom_persen_stunting'])
+    assert np.isnan(kabupaten.loc[202312, 'yoy_persen_stunting'])
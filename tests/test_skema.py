@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl import proses_etl
+from skema import JUMLAH, SKEMA_FACT, apply_schema, ringkasan_koreksi
+
+def test_apply_schema_tipe_ringkas():
+    df = pd.DataFrame({
+        'id': [1.0, 2.0, 3.0],
+        'nama': ['A', 'B', 'A'],
+        'kecil': [0.0, 12.0, 65535.0],
+        'besar': [0.0, 1.0, 70000.0],
+        'lain': ['x', 'y', 'z'],
+    })
+    hasil = apply_schema(df, {'id': 'int32', 'nama': 'category', 'kecil': JUMLAH, 'besar': JUMLAH})
+
+    assert hasil['id'].dtype == 'int32'
+    assert isinstance(hasil['nama'].dtype, pd.CategoricalDtype)
+    assert hasil['kecil'].dtype == np.uint16
+    assert hasil['besar'].dtype == np.uint32 and hasil['besar'].iloc[2] == 70000
+    # Kolom di luar skema tidak diubah, DataFrame asal tidak diubah
+    assert hasil['lain'].dtype == df['lain'].dtype and df['kecil'].dtype == float
+
+def test_apply_schema_kolom_hilang():
+    with pytest.raises(ValueError, match='id_wilayah'):
+        apply_schema(pd.DataFrame({'desa': ['A']}), SKEMA_FACT, 'fact_kesehatan')
+
+def test_apply_schema_hitungan_tidak_valid_diisi_nol():
+    df = pd.DataFrame({'jumlah': [1.0, np.nan, -2.0, 2.5, 4.0], 'sasaran': ['3', '', 'x', '5', '6']})
+    hasil = apply_schema(df, {'jumlah': JUMLAH, 'sasaran': JUMLAH}, 'fact')
+
+    assert hasil['jumlah'].tolist() == [1, 0, 0, 0, 4] and hasil['jumlah'].dtype == np.uint16
+    assert hasil['sasaran'].tolist() == [3, 0, 0, 5, 6]
+    assert hasil.attrs['koreksi_jumlah'] == {
+        'jumlah': {'kosong': 1, 'ditolak': 2}, 'sasaran': {'kosong': 2, 'ditolak': 0}
+    }
+    assert ringkasan_koreksi(hasil) == (
+        "3 sel hitungan kosong diisi 0; 2 sel hitungan tidak valid (negatif/pecahan) diisi 0: jumlah (2)"
+    )
+    assert np.isnan(df['jumlah'].iloc[1])
+
+def test_proses_etl_desa_tanpa_sasaran_tidak_gagal(export_mini):
+    path_gizi, path_sasaran = export_mini('08')
+    with open(path_sasaran, encoding='utf-8') as f:
+        baris = [b for b in f if 'PADARAMA' not in b]
+    with open(path_sasaran, 'w', encoding='utf-8') as f:
+        f.writelines(baris)
+
+    df_fact, _, _, ok, pesan = proses_etl(path_gizi, path_sasaran)
+
+    assert ok, pesan
+    assert "2 sel hitungan kosong diisi 0" in pesan
+    padarama = df_fact[df_fact['desa'] == 'PADARAMA'].iloc[0]
+    assert (padarama['sasaran_laki'], padarama['sasaran_perempuan']) == (0, 0)
@@ -0,0 +1,45 @@
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from spasial import TANPA_FITUR, SpatialIndex
+
+def grid_desa():
+    """Empat desa 1x1 derajat; id_geo tidak urut agar aturan id_geo terkecil teruji"""
+    kotak = [box(0, 0, 1, 1), box(1, 0, 2, 1), box(0, 1, 1, 2), box(1, 1, 2, 2)]
+    return gpd.GeoDataFrame({'id_geo': [7, 3, 5, 9]}, geometry=kotak, crs='EPSG:4326')
+
+def test_desa_di_titik():
+    indeks = SpatialIndex(grid_desa())
+
+    assert len(indeks) == 4
+    assert indeks.desa_di_titik(0.5, 0.5) == 7
+    assert indeks.desa_di_titik(1.5, 1.5) == 9
+    # Titik di batas dua desa: id_geo terkecil
+    assert indeks.desa_di_titik(1.0, 0.5) == 3
+    assert indeks.desa_di_titik(1.0, 1.0) == 3
+    assert indeks.desa_di_titik(5.0, 5.0) is None
+
+def test_desa_massal_sama_dengan_per_titik():
+    indeks = SpatialIndex(grid_desa())
+    rng = np.random.default_rng(0)
+    lon = np.r_[rng.uniform(-0.5, 2.5, 500), 1.0, 0.5, np.nan]
+    lat = np.r_[rng.uniform(-0.5, 2.5, 500), 1.0, np.nan, 0.5]
+
+    hasil = indeks.desa_massal(lon, lat)
+
+    assert hasil.dtype == np.int32
+    harapan = [
+        TANPA_FITUR if not (np.isfinite(x) and np.isfinite(y)) or indeks.desa_di_titik(x, y) is None
+        else indeks.desa_di_titik(x, y)
+        for x, y in zip(lon, lat)
+    ]
+    assert hasil.tolist() == harapan
+    assert hasil[500] == 3 and hasil[-2:].tolist() == [TANPA_FITUR, TANPA_FITUR]
+
+def test_desa_massal_jarak_maks():
+    indeks = SpatialIndex(grid_desa())
+    lon, lat = np.array([2.05, 3.0]), np.array([0.5, 0.5])
+
+    assert indeks.desa_massal(lon, lat).tolist() == [TANPA_FITUR, TANPA_FITUR]
+    assert indeks.desa_massal(lon, lat, jarak_maks=0.1).tolist() == [3, TANPA_FITUR]
@@ -0,0 +1,53 @@
+import io
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+from spasial import SpatialIndex
+from titik import KOLOM_TITIK, fakta_titik, hitung_titik_csv, kolom_jumlah
+
+@pytest.fixture
+def gdf():
+    return gpd.GeoDataFrame(
+        {'id_geo': [0, 1, 2], 'NAMOBJ': ['Desa A', 'Desa B', 'Desa C'], 'WADMKC': ['Kec X', 'Kec X', 'Kec Y']},
+        geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(2, 0, 3, 1)], crs='EPSG:4326',
+    )
+
+def csv(teks):
+    return io.StringIO(teks.strip() + '\n')
+
+def test_kolom_jumlah():
+    assert kolom_jumlah('Posyandu') == 'jumlah_titik_posyandu'
+    assert kolom_jumlah(' Kunjungan Rumah ') == 'jumlah_titik_kunjungan_rumah'
+    assert kolom_jumlah('') == 'jumlah_titik_lainnya'
+
+def test_hitung_titik_csv_per_chunk(gdf):
+    baris = ['Latitude,Longitude,jenis']
+    baris += ['0.5,0.5,Posyandu'] * 3 + ['0.5,1.5,kunjungan'] * 4 + ['0.5,0.5,POSYANDU']
+    baris += ['0.5,9.0,posyandu', 'x,1.5,posyandu', '0.5,2.5,']
+    tabel, ringkasan = hitung_titik_csv(csv('\n'.join(baris)), SpatialIndex(gdf), chunksize=3)
+
+    assert ringkasan == {'total': 11, 'di_desa': 9, 'di_luar': 1, 'tidak_valid': 1, 'chunk': 4}
+    assert tabel['id_geo'].tolist() == [0, 1, 2]
+    assert tabel['jumlah_titik_posyandu'].tolist() == [4, 0, 0]
+    assert tabel['jumlah_titik_kunjungan'].tolist() == [0, 4, 0]
+    assert tabel['jumlah_titik_lainnya'].tolist() == [0, 0, 1]
+
+def test_hitung_titik_csv_tanpa_jenis_dan_kolom_wajib(gdf):
+    tabel, _ = hitung_titik_csv(csv('lat,lon\n0.5,2.5\n0.5,2.6'), SpatialIndex(gdf))
+    assert tabel.to_dict('list') == {'id_geo': [2], KOLOM_TITIK: [2]}
+
+    with pytest.raises(ValueError, match='lat'):
+        hitung_titik_csv(csv('x,lon\n1,2'), SpatialIndex(gdf))
+
+def test_fakta_titik_tanpa_dimensi_wilayah(gdf):
+    tabel, _ = hitung_titik_csv(csv('lat,lon\n0.5,0.5\n0.5,2.5'), SpatialIndex(gdf))
+    fakta = fakta_titik(tabel, gdf, id_waktu=202501)
+
+    assert fakta['desa'].astype(str).tolist() == ['Desa A', 'Desa C']
+    assert fakta['kecamatan'].tolist() == ['Kec X', 'Kec Y']
+    assert (fakta['id_waktu'] == 202501).all() and (fakta['id_wilayah'] == -1).all()
+    assert fakta[KOLOM_TITIK].dtype == np.uint16
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from etl import etl_cache_key, proses_etl
+from warehouse import PeriodeTerisi, Warehouse
+
+def hasil_etl(paths):
+    """(df_fact, df_wilayah, df_waktu) dan hash sumber seperti upload dashboard"""
+    df_fact, df_wilayah, df_waktu, ok, pesan = proses_etl(*paths)
+    assert ok, pesan
+    isi = [open(p, 'rb').read() for p in paths]
+    return (df_fact, df_wilayah, df_waktu), etl_cache_key(*isi)
+
+@pytest.fixture
+def gudang(tmp_path):
+    return Warehouse(str(tmp_path / 'gudang'))
+
+@pytest.fixture
+def sumber_a(export_mini):
+    return hasil_etl(export_mini('a'))
+
+@pytest.fixture
+def sumber_b(export_mini):
+    return hasil_etl(export_mini('b', geser=7))
+
+def test_upsert_menyimpan_periode(gudang, sumber_a):
+    data, sumber = sumber_a
+    fact, wilayah, waktu = gudang.upsert(*data, 2025, 8, sumber=sumber)
+
+    assert gudang.periods() == [202508]
+    assert (fact['id_waktu'] == 202508).all()
+    assert gudang.load_period(202508)[0]['jumlah_stunting'].tolist() == data[0]['jumlah_stunting'].tolist()
+    assert wilayah['id_wilayah'].tolist() == [1, 2, 3]
+    assert (wilayah['id_geo'] >= 0).all()
+    kabupaten = gudang.load_rollup('kabupaten')
+    assert kabupaten['id_waktu'].tolist() == [202508]
+    assert kabupaten['jumlah_stunting'].iloc[0] == data[0]['jumlah_stunting'].sum()
+
+def test_upsert_sumber_sama_idempoten(gudang, sumber_a):
+    data, sumber = sumber_a
+    gudang.upsert(*data, 2025, 8, sumber=sumber)
+    path_fact = gudang._path_fact(202508)
+    mtime = os.path.getmtime(path_fact)
+    disimpan = gudang.dim_waktu()['disimpan'].iloc[0]
+
+    gudang.upsert(*data, 2025, 8, sumber=sumber)
+
+    assert gudang.periods() == [202508]
+    assert os.path.getmtime(path_fact) == mtime
+    assert gudang.dim_waktu()['disimpan'].iloc[0] == disimpan
+    assert len(gudang.dim_wilayah()) == len(data[1])
+
+def test_upsert_memindahkan_bulan_yang_salah_pilih(gudang, sumber_a):
+    data, sumber = sumber_a
+    gudang.upsert(*data, 2025, 7, sumber=sumber)
+    gudang.upsert(*data, 2025, 8, sumber=sumber)
+
+    assert gudang.periods() == [202508]
+    assert not os.path.exists(gudang._path_fact(202507))
+    assert gudang.load_rollup('kabupaten')['id_waktu'].tolist() == [202508]
+
+def test_upsert_tidak_menimpa_sumber_lain(gudang, sumber_a, sumber_b):
+    data_a, hash_a = sumber_a
+    data_b, hash_b = sumber_b
+    gudang.upsert(*data_a, 2025, 8, sumber=hash_a)
+
+    with pytest.raises(PeriodeTerisi) as err:
+        gudang.upsert(*data_b, 2025, 8, sumber=hash_b)
+    assert err.value.id_waktu == 202508
+    with pytest.raises(PeriodeTerisi):
+        gudang.upsert(*data_b, 2025, 8)
+
+    waktu = gudang.dim_waktu().iloc[0]
+    assert waktu['sumber'] == hash_a
+    assert gudang.load_period(202508)[0]['jumlah_stunting'].tolist() == data_a[0]['jumlah_stunting'].tolist()
+
+def test_upsert_timpa_menyimpan_sumber_awal(gudang, sumber_a, sumber_b):
+    data_a, hash_a = sumber_a
+    data_b, hash_b = sumber_b
+    gudang.upsert(*data_a, 2025, 8, sumber=hash_a)
+    gudang.upsert(*data_b, 2025, 8, sumber=hash_b, timpa=True)
+
+    waktu = gudang.dim_waktu().iloc[0]
+    assert (waktu['sumber'], waktu['sumber_awal']) == (hash_b, hash_a)
+    assert gudang.load_period(202508)[0]['jumlah_stunting'].tolist() == data_b[0]['jumlah_stunting'].tolist()
+
+def test_pindah_sumber_tidak_menghapus_periode_yang_ditimpa(gudang, sumber_a, sumber_b):
+    data_a, hash_a = sumber_a
+    data_b, hash_b = sumber_b
+    gudang.upsert(*data_a, 2025, 7, sumber=hash_a)
+    gudang.upsert(*data_b, 2025, 7, sumber=hash_b, timpa=True)
+    # File B disimpan lagi ke bulan lain: periode Juli dibuat sumber A, jadi tetap ada
+    gudang.upsert(*data_b, 2025, 8, sumber=hash_b)
+
+    assert gudang.periods() == [202507, 202508]
+    assert os.path.exists(gudang._path_fact(202507))
+    assert sorted(gudang.load_rollup('kabupaten')['id_waktu']) == [202507, 202508]
+
+def test_ejaan_desa_berbeda_tetap_satu_id_wilayah(gudang, sumber_a, sumber_b):
+    data_a, hash_a = sumber_a
+    (fact_b, wilayah_b, waktu_b), hash_b = sumber_b
+    ejaan = {'puskesmas': {'CIAWI GERBANG': 'Ciawi Gerbang '}, 'desa': {'SUKADANA': 'DESA SUKA-DANA'}}
+    fact_b = fact_b.astype({'puskesmas': str, 'desa': str}).replace(ejaan)
+    wilayah_b = wilayah_b.astype({'puskesmas': str, 'desa': str}).replace(ejaan)
+    gudang.upsert(*data_a, 2025, 7, sumber=hash_a)
+    gudang.upsert(fact_b, wilayah_b, waktu_b, 2025, 8, sumber=hash_b)
+
+    assert gudang.dim_wilayah()['id_wilayah'].tolist() == [1, 2, 3]
+    assert sorted(gudang.load_period(202508)[0]['id_wilayah']) == [1, 2, 3]
@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+import pytest
+
+from geodata import SHP_FILE_PATH
+from wilayah import TANPA_FITUR, RegionIndex, cakupan, load_alias, simpan_alias
+
+@pytest.fixture
+def indeks(tmp_path):
+    return RegionIndex(SHP_FILE_PATH, path=str(tmp_path / 'wilayah.parquet'), alias_path=str(tmp_path / 'alias.csv'))
+
+def wilayah(*pasangan):
+    return pd.DataFrame(pasangan, columns=['puskesmas', 'desa'])
+
+def test_resolve_nama_dan_kecamatan_puskesmas(indeks):
+    hasil = indeks.resolve(wilayah(
+        ('CIAWI GERBANG', 'SUKADANA'),
+        ('CIBEUREUM', 'SUKADANA'),
+        ('CIAWI GERBANG', ' padarama '),
+        ('CIAWI GERBANG', 'TIDAK ADA DI PETA'),
+    ))
+
+    # Sukadana ada di dua kecamatan: dipilih kecamatan yang namanya ada di nama puskesmas
+    assert hasil['id_geo'].tolist()[:3] == [100, 343, 107]
+    assert hasil['kecamatan'].tolist()[:2] == ['Ciawi Gerbang', 'Cibeureum']
+    assert hasil['metode'].tolist()[:3] == ['kecamatan', 'kecamatan', 'nama']
+    assert hasil['id_geo'].iloc[3] == TANPA_FITUR
+    assert cakupan(hasil)['cocok'] == 3
+
+def test_indeks_disimpan_dan_dipakai_ulang(indeks):
+    indeks.resolve(wilayah(('CIAWI GERBANG', 'SUKADANA')))
+    assert os.path.exists(indeks.path)
+
+    baru = RegionIndex(SHP_FILE_PATH, path=indeks.path, alias_path=indeks.alias_path)
+    assert baru.table()['id_geo'].tolist() == [100]
+
+def test_resolve_ejaan_berbeda(indeks):
+    hasil = indeks.resolve(wilayah(
+        ('CIAWI GERBANG', 'CIKUBANG MULYA'),
+        ('CIAWI GERBANG', 'DESA CIKUBANGMULIA'),
+        ('CIAWI GERBANG', 'CIHIRUP'),
+    ))
+
+    assert hasil['id_geo'].tolist() == [132, 132, 101]
+    assert hasil['metode'].tolist() == ['nama', 'mirip', 'nama']
+    assert 0.7 <= hasil['skor'].iloc[1] < 1
+
+def test_alias_menang_atas_resolusi_otomatis(indeks):
+    pasangan = wilayah(('CIAWI GERBANG', 'SUKADANA LAMA'))
+    assert indeks.resolve(pasangan)['id_geo'].iloc[0] == TANPA_FITUR
+
+    simpan_alias('Ciawi Gerbang', 'Sukadana Lama', 'Sukadana', 'Ciawi Gerbang', path=indeks.alias_path)
+    simpan_alias('CIAWI GERBANG', 'SUKADANA LAMA', 'Sukadana', 'Cibeureum', path=indeks.alias_path)
+    hasil = indeks.resolve(pasangan)
+
+    # Alias dengan puskesmas/desa sama diganti, bukan ditambah
+    assert len(load_alias(indeks.alias_path)) == 1
+    assert (hasil['id_geo'].iloc[0], hasil['metode'].iloc[0]) == (343, 'alias')
+
+def test_indeks_lebih_lama_dari_shapefile_dibangun_ulang(indeks):
+    indeks.resolve(wilayah(('CIAWI GERBANG', 'SUKADANA')))
+    mtime_shp = os.path.getmtime(SHP_FILE_PATH)
+    os.utime(indeks.path, (mtime_shp - 60, mtime_shp - 60))
+
+    baru = RegionIndex(SHP_FILE_PATH, path=indeks.path, alias_path=indeks.alias_path)
+    assert baru.table().empty
@@ -0,0 +1,285 @@
+"""
+Agregasi titik GPS lapangan (posyandu, kunjungan rumah balita stunting) ke desa
+
+Tim lapangan mengirim CSV berisi ratusan ribu koordinat. File dibaca per chunk
+(pd.read_csv chunksize, hanya kolom koordinat dan jenis), setiap chunk dipetakan
+ke desa ADMINISTRASIDESA_AR_25K dengan satu query STRtree tervektorisasi
+(spasial.SpatialIndex.desa_massal), lalu dijumlahkan ke array hitungan per
+fitur desa. Memori yang dipakai hanya sebesar satu chunk ditambah array hitungan,
+berapa pun ukuran file.
+
+Hasilnya berbentuk fakta per desa seperti keluaran proses_etl (id_wilayah,
+id_waktu, puskesmas, desa, lalu kolom hitungan) sehingga bisa di-merge langsung
+ke fakta gizi. Fitur desa dihubungkan ke pasangan puskesmas/desa e-PPGBM lewat
+resolve_wilayah; jika satu desa dipakai beberapa pasangan, hitungannya masuk ke
+id_wilayah terkecil agar tidak terhitung ganda. Desa yang tidak ada di dimensi
+wilayah tetap dicantumkan dengan id_wilayah TANPA_FITUR dan puskesmas 'N/A'.
+
+Format CSV:
+- koordinat: kolom lat/latitude/lintang dan lon/lng/longitude/bujur (derajat, WGS84)
+- opsional kolom jenis (misalnya posyandu, kunjungan): satu kolom hitungan
+  jumlah_titik_<jenis> per nilai; tanpa kolom jenis hanya ada jumlah_titik
+
+Pemakaian:
+    python titik.py agregasi TITIK.csv --gizi FILE_GIZI --sasaran FILE_SASARAN
+    python titik.py agregasi TITIK.csv --gudang data/warehouse --periode 202409
+    python titik.py benchmark --titik 500000   # throughput dan memori per chunk
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from geodata import SHP_FILE_PATH, load_geodata
+from skema import JUMLAH, apply_schema
+from spasial import TANPA_FITUR, SpatialIndex
+
+# Baris CSV per chunk: ±100 ribu titik ≈ beberapa MB per chunk
+UKURAN_CHUNK = 100_000
+
+KOLOM_LAT = ('lat', 'latitude', 'lintang')
+KOLOM_LON = ('lon', 'lng', 'long', 'longitude', 'bujur')
+KOLOM_JENIS = 'jenis'
+
+# Nama kolom hitungan jika CSV tidak punya kolom jenis
+KOLOM_TITIK = 'jumlah_titik'
+
+def _cari_kolom(header, calon, wajib=True):
+    """Nama kolom header (tanpa beda huruf besar/kecil) yang cocok dengan salah satu calon"""
+    for kolom in header:
+        if kolom.strip().lower() in calon:
+            return kolom
+    if wajib:
+        raise ValueError(f"Kolom {'/'.join(calon)} tidak ada di CSV (kolom: {', '.join(header)})")
+    return None
+
+def kolom_jumlah(jenis):
+    """Nama kolom hitungan untuk satu jenis titik, misalnya 'Posyandu' -> jumlah_titik_posyandu"""
+    slug = re.sub(r'[^0-9a-z]+', '_', str(jenis).strip().lower()).strip('_')
+    return f"{KOLOM_TITIK}_{slug or 'lainnya'}"
+
+def hitung_titik_csv(path, indeks, chunksize=UKURAN_CHUNK, jarak_maks=None):
+    """
+    Hitung titik per fitur desa dari CSV, dibaca per chunk
+
+    Parameters:
+    - path: Path atau buffer CSV
+    - indeks: SpatialIndex desa
+    - chunksize: Jumlah baris per chunk
+    - jarak_maks: Lihat SpatialIndex.desa_massal (titik di luar poligon)
+
+    Returns:
+    - Tuple (DataFrame id_geo + satu kolom hitungan per jenis, hanya desa dengan
+      titik; dict ringkasan: total, di_desa, di_luar, tidak_valid, chunk)
+    """
+    header = pd.read_csv(path, nrows=0).columns.tolist()
+    if hasattr(path, 'seek'):
+        path.seek(0)
+    kolom_lat = _cari_kolom(header, KOLOM_LAT)
+    kolom_lon = _cari_kolom(header, KOLOM_LON)
+    kolom_jenis = _cari_kolom(header, (KOLOM_JENIS,), wajib=False)
+    usecols = [kolom_lat, kolom_lon] + ([kolom_jenis] if kolom_jenis else [])
+
+    # Posisi 0 untuk titik di luar desa, id_geo + 1 untuk desa
+    panjang = int(indeks.id_geo.max()) + 2
+    hitungan = {}
+    ringkasan = {'total': 0, 'di_desa': 0, 'di_luar': 0, 'tidak_valid': 0, 'chunk': 0}
+
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+        lon = pd.to_numeric(chunk[kolom_lon], errors='coerce').to_numpy(dtype=float)
+        lat = pd.to_numeric(chunk[kolom_lat], errors='coerce').to_numpy(dtype=float)
+        valid = np.isfinite(lon) & np.isfinite(lat)
+        posisi = indeks.desa_massal(lon, lat, jarak_maks=jarak_maks) + 1
+
+        if kolom_jenis:
+            kode, nilai = pd.factorize(chunk[kolom_jenis].fillna('lainnya').astype(str))
+            # Beberapa nilai jenis bisa bernama kolom sama (beda huruf besar/kecil)
+            kode, nama_kolom = pd.factorize(pd.Index(nilai).map(kolom_jumlah)[kode])
+        else:
+            kode, nama_kolom = np.zeros(len(chunk), dtype=np.intp), [KOLOM_TITIK]
+        for i, kolom in enumerate(nama_kolom):
+            dipilih = posisi[valid & (kode == i)]
+            if kolom not in hitungan:
+                hitungan[kolom] = np.zeros(panjang, dtype=np.int64)
+            hitungan[kolom] += np.bincount(dipilih, minlength=panjang)
+
+        ringkasan['total'] += len(chunk)
+        ringkasan['tidak_valid'] += int((~valid).sum())
+        ringkasan['di_luar'] += int((valid & (posisi == 0)).sum())
+        ringkasan['chunk'] += 1
+    ringkasan['di_desa'] = ringkasan['total'] - ringkasan['tidak_valid'] - ringkasan['di_luar']
+
+    if not hitungan:
+        hitungan[KOLOM_TITIK] = np.zeros(panjang, dtype=np.int64)
+    tabel = pd.DataFrame({'id_geo': np.arange(-1, panjang - 1, dtype=np.int32), **dict(sorted(hitungan.items()))})
+    kolom = [k for k in tabel.columns if k != 'id_geo']
+    tabel = tabel[(tabel['id_geo'] != TANPA_FITUR) & (tabel[kolom].sum(axis=1) > 0)]
+    return tabel.reset_index(drop=True), ringkasan
+
+def fakta_titik(jumlah_titik, gdf, df_wilayah=None, id_waktu=1, shp_path=None):
+    """
+    Fakta per desa dari hitungan titik, dengan kunci seperti fakta proses_etl
+
+    Parameters:
+    - jumlah_titik: DataFrame hasil hitung_titik_csv
+    - gdf: GeoDataFrame desa (NAMOBJ, WADMKC) untuk nama desa tanpa pasangan e-PPGBM
+    - df_wilayah: Dimensi wilayah (id_wilayah, puskesmas, desa) dari proses_etl
+      atau gudang data; None = semua desa tanpa id_wilayah
+    - id_waktu: id_waktu fakta (1 seperti proses_etl, atau YYYYMM untuk gudang)
+
+    Returns:
+    - DataFrame id_wilayah, id_waktu, puskesmas, desa, id_geo, kecamatan, kolom hitungan
+    """
+    kolom = [k for k in jumlah_titik.columns if k != 'id_geo']
+    fitur = gdf.set_index('id_geo')
+    fakta = jumlah_titik.assign(
+        id_wilayah=np.int32(TANPA_FITUR),
+        puskesmas='N/A',
+        desa=fitur['NAMOBJ'].reindex(jumlah_titik['id_geo']).fillna('N/A').to_numpy(dtype=object),
+        kecamatan=fitur['WADMKC'].reindex(jumlah_titik['id_geo']).fillna('N/A').to_numpy(dtype=object),
+    )
+
+    if df_wilayah is not None and len(df_wilayah):
+        from wilayah import resolve_wilayah
+
+        pasangan = resolve_wilayah(df_wilayah[['id_wilayah', 'puskesmas', 'desa']], shp_path)
+        pasangan = (
+            pasangan[pasangan['id_geo'] != TANPA_FITUR]
+            .sort_values('id_wilayah', kind='stable')
+            .drop_duplicates('id_geo')
+            .set_index('id_geo')
+        )
+        cocok = fakta['id_geo'].isin(pasangan.index).to_numpy()
+        id_cocok = fakta.loc[cocok, 'id_geo']
+        fakta.loc[cocok, 'id_wilayah'] = pasangan['id_wilayah'].reindex(id_cocok).to_numpy(dtype=np.int32)
+        fakta.loc[cocok, 'puskesmas'] = pasangan['puskesmas'].reindex(id_cocok).astype(str).to_numpy(dtype=object)
+        fakta.loc[cocok, 'desa'] = pasangan['desa'].reindex(id_cocok).astype(str).to_numpy(dtype=object)
+
+    fakta['id_waktu'] = np.int32(id_waktu)
+    fakta = fakta[['id_wilayah', 'id_waktu', 'puskesmas', 'desa', 'id_geo', 'kecamatan'] + kolom]
+    fakta = fakta.sort_values(['id_wilayah', 'id_geo'], ignore_index=True)
+    skema = {
+        'id_wilayah': 'int32', 'id_waktu': 'int32', 'puskesmas': 'category', 'desa': 'category',
+        **{k: JUMLAH for k in kolom},
+    }
+    return apply_schema(fakta, skema, 'fact_titik')
+
+def proses_titik(path, df_wilayah=None, id_waktu=1, shp_path=SHP_FILE_PATH, chunksize=UKURAN_CHUNK,
+                 jarak_maks=None):
+    """
+    CSV titik -> fakta per desa (hitung_titik_csv lalu fakta_titik)
+
+    Returns:
+    - Tuple (df_fact_titik, ringkasan)
+    """
+    gdf = load_geodata(shp_path)
+    jumlah_titik, ringkasan = hitung_titik_csv(path, SpatialIndex(gdf), chunksize, jarak_maks)
+    return fakta_titik(jumlah_titik, gdf, df_wilayah, id_waktu, shp_path), ringkasan
+
+# ========================================
+# BENCHMARK
+# ========================================
+
+def tulis_csv_sintetis(path, jumlah, gdf, seed=0):
+    """CSV titik acak (posyandu dan kunjungan) di kotak batas Kabupaten Kuningan"""
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = gdf[gdf['WADMKK'] == 'Kabupaten Kuningan'].total_bounds
+    blok = 250_000
+    for mulai in range(0, jumlah, blok):
+        n = min(blok, jumlah - mulai)
+        pd.DataFrame({
+            'id': np.arange(mulai, mulai + n),
+            'jenis': rng.choice(['posyandu', 'kunjungan'], n, p=[0.1, 0.9]),
+            'lat': rng.uniform(miny, maxy, n).round(6),
+            'lon': rng.uniform(minx, maxx, n).round(6),
+        }).to_csv(path, mode='w' if mulai == 0 else 'a', header=mulai == 0, index=False)
+
+def benchmark(shp_path=SHP_FILE_PATH, jumlah=500_000, ukuran_chunk=(None, 200_000, 50_000)):
+    """Waktu dan puncak memori Python (tracemalloc) per ukuran chunk"""
+    gdf = load_geodata(shp_path)
+    indeks = SpatialIndex(gdf)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'titik.csv')
+        tulis_csv_sintetis(path, jumlah, gdf)
+        print(f"{jumlah:,} titik sintetis, CSV {os.path.getsize(path) / 1024 ** 2:,.1f} MB")
+
+        hasil_awal = None
+        for chunk in ukuran_chunk:
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            tabel, ringkasan = hitung_titik_csv(path, indeks, chunk or jumlah)
+            detik = time.perf_counter() - t0
+            puncak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if hasil_awal is None:
+                hasil_awal = tabel
+            assert tabel.equals(hasil_awal)
+            label = "tanpa chunk" if chunk is None else f"chunk {chunk:,}"
+            print(f"{label:<15}: {detik:6.2f} s  ({jumlah / detik:,.0f} titik/s)  "
+                  f"puncak memori {puncak / 1024 ** 2:7.1f} MB  ({ringkasan['di_desa']:,} titik di desa)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agregasi titik GPS lapangan ke desa")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    agregasi = sub.add_parser("agregasi", help="CSV titik -> fakta per desa")
+    agregasi.add_argument("csv", help="CSV dengan kolom lat/lon (dan opsional jenis)")
+    agregasi.add_argument("--gizi", help="File export gizi untuk dimensi wilayah (bersama --sasaran)")
+    agregasi.add_argument("--sasaran", help="File export sasaran untuk dimensi wilayah")
+    agregasi.add_argument("--gudang", help="Folder gudang data untuk dimensi wilayah")
+    agregasi.add_argument("--periode", type=int, default=1, help="id_waktu fakta, misalnya 202409")
+    agregasi.add_argument("--chunk", type=int, default=UKURAN_CHUNK, help="Baris CSV per chunk")
+    agregasi.add_argument("--jarak-maks", type=float, default=None,
+                          help="Titik di luar poligon masuk ke desa terdekat dalam jarak ini (derajat)")
+    agregasi.add_argument("--keluaran", help="Simpan fakta ke file .csv atau .parquet")
+    bench = sub.add_parser("benchmark", help="Throughput dan memori per ukuran chunk")
+    bench.add_argument("--titik", type=int, default=500_000, help="Jumlah titik sintetis")
+    parser.add_argument("--shp", default=SHP_FILE_PATH, help="Path shapefile desa")
+    args = parser.parse_args(argv)
+
+    if args.perintah == "benchmark":
+        benchmark(args.shp, args.titik)
+        return 0
+
+    df_wilayah = None
+    if args.gizi or args.sasaran:
+        if not (args.gizi and args.sasaran):
+            parser.error("--gizi dan --sasaran harus diisi bersama")
+        from etl import proses_etl
+
+        _, df_wilayah, _, success, message = proses_etl(args.gizi, args.sasaran)
+        if not success:
+            parser.error(message)
+    elif args.gudang:
+        from warehouse import Warehouse
+
+        df_wilayah = Warehouse(args.gudang).dim_wilayah()
+
+    t0 = time.perf_counter()
+    fakta, ringkasan = proses_titik(
+        args.csv, df_wilayah, args.periode, args.shp, args.chunk, args.jarak_maks
+    )
+    detik = time.perf_counter() - t0
+    print(f"{ringkasan['total']:,} titik dalam {ringkasan['chunk']} chunk, {detik:.2f} s: "
+          f"{ringkasan['di_desa']:,} di desa, {ringkasan['di_luar']:,} di luar desa, "
+          f"{ringkasan['tidak_valid']:,} koordinat tidak valid")
+    tanpa_pasangan = int((fakta['id_wilayah'] == TANPA_FITUR).sum())
+    print(f"{len(fakta):,} desa dengan titik ({tanpa_pasangan:,} tanpa pasangan puskesmas/desa e-PPGBM)")
+
+    if args.keluaran:
+        if args.keluaran.endswith('.parquet'):
+            fakta.to_parquet(args.keluaran, index=False)
+        else:
+            fakta.to_csv(args.keluaran, index=False)
+        print(f"Disimpan ke {args.keluaran}")
+    else:
+        print(fakta.head(20).to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
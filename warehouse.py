@@ -0,0 +1,541 @@
+"""
+Gudang data riwayat stunting (star schema per bulan)
+
+Hasil ETL setiap bulan disimpan sebagai Parquet lokal sehingga dashboard bisa
+membuka bulan mana pun, atau rentang beberapa bulan, tanpa upload ulang file
+sumber. Struktur folder:
+
+    data/warehouse/dim_waktu.parquet            satu baris per periode (id_waktu = YYYYMM)
+    data/warehouse/dim_wilayah.parquet          id_wilayah tetap untuk pasangan puskesmas/desa
+    data/warehouse/fact/periode=YYYYMM.parquet  fakta gizi balita satu periode
+    data/warehouse/rollup/level=<level>.parquet agregat semua periode per level wilayah
+
+Tabel rollup (kabupaten, puskesmas, kecamatan, desa) menyimpan jumlah, persentase
+dan perubahan bulan-ke-bulan (MoM) serta tahun-ke-tahun (YoY) untuk semua periode,
+sehingga grafik tren cukup membaca satu file kecil tanpa groupby atas fakta mentah.
+Rollup diperbarui per periode setiap kali upsert dengan kubus agregat dari
+modul rollup, sama dengan yang dipakai tampilan satu periode di dashboard.
+
+Penyimpanan bersifat upsert per periode: menyimpan ulang file sumber yang sama
+(hash isi) tidak menulis apa pun, dan file sumber yang sama hanya dimiliki satu
+periode, sehingga salah pilih bulan lalu dikoreksi tidak meninggalkan duplikat.
+Periode yang sudah berisi file sumber lain tidak ditimpa kecuali diminta
+(timpa=True), dan pemindahan hanya menghapus periode yang dibuat oleh file
+sumber itu sendiri. Setiap file ditulis atomik (file sementara lalu rename). Penulisan (upsert dan
+bangun ulang rollup) dikunci dengan lock file di folder gudang,
+sehingga dashboard dan `python etl.py batch` yang berjalan bersamaan tidak saling
+menimpa dim_wilayah/dim_waktu.
+
+Pemakaian:
+    python warehouse.py list        # daftar periode tersimpan
+    python warehouse.py rollup      # bangun ulang semua tabel rollup dari fakta
+    python warehouse.py benchmark   # waktu baca periode, rentang dan rollup
+"""
+
+import argparse
+import contextlib
+import datetime
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from bench import ukur
+from rollup import LEVELS, INDIKATOR, build_cube, tambah_perubahan
+from skema import SKEMA_FACT, SKEMA_WILAYAH, apply_schema
+
+WAREHOUSE_DIR = "data/warehouse"
+
+NAMA_BULAN = [
+    'JANUARI', 'FEBRUARI', 'MARET', 'APRIL', 'MEI', 'JUNI',
+    'JULI', 'AGUSTUS', 'SEPTEMBER', 'OKTOBER', 'NOVEMBER', 'DESEMBER'
+]
+
+KOLOM_DIM_WAKTU = [
+    'id_waktu', 'tahun_data', 'bulan_data', 'nama_bulan_data',
+    'tahun', 'bulan', 'tanggal', 'jam', 'menit', 'sumber', 'sumber_awal', 'disimpan'
+]
+
+KOLOM_DIM_WILAYAH = ['id_wilayah', 'puskesmas', 'desa', 'kecamatan', 'id_geo']
+
+KOLOM_KUNCI_WILAYAH = ['_kunci_puskesmas', '_kunci_desa']
+
+# Satu penulis per proses; antar proses lewat lock file (Warehouse._kunci).
+# Penulisan atomik hanya mencegah file setengah jadi, bukan update yang hilang:
+# id_wilayah baru dan dim_waktu adalah baca-ubah-tulis.
+_LOCK_TULIS = threading.Lock()
+
+# Batas percobaan msvcrt.locking (Windows) sebelum menyerah, masing-masing ~10 detik
+PERCOBAAN_KUNCI = 6
+
+def _kunci_wilayah(df):
+    """
+    Tambahkan kolom kunci pasangan puskesmas/desa
+
+    Kunci puskesmas adalah nama bersih (strip + huruf besar) dan kunci desa
+    adalah wilayah.kunci_nama, sama dengan pencocokan ke shapefile.
+    """
+    from geodata import normalize_name
+    from wilayah import kunci_nama
+    return df.assign(
+        _kunci_puskesmas=normalize_name(df['puskesmas'].astype(str)).to_numpy(),
+        _kunci_desa=kunci_nama(df['desa']).to_numpy(),
+    )
+
+class PeriodeTerisi(ValueError):
+    """Periode sudah berisi data dari file sumber lain (upsert tanpa timpa=True)"""
+
+    def __init__(self, id_waktu):
+        self.id_waktu = int(id_waktu)
+        super().__init__(
+            f"Periode {label_periode(id_waktu)} sudah berisi data dari file sumber lain; "
+            "pilih bulan yang benar atau simpan dengan timpa=True"
+        )
+
+def id_periode(tahun, bulan):
+    """Kunci periode YYYYMM dari tahun dan nomor bulan (1-12)"""
+    return int(tahun) * 100 + int(bulan)
+
+def label_periode(id_waktu):
+    """Label periode untuk tampilan, misalnya 'MARET 2025'"""
+    return f"{NAMA_BULAN[int(id_waktu) % 100 - 1]} {int(id_waktu) // 100}"
+
+def nomor_bulan(nama_bulan):
+    """Nomor bulan (1-12) dari nama bulan Indonesia, None jika tidak dikenal"""
+    nama = str(nama_bulan).strip().upper()
+    return NAMA_BULAN.index(nama) + 1 if nama in NAMA_BULAN else None
+
+def tebak_tahun_data(bulan_data, df_waktu):
+    """
+    Tahun periode data dari waktu penarikan file sumber
+
+    Data ditarik pada atau setelah bulan datanya, jadi bulan data yang lebih besar
+    dari bulan penarikan berarti tahun sebelumnya (misalnya data DESEMBER yang
+    ditarik JANUARI).
+
+    Parameters:
+    - bulan_data: Nomor bulan data (1-12)
+    - df_waktu: Dimensi waktu hasil proses_etl (waktu penarikan)
+    """
+    waktu = df_waktu.iloc[0]
+    bulan_tarik = nomor_bulan(waktu['bulan'])
+    if bulan_tarik is None:
+        hari_ini = datetime.date.today()
+        tahun_tarik, bulan_tarik = hari_ini.year, hari_ini.month
+    else:
+        tahun_tarik = int(waktu['tahun'])
+    return tahun_tarik - 1 if bulan_data > bulan_tarik else tahun_tarik
+
+def tanggal_penarikan(waktu):
+    """
+    Tanggal penarikan file sumber dari satu baris dim_waktu
+
+    Returns:
+    - datetime.date, atau tanggal penyimpanan jika bulan penarikan tidak dikenal
+    """
+    bulan_tarik = nomor_bulan(waktu['bulan'])
+    if bulan_tarik is None:
+        return pd.Timestamp(waktu['disimpan']).date()
+    return datetime.date(int(waktu['tahun']), bulan_tarik, int(waktu['tanggal']))
+
+class Warehouse:
+    """
+    Penyimpanan star schema multi-periode berbasis Parquet
+
+    Parameters:
+    - root: Folder gudang data
+    """
+
+    def __init__(self, root=WAREHOUSE_DIR, shp_path=None):
+        self.root = root
+        self.shp_path = shp_path
+
+    # ---- path ---------------------------------------------------------------
+
+    def _path_dim_waktu(self):
+        return os.path.join(self.root, "dim_waktu.parquet")
+
+    def _path_dim_wilayah(self):
+        return os.path.join(self.root, "dim_wilayah.parquet")
+
+    def _path_fact(self, id_waktu):
+        return os.path.join(self.root, "fact", f"periode={int(id_waktu)}.parquet")
+
+    def _path_rollup(self, level):
+        return os.path.join(self.root, "rollup", f"level={level}.parquet")
+
+    @contextlib.contextmanager
+    def _kunci(self):
+        """Kunci tulis eksklusif gudang: antar thread dan antar proses"""
+        os.makedirs(self.root, exist_ok=True)
+        with _LOCK_TULIS, open(os.path.join(self.root, ".lock"), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                # LK_LOCK sendiri mencoba 10 kali dengan jeda 1 detik
+                for _ in range(PERCOBAAN_KUNCI):
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+                else:
+                    raise TimeoutError(
+                        f"Gudang data {self.root} masih dikunci proses lain setelah "
+                        f"{PERCOBAAN_KUNCI * 10} detik; coba simpan lagi nanti"
+                    )
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @staticmethod
+    def _tulis(df, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _baca(path, kolom):
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=kolom)
+        return pd.read_parquet(path)
+
+    # ---- dimensi ------------------------------------------------------------
+
+    def dim_waktu(self):
+        """Semua periode tersimpan, urut dari yang terlama"""
+        dim = self._baca(self._path_dim_waktu(), KOLOM_DIM_WAKTU)
+        if 'sumber_awal' not in dim.columns:
+            # Gudang versi lama: anggap setiap periode dibuat oleh sumbernya sekarang
+            dim['sumber_awal'] = dim['sumber']
+        return dim[KOLOM_DIM_WAKTU].sort_values('id_waktu', ignore_index=True)
+
+    def dim_wilayah(self):
+        """Dimensi wilayah gabungan semua periode"""
+        return self._baca(self._path_dim_wilayah(), KOLOM_DIM_WILAYAH)
+
+    def periods(self):
+        """List id_waktu (YYYYMM) yang tersimpan, urut dari yang terlama"""
+        return [int(p) for p in self.dim_waktu()['id_waktu']]
+
+    def _gabung_wilayah(self, df_wilayah):
+        """
+        Tambahkan pasangan puskesmas/desa baru ke dim_wilayah
+
+        Pasangan dicocokkan lewat kuncinya (lihat _kunci_wilayah), sehingga ejaan
+        yang berbeda antar bulan ("CIKUBANG MULYA"/"Cikubangmulya") tetap satu
+        id_wilayah. id_wilayah yang sudah ada tidak berubah; pasangan baru mendapat
+        id berikutnya dan id_geo serta kecamatannya dicari lewat indeks wilayah (wilayah.py).
+        Pasangan lama ikut diperbarui jika aliasnya berubah.
+
+        Returns:
+        - Tuple (dim_wilayah lengkap, True jika dim_wilayah berubah)
+        """
+        dim = self.dim_wilayah()
+        baru = _kunci_wilayah(df_wilayah[['puskesmas', 'desa']]).drop_duplicates(KOLOM_KUNCI_WILAYAH)
+        baru = baru.merge(
+            _kunci_wilayah(dim)[KOLOM_KUNCI_WILAYAH].drop_duplicates(), on=KOLOM_KUNCI_WILAYAH,
+            how='left', indicator=True
+        )
+        baru = baru[baru['_merge'] == 'left_only'][['puskesmas', 'desa']].reset_index(drop=True)
+        if len(baru):
+            id_awal = int(dim['id_wilayah'].max()) + 1 if len(dim) else 1
+            baru.insert(0, 'id_wilayah', range(id_awal, id_awal + len(baru)))
+            dim = pd.concat([dim, baru], ignore_index=True) if len(dim) else baru.reset_index(drop=True)
+
+        # Resolusi ulang semua pasangan (cepat lewat indeks) agar alias baru ikut
+        # terpakai; hasil lama dipertahankan jika pasangan tidak lagi ditemukan
+        from wilayah import TANPA_FITUR, resolve_wilayah
+        lama = dim.reindex(columns=['kecamatan', 'id_geo'])
+        hasil = resolve_wilayah(dim[['id_wilayah', 'puskesmas', 'desa']], self.shp_path)
+        pakai_lama = (hasil['id_geo'].to_numpy() == TANPA_FITUR) & lama['id_geo'].notna().to_numpy()
+        dim['kecamatan'] = np.where(pakai_lama, lama['kecamatan'].astype(object), hasil['kecamatan'].astype(object))
+        dim['id_geo'] = np.where(pakai_lama, lama['id_geo'].fillna(TANPA_FITUR), hasil['id_geo']).astype('int32')
+        berubah = (
+            (lama['kecamatan'].astype(object).to_numpy() != dim['kecamatan'].to_numpy()).any()
+            or (lama['id_geo'].fillna(TANPA_FITUR - 1).to_numpy() != dim['id_geo'].to_numpy()).any()
+        )
+
+        dim = apply_schema(dim[KOLOM_DIM_WILAYAH], SKEMA_WILAYAH, 'dim_wilayah')
+        return dim, bool(len(baru)) or bool(berubah)
+
+    # ---- tulis --------------------------------------------------------------
+
+    def upsert(self, df_fact, df_wilayah, df_waktu, tahun, bulan, sumber=None, pindahkan_sumber=True,
+               perbarui_rollup=True, timpa=False):
+        """
+        Simpan hasil ETL satu bulan sebagai partisi periode (idempoten)
+
+        Parameters:
+        - df_fact, df_wilayah, df_waktu: Hasil proses_etl
+        - tahun, bulan: Periode data (bulan 1-12)
+        - sumber: Hash isi file sumber; jika sama dengan periode tersimpan, tidak
+          ada yang ditulis ulang
+        - pindahkan_sumber: Hapus periode lain yang dibuat oleh sumber yang sama
+          (koreksi bulan yang salah pilih di dashboard); False jika periode sudah pasti
+        - perbarui_rollup: False untuk impor massal yang memanggil rebuild_rollups
+          sekali di akhir
+        - timpa: Izinkan mengganti periode yang berisi data dari sumber lain
+
+        Returns:
+        - Tuple (df_fact, df_wilayah, df_waktu) dengan id_wilayah dan id_waktu gudang
+
+        Raises:
+        - PeriodeTerisi jika periode sudah berisi sumber lain dan timpa=False
+        - TimeoutError jika kunci gudang tidak didapat (Windows, lihat PERCOBAAN_KUNCI)
+        """
+        id_waktu = id_periode(tahun, bulan)
+
+        with self._kunci():
+            dim_waktu = self.dim_waktu()
+            sudah_ada = dim_waktu[dim_waktu['id_waktu'] == id_waktu]
+            if (
+                sumber is not None
+                and len(sudah_ada)
+                and sudah_ada['sumber'].iloc[0] == sumber
+                and os.path.exists(self._path_fact(id_waktu))
+            ):
+                return self.load_period(id_waktu)
+            if len(sudah_ada) and not timpa and (sumber is None or sudah_ada['sumber'].iloc[0] != sumber):
+                raise PeriodeTerisi(id_waktu)
+
+            dim_wilayah, berubah = self._gabung_wilayah(df_wilayah)
+            if berubah:
+                self._tulis(dim_wilayah, self._path_dim_wilayah())
+
+            id_wilayah = _kunci_wilayah(dim_wilayah).drop_duplicates(KOLOM_KUNCI_WILAYAH)
+            fact = _kunci_wilayah(df_fact.drop(columns=['id_wilayah'])).merge(
+                id_wilayah[KOLOM_KUNCI_WILAYAH + ['id_wilayah']], on=KOLOM_KUNCI_WILAYAH, how='left'
+            )
+            fact['id_waktu'] = id_waktu
+            fact = apply_schema(fact[list(df_fact.columns)], SKEMA_FACT, 'fact_kesehatan')
+            self._tulis(fact, self._path_fact(id_waktu))
+
+            waktu = df_waktu.iloc[[0]][['tahun', 'bulan', 'tanggal', 'jam', 'menit']].reset_index(drop=True)
+            waktu.insert(0, 'id_waktu', id_waktu)
+            waktu.insert(1, 'tahun_data', int(tahun))
+            waktu.insert(2, 'bulan_data', int(bulan))
+            waktu.insert(3, 'nama_bulan_data', NAMA_BULAN[int(bulan) - 1])
+            waktu['sumber'] = sumber
+            # Sumber pembuat periode; tetap sumber lama jika periode ditimpa
+            waktu['sumber_awal'] = sudah_ada['sumber_awal'].iloc[0] if len(sudah_ada) else sumber
+            waktu['disimpan'] = pd.Timestamp.now().floor('s')
+
+            # File sumber yang sama hanya boleh dimiliki satu periode; periode yang
+            # dibuat sumber lain (lalu ditimpa) tidak ikut dihapus
+            lama = dim_waktu['id_waktu'] == id_waktu
+            if sumber is not None and pindahkan_sumber:
+                pindah = (dim_waktu['sumber'] == sumber) & (dim_waktu['sumber_awal'] == sumber) & ~lama
+                for id_lama in dim_waktu.loc[pindah, 'id_waktu']:
+                    self._hapus_fact(id_lama)
+                lama |= pindah
+
+            if perbarui_rollup:
+                self._perbarui_rollup(fact, dim_wilayah, [int(p) for p in dim_waktu.loc[lama, 'id_waktu']] + [id_waktu])
+
+            bagian = [d for d in (dim_waktu[~lama], waktu[KOLOM_DIM_WAKTU]) if len(d)]
+            dim_waktu = pd.concat(bagian, ignore_index=True)
+            self._tulis(dim_waktu.sort_values('id_waktu', ignore_index=True), self._path_dim_waktu())
+
+        wilayah = dim_wilayah[dim_wilayah['id_wilayah'].isin(fact['id_wilayah'])].reset_index(drop=True)
+        return fact, wilayah, waktu[KOLOM_DIM_WAKTU]
+
+    def _hapus_fact(self, id_waktu):
+        path = self._path_fact(id_waktu)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # ---- rollup -------------------------------------------------------------
+
+    def _perbarui_rollup(self, fact, dim_wilayah, hapus):
+        """
+        Ganti baris rollup periode tertentu dengan agregat fakta baru
+
+        Parameters:
+        - fact: Fakta periode baru
+        - dim_wilayah: Dimensi wilayah untuk kolom kecamatan
+        - hapus: id_waktu yang barisnya dibuang dari rollup
+        """
+        fact = fact.merge(dim_wilayah[['id_wilayah', 'kecamatan']], on='id_wilayah', how='left')
+        kubus = build_cube(fact)
+
+        for level in LEVELS:
+            path = self._path_rollup(level)
+            bagian = []
+            if os.path.exists(path):
+                lama = pd.read_parquet(path)
+                lama = lama[~lama['id_waktu'].isin(hapus)]
+                bagian.append(lama[[c for c in lama.columns if not c.startswith(('mom_', 'yoy_'))]])
+            bagian.append(kubus[level])
+            bagian = [b for b in bagian if len(b)]
+            if bagian:
+                self._tulis(tambah_perubahan(pd.concat(bagian, ignore_index=True)), path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def rebuild_rollups(self):
+        """Bangun ulang semua tabel rollup dari seluruh partisi fakta"""
+        with self._kunci():
+            fact = self.load_range()
+            dim_wilayah, berubah = self._gabung_wilayah(self.dim_wilayah())
+            if berubah:
+                self._tulis(dim_wilayah, self._path_dim_wilayah())
+            for level in LEVELS:
+                path = self._path_rollup(level)
+                if os.path.exists(path):
+                    os.remove(path)
+            if len(fact):
+                self._perbarui_rollup(fact, dim_wilayah, [])
+
+    def load_rollup(self, level, dari=None, sampai=None):
+        """
+        Tabel rollup satu level untuk rentang periode (inklusif)
+
+        Rollup dibangun dari fakta jika belum ada (misalnya gudang dari versi lama).
+
+        Parameters:
+        - level: Nama level pada LEVELS
+        - dari, sampai: id_waktu awal/akhir (None = tanpa batas)
+        """
+        path = self._path_rollup(level)
+        if not os.path.exists(path):
+            if not self.periods():
+                return pd.DataFrame(columns=['id_waktu', 'wilayah'] + list(INDIKATOR))
+            self.rebuild_rollups()
+        rollup = pd.read_parquet(path)
+        if dari is not None:
+            rollup = rollup[rollup['id_waktu'] >= int(dari)]
+        if sampai is not None:
+            rollup = rollup[rollup['id_waktu'] <= int(sampai)]
+        return rollup.reset_index(drop=True)
+
+    # ---- baca ---------------------------------------------------------------
+
+    def load_period(self, id_waktu):
+        """
+        Star schema satu periode
+
+        Returns:
+        - Tuple (df_fact, df_wilayah, df_waktu) dengan bentuk sama seperti proses_etl
+        """
+        fact = pd.read_parquet(self._path_fact(id_waktu))
+        dim_wilayah = self.dim_wilayah()
+        wilayah = dim_wilayah[dim_wilayah['id_wilayah'].isin(fact['id_wilayah'])].reset_index(drop=True)
+        dim_waktu = self.dim_waktu()
+        waktu = dim_waktu[dim_waktu['id_waktu'] == int(id_waktu)].reset_index(drop=True)
+        return fact, wilayah, waktu
+
+    def load_range(self, dari=None, sampai=None, columns=None):
+        """
+        Fakta gabungan untuk rentang periode (inklusif)
+
+        Parameters:
+        - dari, sampai: id_waktu awal/akhir (None = tanpa batas)
+        - columns: Kolom fakta yang dibaca (default: semua)
+
+        Returns:
+        - DataFrame fakta dengan kolom id_waktu untuk membedakan periode
+        """
+        periode = [
+            p for p in self.periods()
+            if (dari is None or p >= int(dari)) and (sampai is None or p <= int(sampai))
+        ]
+        if columns is not None and 'id_waktu' not in columns:
+            columns = ['id_waktu'] + list(columns)
+        bagian = [pd.read_parquet(self._path_fact(p), columns=columns) for p in periode]
+        if not bagian:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(bagian, ignore_index=True)
+
+def _gudang_sintetis(sumber, root, jumlah_bulan):
+    """Isi gudang root dengan jumlah_bulan periode acak berbasis periode terbaru gudang sumber"""
+    fact, wilayah, waktu = sumber.load_period(sumber.periods()[-1])
+    gudang = Warehouse(root, sumber.shp_path)
+    rng = np.random.default_rng(0)
+    id_waktu = int(waktu['id_waktu'].iloc[0])
+    for _ in range(jumlah_bulan):
+        acak = fact.copy()
+        for kolom in ['jumlah_stunting', 'jumlah_kurang_gizi', 'jumlah_wasting']:
+            acak[kolom] = rng.binomial(acak['jumlah_ditimbang_d'].astype(int), 0.1)
+        gudang.upsert(acak, wilayah, waktu, id_waktu // 100, id_waktu % 100, sumber=str(id_waktu),
+                      pindahkan_sumber=False)
+        id_waktu = id_waktu - 89 if id_waktu % 100 == 1 else id_waktu - 1
+    return gudang
+
+def benchmark(root=WAREHOUSE_DIR, repeat=20, sintetis=0):
+    """
+    Waktu baca periode, rentang dan seri tren dari gudang data
+
+    Parameters:
+    - root: Folder gudang data
+    - repeat: Jumlah pengulangan
+    - sintetis: Jika > 0, ukur pada gudang sementara berisi sekian bulan data acak
+    """
+    gudang = Warehouse(root)
+    if not gudang.periods():
+        print(f"Gudang data {root} masih kosong")
+        return
+
+    if sintetis:
+        import tempfile
+        tmp_dir = tempfile.TemporaryDirectory()
+        gudang = _gudang_sintetis(gudang, tmp_dir.name, sintetis)
+    periode = gudang.periods()
+
+    def tren_dari_fakta():
+        fact = gudang.load_range().merge(gudang.dim_wilayah()[['id_wilayah', 'kecamatan']], on='id_wilayah')
+        return build_cube(fact)
+
+    def tren_dari_rollup():
+        return {level: gudang.load_rollup(level) for level in LEVELS}
+
+    t_satu = ukur(lambda: gudang.load_period(periode[-1]), repeat)
+    t_rentang = ukur(lambda: gudang.load_range(), repeat)
+    t_fakta = ukur(tren_dari_fakta, repeat)
+    t_rollup = ukur(tren_dari_rollup, repeat)
+    t_desa = ukur(lambda: gudang.load_rollup('desa'), repeat)
+    jumlah_baris = len(gudang.load_range())
+    print(f"{len(periode)} periode, {jumlah_baris:,} baris fakta, terbaik dari {repeat} kali")
+    print(f"load_period({periode[-1]})          : {t_satu * 1000:8.1f} ms")
+    print(f"load_range(semua)            : {t_rentang * 1000:8.1f} ms")
+    print(f"Tren 4 level: groupby fakta  : {t_fakta * 1000:8.1f} ms")
+    print(f"Tren 4 level: baca rollup    : {t_rollup * 1000:8.1f} ms")
+    print(f"Tren desa: baca rollup       : {t_desa * 1000:8.1f} ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gudang data riwayat stunting")
+    parser.add_argument("perintah", choices=["list", "rollup", "benchmark"])
+    parser.add_argument("--root", default=WAREHOUSE_DIR, help="Folder gudang data")
+    parser.add_argument("--repeat", type=int, default=20, help="Jumlah pengulangan benchmark")
+    parser.add_argument("--sintetis", type=int, default=0, help="Benchmark pada N bulan data acak")
+    args = parser.parse_args(argv)
+
+    if args.perintah == "list":
+        dim_waktu = Warehouse(args.root).dim_waktu()
+        if dim_waktu.empty:
+            print(f"Gudang data {args.root} masih kosong")
+        for _, row in dim_waktu.iterrows():
+            print(f"{row['id_waktu']}  {label_periode(row['id_waktu']):<16} disimpan {row['disimpan']}")
+    elif args.perintah == "rollup":
+        gudang = Warehouse(args.root)
+        gudang.rebuild_rollups()
+        print(f"Rollup dibangun ulang untuk {len(gudang.periods())} periode")
+    else:
+        benchmark(args.root, args.repeat, args.sintetis)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,524 @@
+"""
+Indeks wilayah: pasangan puskesmas/desa e-PPGBM -> fitur desa shapefile
+
+Data e-PPGBM hanya memuat nama puskesmas dan desa, sedangkan shapefile memuat
+nama desa (NAMOBJ) dan kecamatan (WADMKC) termasuk desa di kabupaten tetangga.
+Kolom kode wilayah shapefile (KDEPUM, KDCPUM, ...) kosong, sehingga kunci fitur
+yang dipakai adalah id_geo (nomor urut fitur pada shapefile).
+
+Setiap pasangan puskesmas/desa diresolusi sekali ke satu id_geo:
+1. Kunci nama desa (lihat kunci_nama) sama dengan desa di Kabupaten Kuningan.
+2. Jika nama desa ada di beberapa kecamatan, diutamakan kecamatan yang namanya
+   termuat di nama puskesmas, lalu kecamatan tempat desa lain puskesmas yang
+   sama sudah cocok secara unik.
+3. Jika tidak ada nama yang sama, dicari nama termirip (ejaan berbeda) lewat
+   indeks trigram yang dibatasi ke kecamatan wilayah kerja puskesmas. Kandidat
+   dengan skor tinggi dan tidak ambigu diterima otomatis; sisanya menjadi usulan.
+4. Alias yang sudah dikonfirmasi (data/alias_desa.csv) selalu didahulukan.
+
+Hasil resolusi disimpan di data/cache sehingga berlaku lintas sesi dan proses;
+pasangan yang sudah dikenal tidak diresolusi ulang. Join data ke peta cukup
+merge integer pada id_geo, tanpa normalisasi nama dan tanpa baris ganda untuk
+desa bernama sama.
+
+Pemakaian:
+    python wilayah.py report      # cakupan pencocokan dan usulan alias
+    python wilayah.py alias PUSKESMAS DESA NAMOBJ KECAMATAN
+    python wilayah.py benchmark   # waktu pencocokan ejaan berbeda (difflib vs trigram)
+"""
+
+import argparse
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from bench import ukur_hasil
+from geodata import CACHE_DIR, GEODATA_VERSION, SHP_FILE_PATH, cache_valid, load_geodata, normalize_name
+
+NAMA_KABUPATEN_SHAPEFILE = 'Kabupaten Kuningan'
+
+# Alias yang sudah dikonfirmasi: pasangan e-PPGBM -> nama desa & kecamatan shapefile
+ALIAS_PATH = "data/alias_desa.csv"
+KOLOM_ALIAS = ['puskesmas', 'desa', 'namobj', 'kecamatan']
+
+# Kemiripan trigram (koefisien Dice) minimum agar ejaan berbeda diterima otomatis,
+# dan minimum agar kandidat ditampilkan sebagai usulan alias
+BATAS_MIRIP = 0.7
+BATAS_USULAN = 0.4
+
+KOLOM_INDEKS = ['puskesmas_normalized', 'desa_normalized', 'id_geo', 'kecamatan', 'metode', 'skor', 'usulan']
+
+# id_geo untuk pasangan yang tidak ditemukan di shapefile
+TANPA_FITUR = -1
+
+_LOCK_INDEKS = threading.Lock()
+
+def region_index_path(shp_path=SHP_FILE_PATH):
+    """Path tabel indeks wilayah (mengikuti versi artefak geometri; dibangun ulang jika shapefile lebih baru)"""
+    nama = os.path.splitext(os.path.basename(shp_path))[0]
+    return os.path.join(CACHE_DIR, f"{nama}.wilayah.v{GEODATA_VERSION}.parquet")
+
+# Awalan jenis wilayah dan karakter yang dibuang dari kunci nama
+POLA_AWALAN_DESA = re.compile(r'^(DESA|DS\.?|KEL\.?|KELURAHAN)\s+')
+POLA_BUKAN_KUNCI = re.compile(r'[^A-Z0-9]')
+
+def kunci_nama(series):
+    """
+    Kunci pencocokan nama desa dari hasil clean_name (strip + huruf besar)
+
+    Awalan DESA/DS./KEL./KELURAHAN dan semua karakter selain huruf/angka dibuang,
+    sehingga "CIKUBANG MULYA" dan "Cikubangmulya" mendapat kunci yang sama.
+    """
+    return (
+        normalize_name(series.astype(str))
+        .str.replace(POLA_AWALAN_DESA, '', regex=True)
+        .str.replace(POLA_BUKAN_KUNCI, '', regex=True)
+    )
+
+def kunci_teks(teks):
+    """kunci_nama untuk satu string (tanpa overhead Series, misalnya query pencarian)"""
+    return POLA_BUKAN_KUNCI.sub('', POLA_AWALAN_DESA.sub('', str(teks).strip().upper()))
+
+# ========================================
+# INDEKS TRIGRAM (PENCOCOKAN EJAAN BERBEDA)
+# ========================================
+
+def trigram(kunci):
+    """Himpunan trigram kunci nama (dengan penanda awal/akhir)"""
+    teks = f"##{kunci}#"
+    return {teks[i:i + 3] for i in range(len(teks) - 2)}
+
+class TrigramIndex:
+    """
+    Indeks trigram nama fitur untuk mencari nama termirip
+
+    Skor adalah koefisien Dice himpunan trigram. Fitur dikelompokkan per blok
+    (kecamatan): pencarian dalam blok hanya membandingkan belasan himpunan
+    trigram, sedangkan pencarian tanpa blok memakai indeks terbalik
+    trigram -> fitur atas seluruh kabupaten.
+    """
+
+    def __init__(self, kunci, blok):
+        self._trigram = [frozenset(trigram(nama)) for nama in kunci]
+        self._ukuran = np.array([len(t) for t in self._trigram], dtype=float)
+        self._anggota = {}
+        posting = {}
+        for i, (tri, b) in enumerate(zip(self._trigram, blok)):
+            self._anggota.setdefault(b, []).append(i)
+            for t in tri:
+                posting.setdefault(t, []).append(i)
+        self._posting = {t: np.array(v, dtype=np.int32) for t, v in posting.items()}
+
+    def skor(self, kunci):
+        """Array skor Dice kunci terhadap semua fitur (lewat indeks terbalik)"""
+        tri = trigram(kunci)
+        bersama = np.zeros(len(self._trigram))
+        for t in tri:
+            posisi = self._posting.get(t)
+            if posisi is not None:
+                bersama[posisi] += 1
+        return 2 * bersama / (len(tri) + self._ukuran)
+
+    def cari(self, kunci, blok=None, n=2):
+        """
+        n kandidat termirip untuk satu kunci nama
+
+        Parameters:
+        - kunci: Kunci nama (lihat kunci_nama)
+        - blok: Daftar blok (kecamatan) yang boleh dipilih; None = semua
+
+        Returns:
+        - List (posisi fitur, skor) urut dari skor tertinggi, tanpa skor 0
+        """
+        if blok is None:
+            semua = self.skor(kunci)
+            skor = [(int(i), float(semua[i])) for i in np.flatnonzero(semua)]
+        else:
+            tri = trigram(kunci)
+            skor = []
+            for b in blok:
+                for i in self._anggota.get(b, ()):
+                    bersama = len(tri & self._trigram[i])
+                    if bersama:
+                        skor.append((i, 2 * bersama / (len(tri) + len(self._trigram[i]))))
+        return sorted(skor, key=lambda x: (-x[1], x[0]))[:n]
+
+# ========================================
+# RESOLUSI PASANGAN PUSKESMAS/DESA
+# ========================================
+
+def _fitur_kabupaten(gdf):
+    """Fitur desa Kabupaten Kuningan (semua fitur jika kolom WADMKK tidak ada)"""
+    if 'WADMKK' in gdf.columns:
+        gdf = gdf[gdf['WADMKK'] == NAMA_KABUPATEN_SHAPEFILE]
+    return pd.DataFrame({
+        'id_geo': gdf['id_geo'].to_numpy(),
+        'nama': gdf['NAMOBJ'].to_numpy(),
+        'kunci': kunci_nama(gdf['NAMOBJ']).to_numpy(),
+        'desa_normalized': gdf['NAMOBJ_normalized'].to_numpy(),
+        'kecamatan': gdf['WADMKC'].to_numpy(),
+        'kecamatan_normalized': gdf['WADMKC_normalized'].to_numpy(),
+    })
+
+def resolve_pairs(pasangan, fitur, indeks_trigram=None, dikenal=None):
+    """
+    Resolusi pasangan puskesmas/desa (sudah dinormalisasi) ke fitur shapefile
+
+    Parameters:
+    - pasangan: DataFrame unik puskesmas_normalized, desa_normalized
+    - fitur: Fitur desa kabupaten (lihat _fitur_kabupaten)
+    - indeks_trigram: TrigramIndex atas fitur (dibangun jika None)
+    - dikenal: Indeks yang sudah ada; kecamatannya ikut menentukan wilayah kerja puskesmas
+
+    Returns:
+    - DataFrame dengan kolom KOLOM_INDEKS, satu baris per pasangan
+    """
+    if indeks_trigram is None:
+        indeks_trigram = TrigramIndex(fitur['kunci'], fitur['kecamatan'])
+    pasangan = pasangan[['puskesmas_normalized', 'desa_normalized']].reset_index(drop=True)
+    pasangan['_baris'] = np.arange(len(pasangan))
+    pasangan['kunci'] = kunci_nama(pasangan['desa_normalized']).to_numpy()
+
+    # 1. Kunci nama sama (bisa lebih dari satu kecamatan)
+    kandidat = pasangan.merge(fitur.drop(columns='desa_normalized'), on='kunci', how='inner')
+    kandidat['_cocok_nama'] = [
+        kec in pkm for kec, pkm in zip(kandidat['kecamatan_normalized'], kandidat['puskesmas_normalized'])
+    ]
+    jumlah = kandidat.groupby('_baris')['id_geo'].transform('size')
+
+    # 2. Wilayah kerja puskesmas: kecamatan dari pasangan yang cocok secara unik
+    unik = kandidat.loc[jumlah == 1, ['puskesmas_normalized', 'kecamatan']]
+    if dikenal is not None and len(dikenal):
+        unik = pd.concat([
+            unik, dikenal.loc[dikenal['id_geo'] != TANPA_FITUR, ['puskesmas_normalized', 'kecamatan']]
+        ])
+    wilayah_kerja = unik.groupby(['puskesmas_normalized', 'kecamatan']).size().rename('_dukungan').reset_index()
+    kandidat = kandidat.merge(wilayah_kerja, on=['puskesmas_normalized', 'kecamatan'], how='left')
+    kandidat['_dukungan'] = kandidat['_dukungan'].fillna(0)
+    kandidat['metode'] = np.where(kandidat.groupby('_baris')['id_geo'].transform('size') > 1, 'kecamatan', 'nama')
+    kandidat = kandidat.sort_values(
+        ['_baris', '_cocok_nama', '_dukungan', 'id_geo'], ascending=[True, False, False, True], kind='stable'
+    ).drop_duplicates('_baris')
+    kandidat['skor'] = 1.0
+    kandidat['usulan'] = None
+
+    # 3. Ejaan berbeda: trigram termirip di kecamatan wilayah kerja puskesmas
+    blok_puskesmas = wilayah_kerja.groupby('puskesmas_normalized')['kecamatan'].agg(list).to_dict()
+    sisa = pasangan[~pasangan['_baris'].isin(kandidat['_baris'])]
+    mirip = []
+    for baris, pkm, kunci in zip(sisa['_baris'], sisa['puskesmas_normalized'], sisa['kunci']):
+        hasil_cari = indeks_trigram.cari(kunci, blok_puskesmas.get(pkm))
+        if not hasil_cari or hasil_cari[0][1] < BATAS_USULAN:
+            continue
+        posisi, skor = hasil_cari[0]
+        terbaik = fitur.iloc[posisi]
+        jelas = len(hasil_cari) == 1 or hasil_cari[1][1] < skor
+        diterima = skor >= BATAS_MIRIP and jelas
+        mirip.append({
+            '_baris': baris,
+            'id_geo': terbaik['id_geo'] if diterima else TANPA_FITUR,
+            'kecamatan': terbaik['kecamatan'] if diterima else 'N/A',
+            'metode': 'mirip' if diterima else 'tidak ditemukan',
+            'skor': round(skor, 3),
+            'usulan': f"{terbaik['nama']} ({terbaik['kecamatan']})",
+        })
+
+    hasil = pasangan.merge(
+        pd.concat([kandidat[['_baris', 'id_geo', 'kecamatan', 'metode', 'skor', 'usulan']], pd.DataFrame(mirip)]),
+        on='_baris', how='left'
+    )
+    hasil['id_geo'] = hasil['id_geo'].fillna(TANPA_FITUR).astype('int32')
+    hasil['kecamatan'] = hasil['kecamatan'].fillna('N/A')
+    hasil['metode'] = hasil['metode'].fillna('tidak ditemukan')
+    hasil['skor'] = hasil['skor'].fillna(0.0).astype(float)
+    hasil['usulan'] = hasil['usulan'].astype(object)
+    return hasil[KOLOM_INDEKS]
+
+# ========================================
+# TABEL ALIAS
+# ========================================
+
+def load_alias(path=ALIAS_PATH):
+    """Tabel alias yang sudah dikonfirmasi (kosong jika file belum ada)"""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=KOLOM_ALIAS)
+    return pd.read_csv(path, dtype=str).fillna('')[KOLOM_ALIAS]
+
+def simpan_alias(puskesmas, desa, namobj, kecamatan, path=ALIAS_PATH):
+    """
+    Tambahkan atau ganti satu alias (kunci: puskesmas + desa e-PPGBM)
+
+    File ditulis atomik agar dashboard yang sedang berjalan tidak membaca file setengah jadi.
+    """
+    alias = load_alias(path)
+    baru = pd.DataFrame([[puskesmas, desa, namobj, kecamatan]], columns=KOLOM_ALIAS)
+    sama = (
+        (normalize_name(alias['puskesmas']) == normalize_name(baru['puskesmas']).iloc[0])
+        & (normalize_name(alias['desa']) == normalize_name(baru['desa']).iloc[0])
+    )
+    alias = pd.concat([alias[~sama], baru], ignore_index=True)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    alias.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return alias
+
+def _alias_ke_fitur(alias, fitur):
+    """Alias -> id_geo & kecamatan (alias yang fiturnya tidak ada di shapefile dibuang)"""
+    alias = pd.DataFrame({
+        'puskesmas_normalized': normalize_name(alias['puskesmas']).to_numpy(),
+        'desa_normalized': normalize_name(alias['desa']).to_numpy(),
+        'desa_shp': normalize_name(alias['namobj']).to_numpy(),
+        'kecamatan_normalized': normalize_name(alias['kecamatan']).to_numpy(),
+    })
+    return alias.merge(
+        fitur[['id_geo', 'desa_normalized', 'kecamatan', 'kecamatan_normalized']].rename(
+            columns={'desa_normalized': 'desa_shp'}
+        ),
+        on=['desa_shp', 'kecamatan_normalized'], how='inner'
+    )[['puskesmas_normalized', 'desa_normalized', 'id_geo', 'kecamatan']]
+
+def cakupan(hasil):
+    """
+    Ringkasan cakupan pencocokan
+
+    Returns:
+    - dict total, cocok, persen (pasangan yang punya fitur) dan jumlah per metode
+    """
+    total = len(hasil)
+    cocok = int((hasil['id_geo'] != TANPA_FITUR).sum())
+    return {
+        'total': total,
+        'cocok': cocok,
+        'persen': cocok / total * 100 if total else 100.0,
+        'metode': hasil['metode'].value_counts().to_dict(),
+    }
+
+class RegionIndex:
+    """
+    Indeks puskesmas/desa -> id_geo yang disimpan di data/cache
+
+    Aman dipakai bersama beberapa sesi (satu objek per proses); file indeks
+    ditulis atomik sehingga proses lain (misalnya ETL batch) tidak membaca file
+    setengah jadi. Alias dari ALIAS_PATH selalu menang atas hasil resolusi
+    otomatis dan dibaca ulang setiap kali file alias berubah.
+    """
+
+    def __init__(self, shp_path=SHP_FILE_PATH, path=None, alias_path=ALIAS_PATH):
+        self.shp_path = shp_path
+        self.path = path or region_index_path(shp_path)
+        self.alias_path = alias_path
+        self._fitur = None
+        self._trigram = None
+        self._indeks = None
+        self._alias = (None, None)
+
+    def fitur(self):
+        """Fitur desa kabupaten beserta indeks trigramnya (dibangun sekali per proses)"""
+        if self._fitur is None:
+            self._fitur = _fitur_kabupaten(load_geodata(self.shp_path))
+            self._trigram = TrigramIndex(self._fitur['kunci'], self._fitur['kecamatan'])
+        return self._fitur
+
+    def alias(self):
+        """Alias terkonfirmasi yang sudah dipetakan ke id_geo"""
+        mtime = os.path.getmtime(self.alias_path) if os.path.exists(self.alias_path) else None
+        if self._alias[0] != mtime or self._alias[1] is None:
+            self._alias = (mtime, _alias_ke_fitur(load_alias(self.alias_path), self.fitur()))
+        return self._alias[1]
+
+    def table(self):
+        """Seluruh tabel indeks yang sudah diresolusi (tanpa alias)"""
+        if self._indeks is None:
+            self._indeks = pd.DataFrame(columns=KOLOM_INDEKS)
+            try:
+                # Indeks yang lebih lama dari shapefile memakai penomoran id_geo lama
+                if cache_valid(self.path, self.shp_path):
+                    self._indeks = pd.read_parquet(self.path)[KOLOM_INDEKS]
+            except (ImportError, OSError, ValueError, KeyError):
+                pass
+        return self._indeks
+
+    def _simpan(self, indeks):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            indeks.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self.path)
+        except (ImportError, OSError):
+            pass
+
+    def resolve(self, df_wilayah):
+        """
+        id_geo dan kecamatan untuk setiap baris df_wilayah
+
+        Pasangan baru diresolusi lalu ditambahkan ke file indeks; alias
+        diterapkan di atas hasil indeks.
+
+        Parameters:
+        - df_wilayah: DataFrame dengan kolom puskesmas dan desa
+
+        Returns:
+        - DataFrame id_geo, kecamatan, metode, skor, usulan (index sama dengan df_wilayah)
+        """
+        kunci = pd.DataFrame({
+            'puskesmas_normalized': normalize_name(df_wilayah['puskesmas'].astype(str)).to_numpy(),
+            'desa_normalized': normalize_name(df_wilayah['desa'].astype(str)).to_numpy(),
+        })
+        with _LOCK_INDEKS:
+            indeks = self.table()
+            baru = kunci.drop_duplicates().merge(
+                indeks[['puskesmas_normalized', 'desa_normalized']],
+                on=['puskesmas_normalized', 'desa_normalized'], how='left', indicator=True
+            )
+            baru = baru[baru['_merge'] == 'left_only']
+            if len(baru):
+                hasil = resolve_pairs(baru, self.fitur(), self._trigram, dikenal=indeks)
+                indeks = pd.concat([indeks, hasil], ignore_index=True) if len(indeks) else hasil
+                self._indeks = indeks
+                self._simpan(indeks)
+            alias = self.alias()
+
+        hasil = kunci.merge(indeks, on=['puskesmas_normalized', 'desa_normalized'], how='left')
+        if len(alias):
+            hasil = hasil.merge(
+                alias, on=['puskesmas_normalized', 'desa_normalized'], how='left', suffixes=('', '_alias')
+            )
+            ada = hasil['id_geo_alias'].notna().to_numpy()
+            hasil.loc[ada, 'id_geo'] = hasil.loc[ada, 'id_geo_alias'].astype('int32')
+            hasil.loc[ada, 'kecamatan'] = hasil.loc[ada, 'kecamatan_alias']
+            hasil.loc[ada, 'metode'] = 'alias'
+            hasil.loc[ada, 'skor'] = 1.0
+        hasil.index = df_wilayah.index
+        return hasil[['id_geo', 'kecamatan', 'metode', 'skor', 'usulan']]
+
+_INDEKS_PROSES = {}
+
+def get_region_index(shp_path=SHP_FILE_PATH):
+    """Satu RegionIndex per shapefile per proses"""
+    with _LOCK_INDEKS:
+        if shp_path not in _INDEKS_PROSES:
+            _INDEKS_PROSES[shp_path] = RegionIndex(shp_path)
+        return _INDEKS_PROSES[shp_path]
+
+def resolve_wilayah(df_wilayah, shp_path=None, detail=False):
+    """
+    Tambahkan kolom id_geo dan kecamatan ke dimensi wilayah
+
+    Jika shapefile tidak bisa dibaca, id_geo berisi TANPA_FITUR dan kecamatan 'N/A'.
+
+    Parameters:
+    - df_wilayah: DataFrame dengan kolom puskesmas dan desa
+    - detail: Sertakan juga kolom metode, skor dan usulan pencocokan
+    """
+    df_wilayah = df_wilayah.drop(columns=['id_geo', 'kecamatan'], errors='ignore')
+    try:
+        hasil = get_region_index(shp_path or SHP_FILE_PATH).resolve(df_wilayah)
+    except Exception:
+        hasil = pd.DataFrame({
+            'id_geo': np.int32(TANPA_FITUR), 'kecamatan': 'N/A', 'metode': 'tidak ditemukan',
+            'skor': 0.0, 'usulan': None
+        }, index=df_wilayah.index)
+    kolom = ['id_geo', 'kecamatan', 'metode', 'skor', 'usulan'] if detail else ['id_geo', 'kecamatan']
+    return df_wilayah.assign(**{k: hasil[k].to_numpy() for k in kolom})
+
+# ========================================
+# LAPORAN & BENCHMARK
+# ========================================
+
+def report(root=None):
+    """Cakupan pencocokan pasangan puskesmas/desa di gudang data beserta usulan alias"""
+    from warehouse import WAREHOUSE_DIR, Warehouse
+
+    dim = Warehouse(root or WAREHOUSE_DIR).dim_wilayah()
+    if dim.empty:
+        print("Gudang data masih kosong")
+        return
+    hasil = resolve_wilayah(dim, detail=True)
+    ringkas = cakupan(hasil)
+    print(f"{ringkas['total']} pasangan puskesmas/desa, {ringkas['cocok']} cocok ({ringkas['persen']:.1f}%)")
+    for metode, jumlah in ringkas['metode'].items():
+        print(f"  {metode:<16}: {jumlah:5d}")
+    ganda = hasil.loc[hasil['id_geo'] != TANPA_FITUR, 'id_geo'].duplicated(keep=False)
+    print(f"  fitur dipakai >1 pasangan: {int(ganda.sum())} pasangan")
+    perlu_cek = hasil[hasil['metode'].isin(['mirip', 'tidak ditemukan'])]
+    for _, row in perlu_cek.iterrows():
+        usulan = f"usulan {row['usulan']} (skor {row['skor']:.2f})" if row['usulan'] else "tanpa usulan"
+        print(f"    {row['metode']:<16} {row['desa']} (Puskesmas {row['puskesmas']}): {usulan}")
+    if len(perlu_cek):
+        print("Konfirmasi dengan: python wilayah.py alias PUSKESMAS DESA NAMOBJ KECAMATAN")
+
+def benchmark(jumlah=440, repeat=5):
+    """
+    Microbenchmark pencocokan ejaan berbeda: difflib per pasangan vs indeks trigram
+
+    Nama uji adalah nama desa shapefile dengan satu huruf diganti, jadi setiap
+    nama harus melewati tahap pencarian termirip.
+    """
+    import difflib
+
+    indeks = get_region_index()
+    fitur = indeks.fitur()
+    rng = np.random.default_rng(0)
+    pilih = rng.integers(0, len(fitur), jumlah)
+    kunci = []
+    for posisi in pilih:
+        nama = list(fitur['kunci'].iloc[posisi])
+        nama[rng.integers(1, len(nama))] = 'X'
+        kunci.append("".join(nama))
+    blok = fitur['kecamatan'].to_numpy()[pilih]
+
+    nama_fitur = fitur['kunci'].tolist()
+    anggota = fitur.groupby('kecamatan').indices
+
+    def pakai_difflib():
+        hasil = []
+        for k, b in zip(kunci, blok):
+            kandidat = anggota[b]
+            skor = [difflib.SequenceMatcher(None, k, nama_fitur[i]).ratio() for i in kandidat]
+            hasil.append(int(kandidat[int(np.argmax(skor))]))
+        return hasil
+
+    def pakai_trigram():
+        return [indeks._trigram.cari(k, [b], n=1)[0][0] for k, b in zip(kunci, blok)]
+
+    t_bangun, _ = ukur_hasil(lambda: TrigramIndex(fitur['kunci'], fitur['kecamatan']), repeat)
+    t_difflib, hasil_difflib = ukur_hasil(pakai_difflib, repeat)
+    t_trigram, hasil_trigram = ukur_hasil(pakai_trigram, repeat)
+    tepat = lambda hasil: np.mean(np.asarray(hasil) == pilih) * 100
+    print(f"{jumlah} nama salah eja, {len(fitur)} fitur desa, terbaik dari {repeat} kali")
+    print(f"Bangun indeks trigram       : {t_bangun * 1000:8.2f} ms (sekali per proses)")
+    print(f"difflib per kecamatan       : {t_difflib * 1000:8.2f} ms  tepat {tepat(hasil_difflib):.1f}%")
+    print(f"Indeks trigram per kecamatan: {t_trigram * 1000:8.2f} ms  tepat {tepat(hasil_trigram):.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indeks wilayah puskesmas/desa -> fitur shapefile")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    p_report = sub.add_parser("report", help="Cakupan pencocokan dan usulan alias")
+    p_report.add_argument("--gudang", default=None, help="Folder gudang data")
+    p_alias = sub.add_parser("alias", help="Konfirmasi alias desa e-PPGBM -> desa shapefile")
+    p_alias.add_argument("puskesmas")
+    p_alias.add_argument("desa")
+    p_alias.add_argument("namobj", help="Nama desa di shapefile (NAMOBJ)")
+    p_alias.add_argument("kecamatan", help="Kecamatan di shapefile (WADMKC)")
+    p_bench = sub.add_parser("benchmark", help="Waktu pencocokan ejaan berbeda")
+    p_bench.add_argument("--jumlah", type=int, default=440, help="Jumlah nama uji")
+    p_bench.add_argument("--repeat", type=int, default=5, help="Jumlah pengulangan")
+    args = parser.parse_args(argv)
+
+    if args.perintah == "report":
+        report(args.gudang)
+    elif args.perintah == "alias":
+        alias = pd.DataFrame([[args.puskesmas, args.desa, args.namobj, args.kecamatan]], columns=KOLOM_ALIAS)
+        if _alias_ke_fitur(alias, get_region_index().fitur()).empty:
+            parser.error(f"Desa {args.namobj} (Kecamatan {args.kecamatan}) tidak ada di shapefile")
+        simpan_alias(args.puskesmas, args.desa, args.namobj, args.kecamatan)
+        print(f"Alias disimpan di {ALIAS_PATH}; jalankan 'python warehouse.py rollup' untuk memperbarui gudang data")
+    else:
+        benchmark(args.jumlah, args.repeat)
+
+if __name__ == "__main__":
+    main()